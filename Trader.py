@@ -1,32 +1,38 @@
 from datamodel import OrderDepth, UserId, TradingState, Order
 from typing import List
 import string
+from tradelog import TradeLogger, DEBUG, SUBMIT, FAIR_VALUE, DEPTH
 
 
 class Trader:
-    
+
+    def __init__(self):
+        self.logger = TradeLogger()
+
     def run(self, state: TradingState):
         # Only method required. It takes all buy and sell orders for all symbols as an input, and outputs a list of orders to be sent
-        print("traderData: " + state.traderData)
-        print("Observations: " + str(state.observations))
+        if self.logger.enabled(DEBUG):
+            # Free text and a jsonpickle dump of the observations; only worth paying for when debugging
+            print("traderData: " + state.traderData)
+            print("Observations: " + str(state.observations))
         result = {}
         for product in state.order_depths:
             order_depth: OrderDepth = state.order_depths[product]
             orders: List[Order] = []
             acceptable_price = 10;  # Participant should calculate this value
-            print("Acceptable price : " + str(acceptable_price))
-            print("Buy Order depth : " + str(len(order_depth.buy_orders)) + ", Sell order depth : " + str(len(order_depth.sell_orders)))
+            self.logger.debug(FAIR_VALUE, product, acceptable_price)
+            self.logger.debug(DEPTH, product, len(order_depth.buy_orders), len(order_depth.sell_orders))
     
             if len(order_depth.sell_orders) != 0:
                 best_ask, best_ask_amount = list(order_depth.sell_orders.items())[0]
                 if int(best_ask) < acceptable_price:
-                    print("BUY", str(-best_ask_amount) + "x", best_ask)
+                    self.logger.info(SUBMIT, product, best_ask, -best_ask_amount)
                     orders.append(Order(product, best_ask, -best_ask_amount))
     
             if len(order_depth.buy_orders) != 0:
                 best_bid, best_bid_amount = list(order_depth.buy_orders.items())[0]
                 if int(best_bid) > acceptable_price:
-                    print("SELL", str(best_bid_amount) + "x", best_bid)
+                    self.logger.info(SUBMIT, product, best_bid, -best_bid_amount)
                     orders.append(Order(product, best_bid, -best_bid_amount))
             
             result[product] = orders
@@ -35,4 +41,5 @@ class Trader:
         traderData = "SAMPLE" # String value holding Trader state data required. It will be delivered as TradingState.traderData on next execution.
         
         conversions = 1
+        self.logger.flush(state.timestamp)
         return result, conversions, traderData
@@ -0,0 +1,316 @@
+from array import array
+from itertools import product as cartesian
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from state_codec import RingBuffer, register
+from strategy import Clearer, FairValue, ProductContext, ProductStrategy, Quoter, Taker
+
+# Walk-forward parameter adaptation for one product. A population of
+# candidate parameter sets (rolling fair value window, take threshold, quote
+# spreads) is shadow-traded every tick against the live book and market
+# trades, each candidate with its own virtual position and cash:
+#   1. last tick's quotes fill from market trades at or through their price
+#      or from book volume now priced through them, whichever is larger
+#      (the two often report the same flow),
+#   2. candidates whose window is warm take the best level as Taker would,
+#   3. with a clear_width, inventory is worked back towards flat against
+#      bids/asks at or through fair +/- clear_width as Clearer would,
+#   4. each places Quoter's quotes for the remaining capacity,
+#   5. mark-to-market PnL changes feed an exponentially decayed score.
+# Live trading uses the best-scoring candidate, switching only when another
+# leads the current one by more than `margin`. Aggressive orders are assumed
+# to fill at their limit price.
+#
+# Everything per-candidate is a numpy array of length K, updated with a
+# fixed number of array operations per tick, and stored in traderData as
+# raw arrays (about 1 KB for K = 12).
+
+HALF_LIFE = 400
+MARGIN = 5.0
+
+
+class Candidates:
+    FIELDS = ("window", "take_edge", "take_std", "ignore_spread", "match_spread", "base_spread")
+
+    def __init__(self, window: Sequence[int], take_edge: Sequence[float], take_std: Sequence[float],
+                 ignore_spread: Sequence[float], match_spread: Sequence[float], base_spread: Sequence[float]):
+        self.window = np.asarray(window, dtype=np.int64)
+        self.take_edge = np.asarray(take_edge, dtype=float)
+        self.take_std = np.asarray(take_std, dtype=float)
+        self.ignore_spread = np.asarray(ignore_spread, dtype=float)
+        self.match_spread = np.asarray(match_spread, dtype=float)
+        self.base_spread = np.asarray(base_spread, dtype=float)
+
+    @classmethod
+    def grid(cls, window: Sequence[int] = (3,), take_edge: Sequence[float] = (0.0,),
+             take_std: Sequence[float] = (0.5,), ignore_spread: Sequence[float] = (1,),
+             match_spread: Sequence[float] = (2,), base_spread: Sequence[float] = (3,)) -> "Candidates":
+        rows = list(cartesian(window, take_edge, take_std, ignore_spread, match_spread, base_spread))
+        return cls(*zip(*rows))
+
+    def __len__(self) -> int:
+        return len(self.window)
+
+    def params(self, i: int) -> Dict[str, float]:
+        return {name: getattr(self, name)[i].item() for name in self.FIELDS}
+
+    def find(self, **params) -> int:
+        # First candidate matching the given parameters, or 0
+        match = np.ones(len(self), dtype=bool)
+        for name, value in params.items():
+            match &= getattr(self, name) == value
+        return int(np.argmax(match)) if match.any() else 0
+
+
+@register
+class PopulationState:
+    # Shadow book-keeping for K candidates. Quotes are last tick's, waiting
+    # for this tick's fills; a zero quantity means no quote.
+    ARRAYS = {"position": "i", "cash": "d", "mtm": "d", "score": "d",
+              "bid_price": "i", "bid_quantity": "i", "ask_price": "i", "ask_quantity": "i"}
+
+    def __init__(self, size: int, history: int, active: int = 0):
+        self.mids = RingBuffer(history)
+        self.count = 0
+        self.active = active
+        self.switches = 0
+        for name, typecode in self.ARRAYS.items():
+            setattr(self, name, np.zeros(size, dtype=np.int32 if typecode == "i" else float))
+
+    def state(self) -> Dict:
+        data = {"mids": self.mids, "count": self.count, "active": self.active, "switches": self.switches}
+        for name, typecode in self.ARRAYS.items():
+            data[name] = array(typecode, getattr(self, name).tobytes())
+        return data
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "PopulationState":
+        memory = cls(0, state["mids"].capacity, state["active"])
+        memory.mids = state["mids"]
+        memory.count = state["count"]
+        memory.switches = state["switches"]
+        for name in cls.ARRAYS:
+            setattr(memory, name, np.array(state[name]))
+        return memory
+
+
+class ShadowPopulation(FairValue):
+
+    def __init__(self, candidates: Candidates, limit: int, soft_limit: int = 0, start: int = 0,
+                 half_life: float = HALF_LIFE, margin: float = MARGIN, clear_width: Optional[float] = None):
+        self.candidates = candidates
+        self.limit = limit
+        self.soft_limit = soft_limit
+        self.clear_width = clear_width
+        self.start = start
+        self.decay = 0.5 ** (1 / half_life)
+        self.margin = margin
+
+    def initial_state(self) -> PopulationState:
+        return PopulationState(len(self.candidates), int(self.candidates.window.max()), self.start)
+
+    def fair_values(self, memory: PopulationState) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Mean and sample std of each candidate's last `window` mids, and
+        # whether more than `window` mids have been seen (as RollingFairValue)
+        window = self.candidates.window
+        ready = memory.count > window
+        if not ready.any():
+            return np.zeros(len(window)), np.zeros(len(window)), ready
+        mids = np.frombuffer(memory.mids.ordered(), dtype=float)[::-1]
+        sums = np.cumsum(mids)
+        squares = np.cumsum(mids * mids)
+        n = np.minimum(window, len(mids))
+        mean = sums[n - 1] / n
+        var = (squares[n - 1] - n * mean * mean) / np.maximum(n - 1, 1)
+        return mean, np.sqrt(np.maximum(var, 0.0)), ready
+
+    def estimate(self, ctx: ProductContext, memory: PopulationState) -> Optional[Tuple[float, float]]:
+        c = self.candidates
+        book, market_trades = ctx.book, ctx.market_trades
+        # Best-first levels; ask volumes made positive for the array maths
+        buys, sells = book.buy_orders, book.sell_orders
+        bid_prices, ask_prices = buys.prices(), sells.prices()
+        bp = np.array(bid_prices, dtype=float)
+        bv = np.array([buys[p] for p in bid_prices], dtype=np.int64)
+        ap = np.array(ask_prices, dtype=float)
+        av = -np.array([sells[p] for p in ask_prices], dtype=np.int64)
+        position = memory.position.astype(np.int64)
+        cash = memory.cash
+
+        # 1. Passive fills of last tick's quotes. A trade through a quote may
+        # also have left volume priced through it, so the sources are not added
+        volume = (av * (ap < memory.bid_price[:, None])).sum(axis=1)
+        sold = (bv * (bp > memory.ask_price[:, None])).sum(axis=1)
+        if market_trades:
+            tp = np.array([t.price for t in market_trades], dtype=float)
+            tq = np.array([t.quantity for t in market_trades], dtype=np.int64)
+            volume = np.maximum(volume, (tq * (tp <= memory.bid_price[:, None])).sum(axis=1))
+            sold = np.maximum(sold, (tq * (tp >= memory.ask_price[:, None])).sum(axis=1))
+        bought = np.minimum(volume, memory.bid_quantity)
+        sold = np.minimum(sold, memory.ask_quantity)
+        position += bought - sold
+        cash = cash - bought * memory.bid_price + sold * memory.ask_price
+
+        mid = book.mid
+        if mid is not None:
+            memory.mids.append(mid)
+            memory.count += 1
+        fair, std, ready = self.fair_values(memory)
+
+        # 2. Takes at the best level. Capacity is counted from the starting
+        # position and the volume sent so far, as ProductContext.max_buy and
+        # max_sell do, so a buy never frees up room to sell
+        start_position = position.copy()
+        buy_volume = np.zeros(len(c), dtype=np.int64)
+        sell_volume = np.zeros(len(c), dtype=np.int64)
+        width = c.take_edge + c.take_std * std
+        ask_taken = np.zeros(len(c), dtype=np.int64)
+        bid_taken = np.zeros(len(c), dtype=np.int64)
+        if len(ap):
+            max_buy = self.limit - (start_position + buy_volume)
+            ask_taken = np.where(ready & (ap[0] <= fair - width), np.minimum(av[0], max_buy), 0)
+            ask_taken = np.maximum(ask_taken, 0)
+            buy_volume += ask_taken
+            cash = cash - ask_taken * ap[0]
+        if len(bp):
+            max_sell = self.limit + (start_position - sell_volume)
+            bid_taken = np.where(ready & (bp[0] >= fair + width), np.minimum(bv[0], max_sell), 0)
+            bid_taken = np.maximum(bid_taken, 0)
+            sell_volume += bid_taken
+            cash = cash + bid_taken * bp[0]
+        position = start_position + buy_volume - sell_volume
+        ask_cleared = ask_taken >= av[0] if len(ap) else ask_taken > 0
+        bid_cleared = bid_taken >= bv[0] if len(bp) else bid_taken > 0
+
+        # 3. Clearing
+        if self.clear_width is not None:
+            if len(bp):
+                price = np.round(fair + self.clear_width)
+                depth = (bv * (bp >= price[:, None])).sum(axis=1) - bid_taken
+                max_sell = self.limit + (start_position - sell_volume)
+                qty = np.where(ready & (position > 0), np.minimum(np.minimum(depth, position), max_sell), 0)
+                qty = np.maximum(qty, 0)
+                sell_volume += qty
+                position -= qty
+                cash = cash + qty * price
+            if len(ap):
+                price = np.round(fair - self.clear_width)
+                depth = (av * (ap <= price[:, None])).sum(axis=1) - ask_taken
+                max_buy = self.limit - (start_position + buy_volume)
+                qty = np.where(ready & (position < 0), np.minimum(np.minimum(depth, -position), max_buy), 0)
+                qty = np.maximum(qty, 0)
+                buy_volume += qty
+                position += qty
+                cash = cash - qty * price
+
+        # 4. Quotes for the remaining capacity, from the book left after takes
+        our_ask = np.round(fair + c.base_spread)
+        our_bid = np.round(fair - c.base_spread)
+        if len(ap):
+            above = ap > (fair + c.ignore_spread)[:, None]
+            above[:, 0] &= ~ask_cleared
+            found = above.any(axis=1)
+            level = ap[above.argmax(axis=1)]
+            joined = np.where(np.abs(level - fair) <= c.match_spread, level, level - 1)
+            our_ask = np.where(found, joined, our_ask)
+        if len(bp):
+            below = bp < (fair - c.ignore_spread)[:, None]
+            below[:, 0] &= ~bid_cleared
+            found = below.any(axis=1)
+            level = bp[below.argmax(axis=1)]
+            joined = np.where(np.abs(level - fair) <= c.match_spread, level, level + 1)
+            our_bid = np.where(found, joined, our_bid)
+        if self.soft_limit:
+            our_ask -= start_position > self.soft_limit
+            our_bid += start_position < -self.soft_limit
+        memory.bid_price = np.where(ready, our_bid, 0).astype(np.int32)
+        memory.ask_price = np.where(ready, our_ask, 0).astype(np.int32)
+        max_buy = self.limit - (start_position + buy_volume)
+        max_sell = self.limit + (start_position - sell_volume)
+        memory.bid_quantity = np.where(ready, np.maximum(max_buy, 0), 0).astype(np.int32)
+        memory.ask_quantity = np.where(ready, np.maximum(max_sell, 0), 0).astype(np.int32)
+
+        # 5. Score on mark-to-market and pick the live candidate
+        if mid is not None:
+            mtm = cash + position * mid
+            if memory.count > 1:
+                memory.score = memory.score * self.decay + (mtm - memory.mtm)
+            memory.mtm = mtm
+        memory.position = position.astype(np.int32)
+        memory.cash = cash
+        if ready.any():
+            best = int(np.argmax(np.where(ready, memory.score, -np.inf)))
+            if not ready[memory.active] or memory.score[best] > memory.score[memory.active] + self.margin:
+                memory.switches += best != memory.active
+                memory.active = best
+
+        active = memory.active
+        if not ready[active]:
+            return None
+        return float(fair[active]), float(std[active])
+
+
+class AdaptiveProductStrategy(ProductStrategy):
+    # Taker -> Clearer -> Quoter, re-parameterised every tick from the
+    # population's live candidate
+
+    def __init__(self, population: ShadowPopulation):
+        params = population.candidates.params(population.start)
+        self.taker = Taker(params["take_edge"], params["take_std"])
+        self.quoter = Quoter(params["ignore_spread"], params["match_spread"], params["base_spread"],
+                             population.soft_limit)
+        clearer = Clearer(population.clear_width) if population.clear_width is not None else None
+        super().__init__(population, self.taker, clearer, self.quoter)
+
+    def estimate(self, ctx: ProductContext, memory: PopulationState) -> Optional[Tuple[float, float]]:
+        estimate = self.fair_value.estimate(ctx, memory)
+        c = self.fair_value.candidates
+        i = memory.active
+        self.taker.edge = c.take_edge[i].item()
+        self.taker.edge_std = c.take_std[i].item()
+        self.quoter.ignore_spread = c.ignore_spread[i].item()
+        self.quoter.match_spread = c.match_spread[i].item()
+        self.quoter.base_spread = c.base_spread[i].item()
+        return estimate
+
+
+def replay(trader_path: str = "tutorial_v2.py", data_path: str = "data.csv", **constants) -> None:
+    # Backtests the trader with adaptation on and prints the live candidate
+    # over the day, the switch count and the per-tick cost of the population
+    import time
+    from backtester import Backtester, load_prices, load_trader
+    from state_codec import decode
+
+    data = load_prices(data_path)
+    trader = load_trader(trader_path)()
+    for name, value in constants.items():
+        setattr(trader, name, value)
+    spec = trader.registry["KELP"]
+    population = spec.fair_value
+    seconds: List[float] = []
+    timed = population.estimate
+
+    def estimate(*args):
+        start = time.perf_counter()
+        try:
+            return timed(*args)
+        finally:
+            seconds.append(time.perf_counter() - start)
+
+    population.estimate = estimate
+    backtester = Backtester(trader)
+    result = backtester.run(data.ticks(), data.products)
+    memory = decode(backtester.trader_data)["KELP"]
+    print(f"{len(population.candidates)} candidates, pnl {result.total_pnl:.1f}, "
+          f"{memory.switches} switches, live at close: {population.candidates.params(memory.active)}")
+    print(f"population update: mean {np.mean(seconds) * 1e3:.3f} ms, max {np.max(seconds) * 1e3:.3f} ms, "
+          f"traderData {len(backtester.trader_data)} chars")
+    order = np.argsort(-memory.score)
+    for i in order[:5]:
+        print(f"  score {memory.score[i]:9.1f}  {population.candidates.params(i)}")
+
+
+if __name__ == "__main__":
+    replay(KELP_ADAPTIVE=True)
@@ -0,0 +1,200 @@
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtester import DEFAULT_POSITION_LIMIT, POSITION_LIMITS, BacktestResult, QUOTE_DTYPE
+
+# Run analytics from a fill log (backtester FILL_DTYPE) and the per-tick mid
+# prices, as whole-run array operations. Python only loops over products.
+#
+# Realized PnL pairs the k-th unit bought with the k-th unit sold, by unit
+# count, whichever came first and whatever the position's sign, so
+#   realized(t) = sell notional of the first M units - buy notional of the first M units
+# with M = min(units bought, units sold) by tick t. This is the same as FIFO
+# lots: open lots always have one sign, and after B buys and S sells with
+# B > S they are exactly buy units S+1..B, so the next sell closes buy unit
+# S+1 (and symmetrically when short), including through position flips. Cumulative notional is
+# piecewise linear in cumulative units, so both terms are an np.interp over
+# the product's fills. Inventory PnL is the rest of mark-to-market: the open
+# position valued at mid against what it cost.
+
+
+def _drawdown(equity: np.ndarray) -> float:
+    if len(equity) == 0:
+        return 0.0
+    return float((np.maximum.accumulate(equity) - equity).max())
+
+
+class RunAnalytics:
+
+    def __init__(self, products: List[str], day: np.ndarray, mid_price: np.ndarray, fills: np.ndarray,
+                 quotes: Optional[np.ndarray] = None, position_limits: Optional[Dict[str, int]] = None,
+                 soft_limits: Optional[Dict[str, int]] = None):
+        n, k = mid_price.shape
+        self.products = products
+        self.day = day
+        self.mid_price = mid_price
+        self.fills = fills
+        self.quotes = quotes if quotes is not None else np.zeros(0, dtype=QUOTE_DTYPE)
+        limits = {**POSITION_LIMITS, **(position_limits or {})}
+        self.limits = np.array([limits.get(p, DEFAULT_POSITION_LIMIT) for p in products])
+        soft = soft_limits or {}
+        self.soft_limits = np.array([soft.get(p, 0) for p in products])
+
+        tick = fills["tick"].astype(np.int64)
+        product = fills["product"].astype(np.int64)
+        qty = fills["quantity"].astype(np.int64)
+        price = fills["price"].astype(float)
+        buys = np.where(qty > 0, qty, 0)
+        sells = np.where(qty < 0, -qty, 0)
+
+        def per_tick(values) -> np.ndarray:
+            out = np.zeros((n, k), dtype=np.asarray(values).dtype)
+            np.add.at(out, (tick, product), values)
+            return np.cumsum(out, axis=0)
+
+        self.position = per_tick(qty)
+        self.cash = per_tick(-price * qty)
+        self.mtm = self.cash + self.position * mid_price
+        self.bought = per_tick(buys)
+        self.sold = per_tick(sells)
+        self.notional = per_tick(price * np.abs(qty))
+
+        self.realized = np.zeros((n, k))
+        matched = np.minimum(self.bought, self.sold)
+        for j in range(k):
+            mine = product == j
+            b = mine & (qty > 0)
+            s = mine & (qty < 0)
+            if not (b.any() and s.any()):
+                continue
+            buy_units = np.concatenate(([0], np.cumsum(qty[b])))
+            buy_cost = np.concatenate(([0.0], np.cumsum(price[b] * qty[b])))
+            sell_units = np.concatenate(([0], np.cumsum(-qty[s])))
+            sell_value = np.concatenate(([0.0], np.cumsum(price[s] * -qty[s])))
+            self.realized[:, j] = (np.interp(matched[:, j], sell_units, sell_value)
+                                   - np.interp(matched[:, j], buy_units, buy_cost))
+        self.inventory = self.mtm - self.realized
+
+    @classmethod
+    def from_result(cls, result: BacktestResult, **kwargs) -> "RunAnalytics":
+        return cls(result.products, result.day, result.mid_price, result.fills, result.quotes, **kwargs)
+
+    @property
+    def equity(self) -> np.ndarray:
+        return self.mtm.sum(axis=1)
+
+    def per_product(self) -> pd.DataFrame:
+        n, k = self.mtm.shape
+
+        def final(values: np.ndarray) -> np.ndarray:
+            return values[-1] if n else np.zeros(k)
+
+        abs_position = np.abs(self.position)
+        passive = self.fills["passive"]
+        filled = np.bincount(self.fills["product"][passive], np.abs(self.fills["quantity"][passive]),
+                             minlength=len(self.products))
+        quoted = np.bincount(self.quotes["product"], np.abs(self.quotes["quantity"]), minlength=len(self.products))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frame = pd.DataFrame({
+                "pnl": final(self.mtm),
+                "realized": final(self.realized),
+                "inventory": final(self.inventory),
+                "max_drawdown": [_drawdown(self.mtm[:, j]) for j in range(len(self.products))],
+                "volume": final(self.bought + self.sold),
+                "turnover": final(self.notional),
+                "final_position": final(self.position),
+                "max_abs_position": abs_position.max(axis=0, initial=0),
+                "time_at_limit": (abs_position >= self.limits).mean(axis=0),
+                "time_over_soft_limit": np.where(self.soft_limits > 0,
+                                                 (abs_position > self.soft_limits).mean(axis=0),
+                                                 np.nan),
+                "passive_fill_rate": filled / quoted,
+            }, index=pd.Index(self.products, name="product"))
+        return frame
+
+    def per_day(self) -> pd.DataFrame:
+        # Per-day PnL and a Sharpe ratio of the tick-by-tick equity changes,
+        # scaled to one day (mean / std * sqrt(ticks in the day))
+        if len(self.day) == 0:
+            return pd.DataFrame(columns=["pnl", "sharpe", "max_drawdown", "ticks"])
+        equity = self.equity
+        change = np.diff(equity, prepend=0.0)
+        days, starts, counts = np.unique(self.day, return_index=True, return_counts=True)
+        order = np.argsort(starts)
+        days, starts, counts = days[order], starts[order], counts[order]
+        total = np.add.reduceat(change, starts)
+        squares = np.add.reduceat(change * change, starts)
+        mean = total / counts
+        std = np.sqrt(np.maximum(squares / counts - mean * mean, 0.0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sharpe = np.where(std > 0, mean / std * np.sqrt(counts), np.nan)
+        drawdowns = [_drawdown(equity[s:s + c]) for s, c in zip(starts, counts)]
+        return pd.DataFrame({"pnl": total, "sharpe": sharpe, "max_drawdown": drawdowns, "ticks": counts},
+                            index=pd.Index(days, name="day"))
+
+    def summary(self) -> Dict[str, float]:
+        products = self.per_product()
+        days = self.per_day()
+        daily = days["pnl"].to_numpy()
+        n = len(self.day)
+        passive = self.fills["passive"]
+        quoted = np.abs(self.quotes["quantity"]).sum()
+        return {
+            "pnl": float(products["pnl"].sum()),
+            "realized": float(products["realized"].sum()),
+            "inventory": float(products["inventory"].sum()),
+            "max_drawdown": _drawdown(self.equity),
+            "sharpe_daily": float(daily.mean() / daily.std(ddof=1)) if len(daily) > 1 and daily.std(ddof=1) > 0
+            else float("nan"),
+            "sharpe_intraday": float(days["sharpe"].mean()) if len(days) else float("nan"),
+            "volume": int(products["volume"].sum()),
+            "turnover": float(products["turnover"].sum()),
+            "volume_per_tick": float(products["volume"].sum() / n) if n else 0.0,
+            "time_at_limit": float((np.abs(self.position) >= self.limits).any(axis=1).mean()) if n else 0.0,
+            "passive_fill_rate": float(np.abs(self.fills["quantity"][passive]).sum() / quoted) if quoted else float("nan"),
+        }
+
+
+def analyze(result: BacktestResult, **kwargs) -> RunAnalytics:
+    return RunAnalytics.from_result(result, **kwargs)
+
+
+def analyze_many(results: Dict[str, BacktestResult], **kwargs) -> pd.DataFrame:
+    # One summary row per run, e.g. over batch.BatchBacktester or cached sweep results
+    return pd.DataFrame([{"run": name, **analyze(result, **kwargs).summary()} for name, result in results.items()])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    from backtester import Backtester, load_prices, load_trader
+    from matching import make_engine
+
+    parser = argparse.ArgumentParser(description="PnL attribution and risk statistics for one backtest")
+    parser.add_argument("trader")
+    parser.add_argument("data", nargs="?", default="data.csv")
+    parser.add_argument("--fills", default="none", choices=["none", "trade-through", "probabilistic", "market-trades"])
+    parser.add_argument("--soft-limit", action="append", default=[], metavar="PRODUCT=N")
+    args = parser.parse_args(argv)
+
+    data = load_prices(args.data)
+    result = Backtester(load_trader(args.trader)(), engine=make_engine(args.fills)).run(data.ticks(), data.products)
+    soft = {p: int(v) for p, _, v in (spec.partition("=") for spec in args.soft_limit)}
+    start = time.perf_counter()
+    analytics = analyze(result, soft_limits=soft)
+    products, days, summary = analytics.per_product(), analytics.per_day(), analytics.summary()
+    elapsed = time.perf_counter() - start
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(products.to_string(float_format="%.2f"))
+        print()
+        print(days.to_string(float_format="%.2f"))
+        print()
+    for name, value in summary.items():
+        print(f"{name:>18}: {value:.4g}")
+    print(f"analytics in {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
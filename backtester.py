@@ -0,0 +1,421 @@
+import io
+import os
+import sys
+import time
+import importlib.util
+from contextlib import redirect_stdout
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import datamodel
+from datamodel import OrderDepth, Trade, TradingState
+from matching import Fill, MatchingEngine, make_engine
+
+LEVELS = 3
+DEFAULT_POSITION_LIMIT = 50
+POSITION_LIMITS = {
+    "RAINFOREST_RESIN": 50,
+    "KELP": 50,
+}
+SUBMISSION = "SUBMISSION"
+
+# (prices, volumes) per side, best level first. Volumes are positive on both
+# sides; empty levels are dropped.
+Levels = Tuple[List[int], List[int], List[int], List[int]]
+
+
+def frame_levels(columns) -> int:
+    # Book depth of a prices frame: its bid_price_N columns, at least LEVELS
+    levels = LEVELS
+    while f"bid_price_{levels + 1}" in columns:
+        levels += 1
+    return levels
+
+
+class Tick(NamedTuple):
+    day: int
+    timestamp: int
+    levels: Dict[str, Levels]
+    mid_prices: Dict[str, float]
+    market_trades: Dict[str, List[Trade]]
+
+
+class PriceData:
+    # Column arrays for a prices file, sorted by (day, timestamp, product).
+    # Price/volume arrays are (rows, levels) int32 with 0 marking an empty level;
+    # levels is LEVELS for exchange files and may be more for synthetic books.
+
+    def __init__(self, products: List[str], day: np.ndarray, timestamp: np.ndarray,
+                 product: np.ndarray, bid_price: np.ndarray, bid_volume: np.ndarray,
+                 ask_price: np.ndarray, ask_volume: np.ndarray, mid_price: np.ndarray,
+                 profit_and_loss: np.ndarray):
+        self.products = products
+        self.day = day
+        self.timestamp = timestamp
+        self.product = product
+        self.bid_price = bid_price
+        self.bid_volume = bid_volume
+        self.ask_price = ask_price
+        self.ask_volume = ask_volume
+        self.mid_price = mid_price
+        self.profit_and_loss = profit_and_loss
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PriceData":
+        df = df.sort_values(["day", "timestamp", "product"], kind="stable")
+        codes, products = pd.factorize(df["product"], sort=True)
+        levels = frame_levels(df.columns)
+
+        def side(name: str) -> np.ndarray:
+            cols = [f"{name}_{i}" for i in range(1, levels + 1)]
+            return df[cols].fillna(0).to_numpy(dtype=np.int32)
+
+        return cls(
+            products=list(products),
+            day=df["day"].to_numpy(dtype=np.int64),
+            timestamp=df["timestamp"].to_numpy(dtype=np.int64),
+            product=codes.astype(np.int16),
+            bid_price=side("bid_price"),
+            bid_volume=side("bid_volume"),
+            ask_price=side("ask_price"),
+            ask_volume=side("ask_volume"),
+            mid_price=df["mid_price"].to_numpy(dtype=np.float64),
+            profit_and_loss=df["profit_and_loss"].fillna(0).to_numpy(dtype=np.float64),
+        )
+
+    def tick_bounds(self) -> np.ndarray:
+        # Row offsets where each (day, timestamp) group starts, plus the end
+        if len(self) == 0:
+            return np.zeros(1, dtype=np.int64)
+        change = (np.diff(self.day) != 0) | (np.diff(self.timestamp) != 0)
+        starts = np.flatnonzero(change) + 1
+        return np.concatenate(([0], starts, [len(self)]))
+
+    def ticks(self) -> Iterator[Tick]:
+        bounds = self.tick_bounds()
+        products = self.products
+        # Convert once up front; per-row numpy scalar access is the slow part
+        day = self.day.tolist()
+        timestamp = self.timestamp.tolist()
+        product = self.product.tolist()
+        bid_price = self.bid_price.tolist()
+        bid_volume = self.bid_volume.tolist()
+        ask_price = self.ask_price.tolist()
+        ask_volume = self.ask_volume.tolist()
+        mid_price = self.mid_price.tolist()
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            levels = {}
+            mids = {}
+            for row in range(start, end):
+                symbol = products[product[row]]
+                bp, bv, ap, av = [], [], [], []
+                for p, v in zip(bid_price[row], bid_volume[row]):
+                    if v:
+                        bp.append(p)
+                        bv.append(v)
+                for p, v in zip(ask_price[row], ask_volume[row]):
+                    if v:
+                        ap.append(p)
+                        av.append(v)
+                levels[symbol] = (bp, bv, ap, av)
+                mids[symbol] = mid_price[row]
+            yield Tick(day[start], timestamp[start], levels, mids, {})
+
+
+class _NullWriter(io.TextIOBase):
+    # Quiet mode discards the trader's prints rather than keeping them all
+
+    def write(self, s: str) -> int:
+        return len(s)
+
+
+def load_prices(path: str) -> PriceData:
+    if os.path.isdir(path):
+        from datastore import MarketStore
+        return MarketStore(path).price_data()
+    if path.endswith(".npz"):
+        from bookcodec import BookDeltas
+        return BookDeltas.load(path).price_data()
+    return PriceData.from_frame(pd.read_csv(path, sep=";"))
+
+
+def load_trader(path: str, class_name: str = "Trader"):
+    # Trader files are not valid module names ("mean_reversion+MM.py"), so
+    # load them by path. Their own imports (datamodel) resolve from the repo root.
+    path = os.path.abspath(path)
+    root = os.path.dirname(path)
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    name = "trader_" + "".join(c if c.isalnum() else "_" for c in os.path.basename(path)[:-3])
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return getattr(module, class_name)
+
+
+def build_order_depth(levels: Levels, order_depth_cls=OrderDepth) -> OrderDepth:
+    bp, bv, ap, av = levels
+    depth = order_depth_cls()
+    for p, v in zip(bp, bv):
+        depth.buy_orders[p] = v
+    for p, v in zip(ap, av):
+        depth.sell_orders[p] = -v
+    return depth
+
+
+FILL_DTYPE = np.dtype([
+    ("tick", np.int32),
+    ("product", np.int16),
+    ("price", np.int32),
+    ("quantity", np.int32),
+    ("passive", np.bool_),
+])
+# Our unfilled remainders as they were left resting on the book
+QUOTE_DTYPE = np.dtype([
+    ("tick", np.int32),
+    ("product", np.int16),
+    ("price", np.int32),
+    ("quantity", np.int32),
+])
+
+
+class BacktestResult:
+
+    def __init__(self, products: List[str], day: np.ndarray, timestamp: np.ndarray,
+                 mid_price: np.ndarray, position: np.ndarray, cash: np.ndarray,
+                 fills: np.ndarray, quotes: np.ndarray, trader_data: str, elapsed: float):
+        self.products = products
+        self.day = day
+        self.timestamp = timestamp
+        self.mid_price = mid_price  # (ticks, products)
+        self.position = position  # (ticks, products), after the tick's fills
+        self.cash = cash  # (ticks, products)
+        self.fills = fills  # FILL_DTYPE; passive fills are attributed to the tick that reports them
+        self.quotes = quotes  # QUOTE_DTYPE
+        self.trader_data = trader_data
+        self.elapsed = elapsed
+
+    @property
+    def pnl(self) -> np.ndarray:
+        # Mark-to-market per product, (ticks, products)
+        return self.cash + self.position * self.mid_price
+
+    @property
+    def total_pnl(self) -> float:
+        if len(self.day) == 0:
+            return 0.0
+        return float(self.pnl[-1].sum())
+
+    def max_drawdown(self) -> float:
+        equity = self.pnl.sum(axis=1)
+        if len(equity) == 0:
+            return 0.0
+        return float((np.maximum.accumulate(equity) - equity).max())
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "pnl": self.total_pnl,
+            "max_drawdown": self.max_drawdown(),
+            "fills": int(len(self.fills)),
+            "volume": int(np.abs(self.fills["quantity"]).sum()),
+            "passive_fills": int(self.fills["passive"].sum()),
+        }
+
+
+class Backtester:
+
+    def __init__(self, trader, position_limits: Optional[Dict[str, int]] = None,
+                 quiet: bool = True, order_depth_cls=None,
+                 engine: Optional[MatchingEngine] = None, model=datamodel):
+        self.trader = trader
+        self.position_limits = dict(POSITION_LIMITS)
+        if position_limits:
+            self.position_limits.update(position_limits)
+        self.quiet = quiet
+        # `model` supplies the state classes (datamodel, or fastmodel for
+        # __slots__ versions); order_depth_cls overrides just the books
+        self.model = model
+        self.order_depth_cls = order_depth_cls or model.OrderDepth
+        self.engine = engine or MatchingEngine()
+        self.reset()
+
+    def reset(self) -> None:
+        self.trader_data = ""
+        self.position: Dict[str, int] = {}
+        self.cash: Dict[str, float] = {}
+        self.own_trades: Dict[str, List[Trade]] = {}
+        self.fills: List[Tuple[int, str, int, int, bool]] = []
+        self.quotes: List[Tuple[int, str, int, int]] = []
+        self.logs = _NullWriter() if self.quiet else None
+        self.tick_index = 0
+        self.last_timestamp = 0
+        self.engine.reset()
+
+    def limit(self, product: str) -> int:
+        return self.position_limits.get(product, DEFAULT_POSITION_LIMIT)
+
+    def build_state(self, tick: Tick, order_depths: Dict[str, OrderDepth]) -> TradingState:
+        model = self.model
+        listings = {p: model.Listing(p, p, "SEASHELLS") for p in order_depths}
+        return model.TradingState(
+            self.trader_data,
+            tick.timestamp,
+            listings,
+            order_depths,
+            self.own_trades,
+            tick.market_trades,
+            dict(self.position),
+            model.Observation({}, {}),
+        )
+
+    def call_trader(self, state: TradingState):
+        if self.logs is None:
+            return self.trader.run(state)
+        with redirect_stdout(self.logs):
+            return self.trader.run(state)
+
+    def apply_fills(self, product: str, fills: List[Fill], timestamp: int, trades: List[Trade]) -> None:
+        position = self.position.get(product, 0)
+        cash = self.cash.get(product, 0.0)
+        Trade = self.model.Trade
+        for price, qty, passive in fills:
+            position += qty
+            cash -= price * qty
+            self.fills.append((self.tick_index, product, price, qty, passive))
+            if qty > 0:
+                trades.append(Trade(product, price, qty, SUBMISSION, "", timestamp))
+            else:
+                trades.append(Trade(product, price, -qty, "", SUBMISSION, timestamp))
+        self.position[product] = position
+        self.cash[product] = cash
+
+    def step(self, tick: Tick, order_depths: Optional[Dict[str, OrderDepth]] = None) -> None:
+        # Last tick's resting quotes trade (or not) against this tick's flow
+        # before the trader sees the new state
+        for product, fills in self.engine.settle(tick.levels, tick.market_trades).items():
+            self.apply_fills(product, fills, self.last_timestamp, self.own_trades.setdefault(product, []))
+
+        if order_depths is None:
+            order_depths = {p: build_order_depth(lv, self.order_depth_cls) for p, lv in tick.levels.items()}
+        state = self.build_state(tick, order_depths)
+        result, _conversions, trader_data = self.call_trader(state)
+        self.trader_data = trader_data if trader_data is not None else ""
+
+        own_trades: Dict[str, List[Trade]] = {}
+        for product, orders in (result or {}).items():
+            if product not in tick.levels or not orders:
+                continue
+            position = self.position.get(product, 0)
+            fills = self.engine.execute(product, tick.levels[product], orders, position,
+                                        self.limit(product), tick.mid_prices.get(product, float("nan")))
+            if fills:
+                self.apply_fills(product, fills, tick.timestamp, own_trades.setdefault(product, []))
+            for quote in self.engine.quotes().get(product, ()):
+                self.quotes.append((self.tick_index, product, quote.price, quote.remaining))
+        self.own_trades = own_trades
+        self.last_timestamp = tick.timestamp
+        self.tick_index += 1
+
+    def run(self, ticks: Iterable[Tick], products: Optional[List[str]] = None) -> BacktestResult:
+        self.reset()
+        start = time.perf_counter()
+        days, timestamps, mids, positions, cashes = [], [], [], [], []
+        for tick in ticks:
+            self.step(tick)
+            days.append(tick.day)
+            timestamps.append(tick.timestamp)
+            mids.append(tick.mid_prices)
+            positions.append(dict(self.position))
+            cashes.append(dict(self.cash))
+        elapsed = time.perf_counter() - start
+        return self.collect(products, days, timestamps, mids, positions, cashes, elapsed)
+
+    def collect(self, products, days, timestamps, mids, positions, cashes, elapsed) -> BacktestResult:
+        if products is None:
+            products = sorted({p for m in mids for p in m})
+        index = {p: i for i, p in enumerate(products)}
+        n, k = len(days), len(products)
+        mid = np.full((n, k), np.nan)
+        position = np.zeros((n, k), dtype=np.int64)
+        cash = np.zeros((n, k))
+        for t in range(n):
+            for p, v in mids[t].items():
+                mid[t, index[p]] = v
+            for p, v in positions[t].items():
+                position[t, index[p]] = v
+            for p, v in cashes[t].items():
+                cash[t, index[p]] = v
+        # Carry the last known mid through ticks where a product is missing
+        for j in range(k):
+            col = mid[:, j]
+            valid = ~np.isnan(col)
+            if valid.any():
+                idx = np.where(valid, np.arange(n), 0)
+                np.maximum.accumulate(idx, out=idx)
+                col[:] = col[idx]
+                col[np.isnan(col)] = col[valid][0]
+        fills = np.array(
+            [(t, index[p], price, qty, passive) for t, p, price, qty, passive in self.fills if p in index],
+            dtype=FILL_DTYPE,
+        )
+        quotes = np.array(
+            [(t, index[p], price, qty) for t, p, price, qty in self.quotes if p in index],
+            dtype=QUOTE_DTYPE,
+        )
+        return BacktestResult(
+            products,
+            np.asarray(days, dtype=np.int64),
+            np.asarray(timestamps, dtype=np.int64),
+            np.nan_to_num(mid),
+            position,
+            cash,
+            fills,
+            quotes,
+            self.trader_data,
+            elapsed,
+        )
+
+
+def backtest(trader, data: PriceData, **kwargs) -> BacktestResult:
+    return Backtester(trader, **kwargs).run(data.ticks(), data.products)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a prices CSV through a Trader")
+    parser.add_argument("trader", help="path to a file defining Trader")
+    parser.add_argument("data", nargs="?", default="data.csv")
+    parser.add_argument("--verbose", action="store_true", help="let the trader print to stdout")
+    parser.add_argument("--sorted-book", action="store_true", help="hand the trader SortedOrderDepth books")
+    parser.add_argument("--fills", default="none", choices=["none", "trade-through", "probabilistic", "market-trades"],
+                        help="passive fill model for resting quotes")
+    parser.add_argument("--fast-model", action="store_true", help="build states from fastmodel's __slots__ classes")
+    args = parser.parse_args(argv)
+
+    data = load_prices(args.data)
+    trader = load_trader(args.trader)()
+    kwargs = {"engine": make_engine(args.fills)}
+    if args.fast_model:
+        import fastmodel
+        kwargs["model"] = fastmodel
+    if args.sorted_book:
+        from orderbook import SortedOrderDepth
+        kwargs["order_depth_cls"] = SortedOrderDepth
+    result = backtest(trader, data, quiet=not args.verbose, **kwargs)
+    for j, product in enumerate(result.products):
+        pnl = result.pnl[-1, j] if len(result.day) else 0.0
+        print(f"{product}: pnl {pnl:.1f}, position {result.position[-1, j] if len(result.day) else 0}")
+    summary = result.summary()
+    print(f"Total pnl {summary['pnl']:.1f}, max drawdown {summary['max_drawdown']:.1f}, "
+          f"{summary['fills']} fills ({summary['passive_fills']} passive) over {len(result.day)} ticks in {result.elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
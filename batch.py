@@ -0,0 +1,130 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from backtester import Backtester, BacktestResult, PriceData, Tick, build_order_depth, load_prices, load_trader
+from datamodel import OrderDepth
+from matching import make_engine
+from sweep import Params, make_trader, result_row
+
+# Several traders over one pass of the market data. Each tick is decoded and
+# turned into books once; every session then gets its own positions, cash,
+# traderData and matching engine, and its own copy of the shared books, since
+# take_best_orders and friends mutate the book in place. Copying a few-level
+# dict is cheaper than wrapping it copy-on-write, and the trader gets the same
+# plain dicts (or SortedLevels) a single run would, so toJSON and jsonpickle
+# behave the same.
+
+
+def copy_order_depth(book: OrderDepth) -> OrderDepth:
+    depth = type(book)()
+    depth.buy_orders = book.buy_orders.copy()
+    depth.sell_orders = book.sell_orders.copy()
+    return depth
+
+
+class Session:
+    # One trader's replay state plus the per-tick history run() would keep
+
+    def __init__(self, name: str, backtester: Backtester):
+        self.name = name
+        self.backtester = backtester
+        self.days: List[int] = []
+        self.timestamps: List[int] = []
+        self.mids: List[Dict[str, float]] = []
+        self.positions: List[Dict[str, int]] = []
+        self.cashes: List[Dict[str, float]] = []
+        self.elapsed = 0.0
+
+    def step(self, tick: Tick, books: Dict[str, OrderDepth]) -> None:
+        bt = self.backtester
+        start = time.perf_counter()
+        bt.step(tick, {p: copy_order_depth(book) for p, book in books.items()})
+        self.elapsed += time.perf_counter() - start
+        self.days.append(tick.day)
+        self.timestamps.append(tick.timestamp)
+        self.mids.append(tick.mid_prices)
+        self.positions.append(dict(bt.position))
+        self.cashes.append(dict(bt.cash))
+
+    def result(self, products: Optional[List[str]]) -> BacktestResult:
+        return self.backtester.collect(products, self.days, self.timestamps, self.mids,
+                                       self.positions, self.cashes, self.elapsed)
+
+
+class BatchBacktester:
+
+    def __init__(self, traders: Dict[str, Any], fills: str = "none", **kwargs):
+        # kwargs go to every Backtester; each session gets its own engine
+        self.traders = traders
+        self.fills = fills
+        self.kwargs = kwargs
+
+    def run(self, ticks: Iterable[Tick], products: Optional[List[str]] = None) -> Dict[str, BacktestResult]:
+        sessions = [Session(name, Backtester(trader, engine=make_engine(self.fills), **self.kwargs))
+                    for name, trader in self.traders.items()]
+        # Shared books use the sessions' book class (order_depth_cls or the model's)
+        order_depth_cls = sessions[0].backtester.order_depth_cls if sessions else OrderDepth
+        for tick in ticks:
+            books = {p: build_order_depth(lv, order_depth_cls) for p, lv in tick.levels.items()}
+            for session in sessions:
+                session.step(tick, books)
+        return {session.name: session.result(products) for session in sessions}
+
+
+def batch_backtest(traders: Dict[str, Any], data: PriceData, **kwargs) -> Dict[str, BacktestResult]:
+    return BatchBacktester(traders, **kwargs).run(data.ticks(), data.products)
+
+
+def variants(trader_cls: type, param_sets: Sequence[Params]) -> Dict[str, Any]:
+    # One trader per parameter set, named by its parameters
+    return {", ".join(f"{k}={v}" for k, v in params.items()) or "default": make_trader(trader_cls, params)
+            for params in param_sets}
+
+
+def report(results: Dict[str, BacktestResult]) -> pd.DataFrame:
+    return pd.DataFrame([{"trader": name, **result_row(result)} for name, result in results.items()])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    from sweep import grid, parse_values
+
+    parser = argparse.ArgumentParser(description="Backtest several traders, or variants of one, in a single data pass")
+    parser.add_argument("traders", nargs="+", help="trader files; with --param, exactly one")
+    parser.add_argument("--data", default="data.csv")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...")
+    parser.add_argument("--fills", default="none", choices=["none", "trade-through", "probabilistic", "market-trades"])
+    parser.add_argument("--sorted-book", action="store_true", help="hand the traders SortedOrderDepth books")
+    parser.add_argument("--sort", default="pnl")
+    args = parser.parse_args(argv)
+
+    if args.param:
+        if len(args.traders) != 1:
+            parser.error("--param takes exactly one trader file")
+        space = {}
+        for spec in args.param:
+            name, _, values = spec.partition("=")
+            space[name] = parse_values(values)
+        traders = variants(load_trader(args.traders[0]), grid(space))
+    else:
+        traders = {path: load_trader(path)() for path in args.traders}
+
+    data = load_prices(args.data)
+    start = time.perf_counter()
+    kwargs = {"fills": args.fills}
+    if args.sorted_book:
+        from orderbook import SortedOrderDepth
+        kwargs["order_depth_cls"] = SortedOrderDepth
+    results = batch_backtest(traders, data, **kwargs)
+    elapsed = time.perf_counter() - start
+    table = report(results).sort_values(args.sort, ascending=False)
+    with pd.option_context("display.max_rows", 50, "display.width", 200):
+        print(table.to_string(index=False))
+    print(f"{len(results)} traders over {len(data.tick_bounds()) - 1} ticks in {elapsed:.3f}s "
+          f"(strategy time {sum(r.elapsed for r in results.values()):.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import copy
+import gc
+import glob
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backtester import Backtester, load_prices, load_trader
+from profiler import BUDGET_MS, ProfiledTrader
+
+# Micro-benchmarks of Trader.run and its helpers on recorded states.
+#
+# Each trader is backtested once over the data while a ProfiledTrader
+# subclass captures, at a few points in the day (PHASES, as fractions of
+# the ticks), a deep copy of the TradingState and of the arguments of
+# every helper call made during that tick: the methods profiler.py times
+# (process_*, take_best_orders, close_positions, ...), each Strategy
+# component per product, and the module's encode/decode. Late-day states
+# carry the full rolling histories and positions in traderData.
+#
+# Every case is then timed timeit-style on the unpatched callables: a batch
+# of `number` calls, each on a fresh copy of the recorded arguments (copying
+# is outside the timer), repeated `repeat` times with gc off. The minimum
+# per-call time is the tracked figure; the median is reported alongside.
+#
+# Results go to BENCH_DIR as JSON with the machine and git metadata.
+# --compare fails the run (exit 1) when a case present in both files got
+# slower by more than its allowed delta, or when any run() case is over
+# budget. The allowed delta is the largest of --threshold of the baseline,
+# NOISE_FACTOR times the wider repeat spread (median - min) of the two runs,
+# and a floor in microseconds that is higher for cases under SMALL_US, whose
+# minimums move by a microsecond or two between processes.
+
+BENCH_DIR = ".benchmarks"
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PHASES = {"early": 0.05, "mid": 0.5, "late": 1.0}
+TARGET_SECONDS = 0.02
+MAX_NUMBER = 2000
+THRESHOLD = 0.25
+NOISE_FACTOR = 3.0
+# Differences below these are timer noise whatever the ratio
+MIN_DELTA_US = 1.0
+SMALL_US = 10.0
+SMALL_DELTA_US = 5.0
+
+Case = Tuple[Callable, tuple, dict]
+
+
+class Recorder(ProfiledTrader):
+    # Captures states and helper arguments at the given tick indices instead
+    # of timing every tick
+
+    def __init__(self, trader, capture: Dict[int, str]):
+        self.capture = capture
+        self.phase: Optional[str] = None
+        self.tick_index = 0
+        self.states: Dict[str, Any] = {}
+        self.cases: Dict[str, Dict[str, Case]] = {phase: {} for phase in capture.values()}
+        super().__init__(trader, trace_memory=False, per_product=True)
+
+    def _timed(self, section: str, fn: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            if self.phase is not None:
+                cases = self.cases[self.phase]
+                name = section
+                i = 1
+                while name in cases:
+                    i += 1
+                    name = f"{section}#{i}"
+                cases[name] = (fn, *self.copy((args, kwargs)))
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    def copy(self, value):
+        # The trader's logger is shared, not copied, like the trader itself
+        memo = {id(self.trader): self.trader}
+        logger = getattr(self.trader, "logger", None)
+        if logger is not None:
+            memo[id(logger)] = logger
+        return copy.deepcopy(value, memo)
+
+    def run(self, state):
+        self.phase = self.capture.get(self.tick_index)
+        if self.phase is not None:
+            state_copy = self.copy(state)
+            self.states[self.phase] = state_copy
+            self.cases[self.phase]["run"] = (self.trader.run, (state_copy,), {})
+        try:
+            return self.trader.run(state)
+        finally:
+            self.phase = None
+            self.tick_index += 1
+
+
+def record(trader, data, phases: Dict[str, float] = PHASES) -> Recorder:
+    ticks = list(data.ticks())
+    capture = {min(int(fraction * len(ticks)), len(ticks) - 1): phase for phase, fraction in phases.items()}
+    recorder = Recorder(trader, capture)
+    try:
+        Backtester(recorder).run(ticks, data.products)
+    finally:
+        recorder.restore()
+    # run() was captured through the recorder; time the trader's own
+    for cases in recorder.cases.values():
+        _, args, kwargs = cases["run"]
+        cases["run"] = (trader.run, args, kwargs)
+    return recorder
+
+
+def measure(fn: Callable, args: tuple, kwargs: dict, copy_args: Callable, repeat: int = 7) -> Dict[str, float]:
+    sink = io.StringIO()
+
+    def batch(number: int) -> float:
+        calls = [copy_args((args, kwargs)) for _ in range(number)]
+        sink.seek(0)
+        sink.truncate()
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with redirect_stdout(sink):
+                start = time.perf_counter()
+                for a, k in calls:
+                    fn(*a, **k)
+                elapsed = time.perf_counter() - start
+        finally:
+            if enabled:
+                gc.enable()
+        return elapsed / number
+
+    batch(1)  # warm-up
+    once = batch(1)
+    number = int(min(max(TARGET_SECONDS / max(once, 1e-9), 1), MAX_NUMBER))
+    times = np.array([batch(number) for _ in range(repeat)]) * 1e6
+    return {
+        "min_us": float(times.min()),
+        "median_us": float(np.median(times)),
+        "max_us": float(times.max()),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def trader_files(root: str = ROOT) -> List[str]:
+    pattern = re.compile(r"^class Trader\b", re.MULTILINE)
+    files = []
+    for path in sorted(glob.glob(os.path.join(root, "*.py"))):
+        with open(path) as f:
+            if pattern.search(f.read()):
+                files.append(os.path.relpath(path, root))
+    return files
+
+
+def machine_info() -> Dict[str, Any]:
+    info = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__,
+    }
+    try:
+        with open("/proc/cpuinfo") as f:
+            models = re.findall(r"^model name\s*:\s*(.+)$", f.read(), re.MULTILINE)
+        if models:
+            info["cpu"] = models[0]
+    except OSError:
+        pass
+    try:
+        def git(*args: str) -> str:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+
+        info["commit"] = git("rev-parse", "--short", "HEAD")
+        info["dirty"] = bool(git("status", "--porcelain", "--untracked-files=no"))
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def run_benchmarks(traders: List[str], data_path: str, repeat: int = 7, pattern: Optional[str] = None,
+                   phases: Dict[str, float] = PHASES) -> Dict[str, Any]:
+    data = load_prices(data_path)
+    select = re.compile(pattern) if pattern else None
+    results = {}
+    for path in traders:
+        trader = load_trader(path)()
+        recorder = record(trader, data, phases)
+        for phase, cases in recorder.cases.items():
+            trader_data = len(recorder.states[phase].traderData or "")
+            for section, (fn, args, kwargs) in cases.items():
+                name = f"{path}:{section}:{phase}"
+                if select and not select.search(name):
+                    continue
+                results[name] = {**measure(fn, args, kwargs, recorder.copy, repeat), "trader_data_chars": trader_data}
+    return {
+        "machine": machine_info(),
+        "config": {"data": data_path, "repeat": repeat, "phases": phases, "traders": traders},
+        "benchmarks": results,
+    }
+
+
+def save(report: Dict[str, Any], path: Optional[str] = None) -> str:
+    if path is None:
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        machine = report["machine"]
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(BENCH_DIR, f"{stamp}_{machine.get('commit', 'nogit')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    return path
+
+
+def latest(exclude: Optional[str] = None) -> Optional[str]:
+    files = [p for p in glob.glob(os.path.join(BENCH_DIR, "*.json")) if p != exclude]
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def allowed_delta(before: Dict[str, float], after: Dict[str, float], threshold: float = THRESHOLD,
+                  min_delta_us: float = MIN_DELTA_US) -> float:
+    spread = max(r["median_us"] - r["min_us"] for r in (before, after))
+    floor = max(min_delta_us, SMALL_DELTA_US) if before["min_us"] < SMALL_US else min_delta_us
+    return max(before["min_us"] * threshold, NOISE_FACTOR * spread, floor)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float = THRESHOLD,
+            min_delta_us: float = MIN_DELTA_US) -> List[Tuple[str, float, float]]:
+    # (name, baseline us, current us) for every regressed case
+    regressions = []
+    old = baseline["benchmarks"]
+    for name, current in report["benchmarks"].items():
+        if name not in old:
+            continue
+        before, after = old[name]["min_us"], current["min_us"]
+        if after - before > allowed_delta(old[name], current, threshold, min_delta_us):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def over_budget(report: Dict[str, Any], budget_ms: float = BUDGET_MS) -> List[str]:
+    return [name for name, result in report["benchmarks"].items()
+            if name.split(":")[1] == "run" and result["median_us"] > budget_ms * 1e3]
+
+
+def format_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    old = baseline["benchmarks"] if baseline else {}
+    lines = [f"{'case':<52}{'min us':>10}{'median us':>11}{'number':>8}{'data':>7}" + ("  vs base" if old else "")]
+    for name, r in report["benchmarks"].items():
+        line = f"{name:<52}{r['min_us']:>10.2f}{r['median_us']:>11.2f}{r['number']:>8d}{r['trader_data_chars']:>7d}"
+        if name in old:
+            line += f"  {r['min_us'] / old[name]['min_us']:>6.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark Trader.run and its helpers on recorded states")
+    parser.add_argument("traders", nargs="*", help="trader files (default: every file defining a Trader)")
+    parser.add_argument("--data", default="data.csv")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--filter", help="regex on case names (trader:section:phase)")
+    parser.add_argument("--save", help=f"results file (default: a new file in {BENCH_DIR}/)")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file, or 'latest' for the newest saved one")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown, as a fraction (noise and small cases allow more)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.traders or trader_files(), args.data, args.repeat, args.filter)
+    baseline_path = args.compare
+    if baseline_path == "latest":
+        baseline_path = latest()
+        if baseline_path is None:
+            print(f"no saved results in {BENCH_DIR}/ to compare against")
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    path = save(report, args.save)
+    print(format_report(report, baseline))
+    print(f"saved {path}")
+
+    failed = False
+    slow = over_budget(report, args.budget_ms)
+    for name in slow:
+        print(f"FAIL: {name} over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if baseline is not None:
+        keys = ("host", "cpu", "python", "numpy")
+        changed = [k for k in keys if baseline["machine"].get(k) != report["machine"].get(k)]
+        if changed:
+            print(f"WARNING: baseline {baseline_path} is from a different setup ({', '.join(changed)})")
+        for name, before, after in compare(report, baseline, args.threshold):
+            print(f"FAIL: {name} regressed {before:.2f} -> {after:.2f} us (x{after / before:.2f})")
+            failed = True
+        if not failed:
+            print(f"no regressions beyond {args.threshold:.0%} or noise against {baseline_path}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
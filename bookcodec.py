@@ -0,0 +1,339 @@
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backtester import LEVELS, PriceData, Tick
+from datamodel import OrderDepth
+
+# Snapshot/delta encoding of order book history. A product's book is the
+# OrderDepth map price -> signed volume (bids > 0, asks < 0). Every
+# `interval` ticks each product's book is written in full; in between only
+# the prices whose signed volume changed are written, with 0 meaning the
+# level is gone. Everything is packed into flat integer arrays:
+#
+#   day, timestamp, tick_entries     per tick
+#   entry_product, entry_ops         per (tick, product present)
+#   op_price, op_volume              per changed level
+#   mid_index, mid_value             entries whose mid_price is not
+#                                    (best bid + best ask) / 2
+#
+# Each array uses the narrowest integer type its values fit: timestamps are
+# divided by their common step (100 on the exchange) and prices are stored
+# as offsets from a per-product base price.
+#
+# A snapshot tick is any tick index that is a multiple of `interval`; a
+# product's first appearance is always written in full as well. The
+# decoder keeps one OrderDepth per product and updates its dicts in place,
+# so replay allocates no books, and can start at any snapshot tick.
+
+DEFAULT_INTERVAL = 100
+FORMAT_VERSION = 1
+
+
+def _narrow(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=np.int64)
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if not len(values) or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values
+
+
+def _narrow_count(values) -> np.ndarray:
+    # Non-negative counts and codes, unsigned; a uint8 would wrap past 255
+    values = np.asarray(values, dtype=np.int64)
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if not len(values) or values.max() <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values
+
+
+def _mid(book: Dict[int, int]) -> float:
+    bids = [p for p, v in book.items() if v > 0]
+    asks = [p for p, v in book.items() if v < 0]
+    if bids and asks:
+        return (max(bids) + min(asks)) / 2
+    return float("nan")
+
+
+class BookDeltas:
+
+    def __init__(self, products: List[str], interval: int, day: np.ndarray, timestamp: np.ndarray,
+                 timestamp_step: int, tick_entries: np.ndarray, entry_product: np.ndarray, entry_ops: np.ndarray,
+                 price_base: np.ndarray, op_price: np.ndarray, op_volume: np.ndarray,
+                 mid_index: np.ndarray, mid_value: np.ndarray, levels: int = LEVELS):
+        self.products = products
+        self.levels = levels  # depth of the PriceData this was encoded from
+        self.interval = interval
+        self.day = day
+        self.timestamp = timestamp  # in units of timestamp_step
+        self.timestamp_step = timestamp_step
+        self.tick_entries = tick_entries
+        self.entry_product = entry_product
+        self.entry_ops = entry_ops
+        self.price_base = price_base  # per product
+        self.op_price = op_price  # offset from the product's price_base
+        self.op_volume = op_volume
+        self.mid_index = mid_index
+        self.mid_value = mid_value
+        # Where each tick's entries and ops start
+        self.entry_start = np.concatenate(([0], np.cumsum(tick_entries, dtype=np.int64)))
+        self.op_start = np.concatenate(([0], np.cumsum(entry_ops, dtype=np.int64)))
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.day, self.timestamp, self.tick_entries, self.entry_product,
+                                       self.entry_ops, self.price_base, self.op_price, self.op_volume,
+                                       self.mid_index, self.mid_value))
+
+    def timestamps(self) -> np.ndarray:
+        return self.timestamp.astype(np.int64) * self.timestamp_step
+
+    def prices(self) -> np.ndarray:
+        op_product = np.repeat(self.entry_product, self.entry_ops)
+        return self.op_price.astype(np.int64) + self.price_base[op_product]
+
+    @classmethod
+    def encode(cls, data: PriceData, interval: int = DEFAULT_INTERVAL) -> "BookDeltas":
+        bounds = data.tick_bounds().tolist()
+        day = data.day.tolist()
+        timestamp = data.timestamp.tolist()
+        product = data.product.tolist()
+        bid_price, bid_volume = data.bid_price.tolist(), data.bid_volume.tolist()
+        ask_price, ask_volume = data.ask_price.tolist(), data.ask_volume.tolist()
+        mid_price = data.mid_price.tolist()
+
+        previous: Dict[int, Dict[int, int]] = {}
+        ticks_day, ticks_ts, tick_entries = [], [], []
+        entry_product, entry_ops = [], []
+        op_price, op_volume = [], []
+        mid_index, mid_value = [], []
+        for t, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            ticks_day.append(day[start])
+            ticks_ts.append(timestamp[start])
+            tick_entries.append(end - start)
+            snapshot = t % interval == 0
+            for row in range(start, end):
+                code = product[row]
+                book = {}
+                for p, v in zip(bid_price[row], bid_volume[row]):
+                    if v:
+                        book[p] = v
+                for p, v in zip(ask_price[row], ask_volume[row]):
+                    if v:
+                        book[p] = -v
+                old = previous.get(code)
+                if snapshot or old is None:
+                    changes = sorted(book.items())
+                else:
+                    changes = sorted([(p, v) for p, v in book.items() if old.get(p) != v]
+                                     + [(p, 0) for p in old if p not in book])
+                previous[code] = book
+                entry_product.append(code)
+                entry_ops.append(len(changes))
+                for p, v in changes:
+                    op_price.append(p)
+                    op_volume.append(v)
+                mid = mid_price[row]
+                derived = _mid(book)
+                if not (mid == derived or (mid != mid and derived != derived)):
+                    mid_index.append(len(entry_product) - 1)
+                    mid_value.append(mid)
+
+        ticks_ts = np.asarray(ticks_ts, dtype=np.int64)
+        step = int(np.gcd.reduce(ticks_ts)) if len(ticks_ts) else 1
+        step = step or 1
+        entry_product = _narrow_count(entry_product)
+        entry_ops = _narrow_count(entry_ops)
+        op_price = np.asarray(op_price, dtype=np.int64)
+        op_product = np.repeat(entry_product, entry_ops)
+        price_base = np.zeros(len(data.products), dtype=np.int64)
+        if len(op_price):
+            # First price seen per product
+            first = np.unique(op_product, return_index=True)
+            price_base[first[0]] = op_price[first[1]]
+        return cls(
+            list(data.products), interval,
+            _narrow(ticks_day), _narrow(ticks_ts // step), step,
+            _narrow_count(tick_entries), entry_product, entry_ops,
+            price_base, _narrow(op_price - price_base[op_product]), _narrow(op_volume),
+            np.asarray(mid_index, dtype=np.int64), np.asarray(mid_value, dtype=np.float64),
+            data.bid_price.shape[1],
+        )
+
+    def save(self, path: str, compress: bool = False) -> None:
+        save = np.savez_compressed if compress else np.savez
+        save(path, version=FORMAT_VERSION, products=np.array(self.products), interval=self.interval,
+             day=self.day, timestamp=self.timestamp, timestamp_step=self.timestamp_step,
+             tick_entries=self.tick_entries, entry_product=self.entry_product, entry_ops=self.entry_ops,
+             price_base=self.price_base, op_price=self.op_price, op_volume=self.op_volume,
+             mid_index=self.mid_index, mid_value=self.mid_value, levels=self.levels)
+
+    @classmethod
+    def load(cls, path: str) -> "BookDeltas":
+        with np.load(path) as f:
+            if int(f["version"]) != FORMAT_VERSION:
+                raise ValueError(f"{path}: unsupported book codec version {int(f['version'])}")
+            return cls(
+                f["products"].tolist(), int(f["interval"]), f["day"], f["timestamp"], int(f["timestamp_step"]),
+                f["tick_entries"], f["entry_product"], f["entry_ops"], f["price_base"], f["op_price"],
+                f["op_volume"], f["mid_index"], f["mid_value"],
+                int(f["levels"]) if "levels" in f else LEVELS,
+            )
+
+    def replay(self, start: int = 0) -> Iterator[Tuple[int, int, Dict[str, OrderDepth], Dict[str, float]]]:
+        # Yields (day, timestamp, books, mids) from tick `start` on; decoding
+        # begins at the snapshot at or before it. The OrderDepths (and, while
+        # the set of products is unchanged, the dicts holding them) are reused
+        # between ticks: copy anything that must outlive the tick, and give
+        # traders that edit books in place a copy (e.g. batch.copy_order_depth).
+        first = start - start % self.interval
+        products = self.products
+        depths = [OrderDepth() for _ in products]
+        books: Dict[str, OrderDepth] = {}
+        mids: Dict[str, float] = {}
+        present: List[int] = []
+        overrides = dict(zip(self.mid_index.tolist(), self.mid_value.tolist()))
+
+        day = self.day.tolist()
+        timestamp = self.timestamps().tolist()
+        entry_start = self.entry_start.tolist()
+        op_start = self.op_start.tolist()
+        entry_product = self.entry_product.tolist()
+        base = op_start[entry_start[first]]
+        op_price = self.prices()[base:].tolist()
+        op_volume = self.op_volume[base:].tolist()
+        for t in range(first, len(day)):
+            lo, hi = entry_start[t], entry_start[t + 1]
+            codes = entry_product[lo:hi]
+            if codes != present:
+                present = codes
+                books = {products[c]: depths[c] for c in codes}
+                mids = {}
+            snapshot = t % self.interval == 0
+            for e, code in zip(range(lo, hi), codes):
+                depth = depths[code]
+                buy, sell = depth.buy_orders, depth.sell_orders
+                if snapshot:
+                    buy.clear()
+                    sell.clear()
+                a, b = op_start[e] - base, op_start[e + 1] - base
+                if a != b:
+                    for p, v in zip(op_price[a:b], op_volume[a:b]):
+                        if v > 0:
+                            buy[p] = v
+                            sell.pop(p, None)
+                        elif v < 0:
+                            sell[p] = v
+                            buy.pop(p, None)
+                        else:
+                            buy.pop(p, None)
+                            sell.pop(p, None)
+                    # Keep best-first insertion order, as the exchange's dicts have
+                    if len(buy) > 1:
+                        items = sorted(buy.items(), reverse=True)
+                        buy.clear()
+                        buy.update(items)
+                    if len(sell) > 1:
+                        items = sorted(sell.items())
+                        sell.clear()
+                        sell.update(items)
+                mid = overrides.get(e)
+                if mid is None:
+                    mid = (next(iter(buy)) + next(iter(sell))) / 2 if buy and sell else float("nan")
+                mids[products[code]] = mid
+            if t >= start:
+                yield day[t], timestamp[t], books, mids
+
+    def ticks(self, start: int = 0) -> Iterator[Tick]:
+        # Backtester ticks; these copy the levels out of the in-place books
+        for day, timestamp, books, mids in self.replay(start):
+            levels = {}
+            for symbol, depth in books.items():
+                levels[symbol] = (list(depth.buy_orders), list(depth.buy_orders.values()),
+                                  list(depth.sell_orders), [-v for v in depth.sell_orders.values()])
+            yield Tick(day, timestamp, levels, dict(mids), {})
+
+    def price_data(self) -> PriceData:
+        # Back to row arrays (profit_and_loss is not stored and comes back as 0)
+        n = int(self.entry_start[-1])
+        rows = {name: np.zeros((n, self.levels), dtype=np.int32)
+                for name in ("bid_price", "bid_volume", "ask_price", "ask_volume")}
+        day = np.repeat(self.day.astype(np.int64), self.tick_entries)
+        timestamp = np.repeat(self.timestamps(), self.tick_entries)
+        mid_price = np.zeros(n)
+        row = 0
+        for _, _, books, mids in self.replay():
+            for symbol, depth in books.items():
+                for side, levels, sign in (("bid", depth.buy_orders, 1), ("ask", depth.sell_orders, -1)):
+                    for i, (p, v) in enumerate(list(levels.items())[:self.levels]):
+                        rows[f"{side}_price"][row, i] = p
+                        rows[f"{side}_volume"][row, i] = sign * v
+                mid_price[row] = mids[symbol]
+                row += 1
+        return PriceData(list(self.products), day, timestamp, self.entry_product.astype(np.int16),
+                         rows["bid_price"], rows["bid_volume"], rows["ask_price"], rows["ask_volume"],
+                         mid_price, np.zeros(n))
+
+
+def encode_file(csv_path: str, out_path: str, interval: int = DEFAULT_INTERVAL, compress: bool = False) -> BookDeltas:
+    from backtester import load_prices
+    deltas = BookDeltas.encode(load_prices(csv_path), interval)
+    deltas.save(out_path, compress)
+    return deltas
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    import os
+    import tracemalloc
+    from backtester import build_order_depth, load_prices
+
+    parser = argparse.ArgumentParser(description="Encode a prices file as book snapshots + deltas and compare replay")
+    parser.add_argument("data", nargs="?", default="data.csv")
+    parser.add_argument("out", nargs="?", default=None, help="output .npz (default: <data>.books.npz)")
+    parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL)
+    parser.add_argument("--compress", action="store_true", help="zlib-compress the .npz")
+    args = parser.parse_args(argv)
+    out = args.out or os.path.splitext(args.data)[0] + ".books.npz"
+
+    data = load_prices(args.data)
+    deltas = encode_file(args.data, out, args.interval, args.compress)
+    deltas = BookDeltas.load(out)
+    book_bytes = sum(a.nbytes for a in (data.bid_price, data.bid_volume, data.ask_price, data.ask_volume))
+    print(f"{len(deltas)} ticks, {len(deltas.entry_product)} books, {len(deltas.op_price)} level changes "
+          f"({len(deltas.op_price) / max(len(deltas.entry_product), 1):.2f} per book), snapshot every {deltas.interval}")
+    print(f"csv {os.path.getsize(args.data)} B, level arrays {book_bytes} B, "
+          f"deltas {deltas.nbytes} B in memory / {os.path.getsize(out)} B on disk "
+          f"({book_bytes / deltas.nbytes:.1f}x smaller than the level arrays)")
+
+    decoded = deltas.price_data()
+    for name in ("bid_price", "bid_volume", "ask_price", "ask_volume", "mid_price", "day", "timestamp", "product"):
+        assert np.array_equal(getattr(decoded, name), getattr(data, name)), name
+
+    def rebuild():
+        for tick in data.ticks():
+            {p: build_order_depth(lv) for p, lv in tick.levels.items()}
+
+    def in_place():
+        for _ in deltas.replay():
+            pass
+
+    for name, fn in (("rebuild OrderDepths", rebuild), ("in-place replay", in_place)):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:>20}: {elapsed * 1e3:7.1f} ms, {elapsed / len(deltas) * 1e6:5.1f} us/tick, "
+              f"peak traced {peak / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
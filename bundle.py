@@ -0,0 +1,120 @@
+import ast
+import os
+from typing import Dict, List, Optional
+
+# Single-file upload builder. The exchange takes one Python file, but the
+# traders import repo modules (state_codec, rolling, tradelog, strategy, ...).
+# bundle() follows a trader's module-level imports of repo modules,
+# recursively, and writes one file that registers each dependency in
+# sys.modules from its embedded source, dependencies first, followed by the
+# trader's own source unchanged. Imports inside functions and __main__
+# blocks (research or CLI helpers) are not followed, and datamodel is left
+# to the exchange.
+
+BUNDLE_DIR = "build"
+PROVIDED = {"datamodel"}
+
+HEADER = '''import sys as _sys
+import types as _types
+
+
+def _bundled_module(name, source):
+    module = _types.ModuleType(name)
+    module.__file__ = "<bundled " + name + ">"
+    _sys.modules[name] = module
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+'''
+
+
+def _is_main_guard(node: ast.If) -> bool:
+    test = node.test
+    return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "__name__"
+            and len(test.comparators) == 1 and isinstance(test.comparators[0], ast.Constant)
+            and test.comparators[0].value == "__main__")
+
+
+def module_imports(source: str) -> List[str]:
+    # Top-level module names imported at module level, including inside
+    # module-level if/try blocks but not `if __name__ == "__main__":`
+    names = []
+    pending = list(ast.parse(source).body)
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, ast.Import):
+            names.extend(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module.split(".")[0])
+        elif isinstance(node, ast.If) and _is_main_guard(node):
+            continue
+        elif isinstance(node, (ast.If, ast.Try)):
+            pending.extend(node.body + node.orelse + getattr(node, "finalbody", []))
+            for handler in getattr(node, "handlers", []):
+                pending.extend(handler.body)
+    return names
+
+
+def dependencies(trader_path: str, root: Optional[str] = None) -> Dict[str, str]:
+    # Repo modules the trader needs, name -> source, in import order
+    # (every module after the modules it imports)
+    root = root or os.path.dirname(os.path.abspath(trader_path))
+    ordered: Dict[str, str] = {}
+    visiting = set()
+
+    def visit(source: str) -> None:
+        for name in module_imports(source):
+            path = os.path.join(root, name + ".py")
+            if name in PROVIDED or name in ordered or not os.path.exists(path):
+                continue
+            if name in visiting:
+                raise ValueError(f"Circular import involving {name!r}")
+            visiting.add(name)
+            with open(path) as f:
+                module_source = f.read()
+            visit(module_source)
+            visiting.discard(name)
+            ordered[name] = module_source
+
+    with open(trader_path) as f:
+        visit(f.read())
+    return ordered
+
+
+def bundle(trader_path: str, out_path: Optional[str] = None) -> str:
+    with open(trader_path) as f:
+        trader_source = f.read()
+    modules = dependencies(trader_path)
+    parts = [HEADER]
+    for name, source in modules.items():
+        parts.append(f"_bundled_module({name!r}, {source!r})\n")
+    parts.append(f"\n# ---- {os.path.basename(trader_path)} ----\n\n")
+    parts.append(trader_source)
+    if out_path is None:
+        stem = os.path.splitext(os.path.basename(trader_path))[0]
+        out_path = os.path.join(BUNDLE_DIR, f"{stem}.upload.py")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w") as f:
+        f.write("".join(parts))
+    return out_path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inline a trader's repo-module imports into one upload file")
+    parser.add_argument("traders", nargs="+")
+    parser.add_argument("-o", "--out", help=f"output file (one trader only; default {BUNDLE_DIR}/<name>.upload.py)")
+    args = parser.parse_args(argv)
+    if args.out and len(args.traders) > 1:
+        parser.error("--out takes a single trader")
+
+    for trader in args.traders:
+        path = bundle(trader, args.out)
+        modules = list(dependencies(trader))
+        print(f"{trader} -> {path} ({os.path.getsize(path) / 1024:.1f} KiB, "
+              f"inlined: {', '.join(modules) if modules else 'nothing'})")
+
+
+if __name__ == "__main__":
+    main()
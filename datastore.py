@@ -0,0 +1,209 @@
+import json
+import os
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtester import LEVELS, PriceData, Tick, frame_levels
+from datamodel import OrderDepth
+
+# On-disk layout (one directory per dataset):
+#   meta.json        products, row counts, per-product row offsets, column dtypes
+#   <column>.npy     one array per column, rows sorted by (product, day, timestamp)
+#   time_index.npy   row permutation that sorts by (day, timestamp, product)
+#   replay/          the backtester's PriceData columns in (day, timestamp,
+#                    product) order, with each book side as one (rows, levels)
+#                    array
+# Because rows are grouped by product, every per-product / per-time-range read
+# is a slice of a memory-mapped array, i.e. a zero-copy view. The replay copy
+# lets price_data() map the files as they are instead of gathering rows
+# through time_index, so processes replaying one store (sweep workers) share
+# its pages. It doubles the size of the level data on disk.
+
+FORMAT_VERSION = 1
+
+
+def level_columns(levels: int = LEVELS) -> List[str]:
+    return [f"{side}_{kind}_{i}" for i in range(1, levels + 1) for side in ("bid", "ask") for kind in ("price", "volume")]
+
+
+def column_dtypes(levels: int = LEVELS) -> Dict[str, str]:
+    return {
+        "day": "int64",
+        "timestamp": "int64",
+        "clock": "int64",
+        "product": "int16",
+        **{name: "int32" for name in level_columns(levels)},
+        "mid_price": "float64",
+        "profit_and_loss": "float64",
+    }
+
+
+LEVEL_COLUMNS = level_columns()
+COLUMN_DTYPES = column_dtypes()
+REPLAY_DIR = "replay"
+REPLAY_COLUMNS = ("day", "timestamp", "product", "mid_price", "profit_and_loss")
+SIDES = ("bid_price", "bid_volume", "ask_price", "ask_volume")
+# Timestamps within a day stay far below this, so clock is monotonic in (day, timestamp)
+DAY_SPAN = 1_000_000_000
+
+
+def clock(day: int, timestamp: int) -> int:
+    return day * DAY_SPAN + timestamp
+
+
+def convert(csv_path: str, out_dir: str) -> "MarketStore":
+    df = pd.read_csv(csv_path, sep=";")
+    return write_frame(df, out_dir)
+
+
+def write_frame(df: pd.DataFrame, out_dir: str) -> "MarketStore":
+    os.makedirs(out_dir, exist_ok=True)
+    codes, products = pd.factorize(df["product"], sort=True)
+    df = df.assign(product=codes.astype(np.int16))
+    df["clock"] = df["day"].astype(np.int64) * DAY_SPAN + df["timestamp"].astype(np.int64)
+    df = df.sort_values(["product", "clock"], kind="stable").reset_index(drop=True)
+
+    levels = frame_levels(df.columns)
+    dtypes = column_dtypes(levels)
+    columns = {}
+    for name, dtype in dtypes.items():
+        values = df[name] if name in df else pd.Series(0, index=df.index)
+        if dtype.startswith("int"):
+            values = values.fillna(0)
+        columns[name] = values.to_numpy(dtype=dtype)
+        np.save(os.path.join(out_dir, name + ".npy"), columns[name])
+
+    time_index = np.lexsort((df["product"].to_numpy(), df["clock"].to_numpy())).astype(np.int64)
+    np.save(os.path.join(out_dir, "time_index.npy"), time_index)
+
+    os.makedirs(os.path.join(out_dir, REPLAY_DIR), exist_ok=True)
+    for name in REPLAY_COLUMNS:
+        np.save(os.path.join(out_dir, REPLAY_DIR, name + ".npy"), columns[name][time_index])
+    for name in SIDES:
+        side = np.stack([columns[f"{name}_{i}"] for i in range(1, levels + 1)], axis=1)
+        np.save(os.path.join(out_dir, REPLAY_DIR, name + ".npy"), side[time_index])
+
+    counts = np.bincount(codes, minlength=len(products))
+    offsets = np.concatenate(([0], np.cumsum(counts))).tolist()
+    meta = {
+        "version": FORMAT_VERSION,
+        "rows": int(len(df)),
+        "levels": levels,
+        "products": list(products),
+        "offsets": offsets,
+        "columns": dtypes,
+        "replay": True,
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    return MarketStore(out_dir)
+
+
+class MarketStore:
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported store version {meta.get('version')} in {path}")
+        self.rows: int = meta["rows"]
+        self.levels: int = meta["levels"]
+        self.products: List[str] = meta["products"]
+        self.offsets: List[int] = meta["offsets"]
+        self.column_dtypes: Dict[str, str] = meta["columns"]
+        self.has_replay: bool = meta.get("replay", False)
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str) -> np.ndarray:
+        # Mapped on first use, so opening a store only reads meta.json
+        array = self._columns.get(name)
+        if array is None:
+            if name != "time_index" and name not in self.column_dtypes:
+                raise KeyError(name)
+            array = np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+            self._columns[name] = array
+        return array
+
+    def replay_column(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, REPLAY_DIR, name + ".npy"), mmap_mode="r")
+
+    def product_rows(self, product: str, start: Optional[int] = None, end: Optional[int] = None) -> slice:
+        # Row range for product, optionally restricted to start <= clock < end
+        code = self.products.index(product)
+        lo, hi = self.offsets[code], self.offsets[code + 1]
+        if start is None and end is None:
+            return slice(lo, hi)
+        clocks = self.column("clock")[lo:hi]
+        first = lo + (int(np.searchsorted(clocks, start, "left")) if start is not None else 0)
+        last = lo + (int(np.searchsorted(clocks, end, "left")) if end is not None else hi - lo)
+        return slice(first, last)
+
+    def view(self, name: str, product: str, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        return self.column(name)[self.product_rows(product, start, end)]
+
+    def views(self, product: str, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        rows = self.product_rows(product, start, end)
+        return {name: self.column(name)[rows] for name in self.column_dtypes}
+
+    def order_depth(self, row: int) -> OrderDepth:
+        depth = OrderDepth()
+        for i in range(1, self.levels + 1):
+            volume = int(self.column(f"bid_volume_{i}")[row])
+            if volume:
+                depth.buy_orders[int(self.column(f"bid_price_{i}")[row])] = volume
+            volume = int(self.column(f"ask_volume_{i}")[row])
+            if volume:
+                depth.sell_orders[int(self.column(f"ask_price_{i}")[row])] = -volume
+        return depth
+
+    def side(self, name: str, rows=slice(None)) -> np.ndarray:
+        # (rows, levels) matrix for e.g. name="bid_price"; this one copies
+        return np.stack([self.column(f"{name}_{i}")[rows] for i in range(1, self.levels + 1)], axis=1)
+
+    def price_data(self) -> PriceData:
+        # Time-ordered PriceData over the memory-mapped replay columns; stores
+        # written without them are gathered into a copy through time_index
+        if self.has_replay:
+            return PriceData(list(self.products), **{name: self.replay_column(name)
+                                                     for name in REPLAY_COLUMNS + SIDES})
+        order = np.asarray(self.column("time_index"))
+        return PriceData(
+            products=list(self.products),
+            day=self.column("day")[order],
+            timestamp=self.column("timestamp")[order],
+            product=self.column("product")[order],
+            bid_price=self.side("bid_price", order),
+            bid_volume=self.side("bid_volume", order),
+            ask_price=self.side("ask_price", order),
+            ask_volume=self.side("ask_volume", order),
+            mid_price=self.column("mid_price")[order],
+            profit_and_loss=self.column("profit_and_loss")[order],
+        )
+
+    def ticks(self) -> Iterator[Tick]:
+        return self.price_data().ticks()
+
+
+def open_store(path: str) -> MarketStore:
+    return MarketStore(path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a prices CSV into a memory-mapped column store")
+    parser.add_argument("csv")
+    parser.add_argument("out_dir")
+    args = parser.parse_args(argv)
+    store = convert(args.csv, args.out_dir)
+    print(f"Wrote {store.rows} rows for {', '.join(store.products)} to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import json
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+import jsonpickle
+
+import datamodel
+from datamodel import Product, Symbol, Time, UserId, Position
+
+# __slots__ versions of the datamodel classes for the backtester, which
+# builds millions of them per sweep. They keep the same constructor
+# signatures, attributes and str/repr, so strategy code cannot tell them
+# apart, but they carry no per-instance __dict__. Pass fastmodel as the
+# backtester's `model` to use them.
+
+
+class Listing:
+    __slots__ = ("symbol", "product", "denomination")
+
+    def __init__(self, symbol: Symbol, product: Product, denomination: Product):
+        self.symbol = symbol
+        self.product = product
+        self.denomination = denomination
+
+
+class ConversionObservation:
+    __slots__ = ("bidPrice", "askPrice", "transportFees", "exportTariff", "importTariff", "sugarPrice",
+                 "sunlightIndex")
+
+    def __init__(self, bidPrice: float, askPrice: float, transportFees: float, exportTariff: float,
+                 importTariff: float, sugarPrice: float, sunlightIndex: float):
+        self.bidPrice = bidPrice
+        self.askPrice = askPrice
+        self.transportFees = transportFees
+        self.exportTariff = exportTariff
+        self.importTariff = importTariff
+        self.sugarPrice = sugarPrice
+        self.sunlightIndex = sunlightIndex
+
+
+class Observation:
+    __slots__ = ("plainValueObservations", "conversionObservations")
+
+    def __init__(self, plainValueObservations: Dict[Product, int],
+                 conversionObservations: Dict[Product, ConversionObservation]) -> None:
+        self.plainValueObservations = plainValueObservations
+        self.conversionObservations = conversionObservations
+
+    def __str__(self) -> str:
+        return ("(plainValueObservations: " + jsonpickle.encode(self.plainValueObservations)
+                + ", conversionObservations: " + jsonpickle.encode(self.conversionObservations) + ")")
+
+
+class Order:
+    __slots__ = ("symbol", "price", "quantity")
+
+    def __init__(self, symbol: Symbol, price: int, quantity: int) -> None:
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+
+    def __str__(self) -> str:
+        return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
+
+    __repr__ = __str__
+
+
+class OrderDepth:
+    __slots__ = ("buy_orders", "sell_orders")
+
+    def __init__(self):
+        self.buy_orders: Dict[int, int] = {}
+        self.sell_orders: Dict[int, int] = {}
+
+
+class Trade:
+    __slots__ = ("symbol", "price", "quantity", "buyer", "seller", "timestamp")
+
+    def __init__(self, symbol: Symbol, price: int, quantity: int, buyer: UserId = None, seller: UserId = None,
+                 timestamp: int = 0) -> None:
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+        self.buyer = buyer
+        self.seller = seller
+        self.timestamp = timestamp
+
+    def __str__(self) -> str:
+        return ("(" + self.symbol + ", " + self.buyer + " << " + self.seller + ", " + str(self.price) + ", "
+                + str(self.quantity) + ", " + str(self.timestamp) + ")")
+
+    __repr__ = __str__
+
+
+class TradingState:
+    __slots__ = ("traderData", "timestamp", "listings", "order_depths", "own_trades", "market_trades",
+                 "position", "observations")
+
+    def __init__(self,
+                 traderData: str,
+                 timestamp: Time,
+                 listings: Dict[Symbol, Listing],
+                 order_depths: Dict[Symbol, OrderDepth],
+                 own_trades: Dict[Symbol, List[Trade]],
+                 market_trades: Dict[Symbol, List[Trade]],
+                 position: Dict[Product, Position],
+                 observations: Observation):
+        self.traderData = traderData
+        self.timestamp = timestamp
+        self.listings = listings
+        self.order_depths = order_depths
+        self.own_trades = own_trades
+        self.market_trades = market_trades
+        self.position = position
+        self.observations = observations
+
+    def toJSON(self):
+        return encode_state(self)
+
+
+# State encoder. The __slots__ classes have no __dict__ for toJSON's
+# `default` hook, so encode_state reads the attributes explicitly into plain
+# dicts, already in sorted key order, and makes one json.dumps call. The
+# output is identical to TradingState.toJSON() and works for datamodel and
+# fastmodel objects alike. It is not faster than toJSON (both spend their
+# time in the C encoder); it exists so the slots classes can be encoded.
+
+_encode = json.JSONEncoder(check_circular=False).encode
+
+
+def _trades(trades: Dict[Symbol, list]) -> dict:
+    return {
+        symbol: [{"buyer": t.buyer, "price": t.price, "quantity": t.quantity, "seller": t.seller,
+                  "symbol": t.symbol, "timestamp": t.timestamp} for t in trades[symbol]]
+        for symbol in sorted(trades)
+    }
+
+
+def _observation(value):
+    if isinstance(value, dict):
+        return {k: _observation(value[k]) for k in sorted(value)}
+    names = getattr(type(value), "__slots__", None)
+    if names is None and hasattr(value, "__dict__"):
+        names = list(vars(value))
+    if names is not None:
+        return {name: _observation(getattr(value, name)) for name in sorted(names)}
+    return value
+
+
+def encode_state(state) -> str:
+    listings = state.listings
+    depths = state.order_depths
+    observations = state.observations
+    if observations is not None:
+        observations = {
+            "conversionObservations": _observation(observations.conversionObservations),
+            "plainValueObservations": _observation(observations.plainValueObservations),
+        }
+    return _encode({
+        "listings": {s: {"denomination": listings[s].denomination, "product": listings[s].product,
+                         "symbol": listings[s].symbol} for s in sorted(listings)},
+        "market_trades": _trades(state.market_trades),
+        "observations": observations,
+        "order_depths": {s: {"buy_orders": dict(sorted(depths[s].buy_orders.items())),
+                             "sell_orders": dict(sorted(depths[s].sell_orders.items()))} for s in sorted(depths)},
+        "own_trades": _trades(state.own_trades),
+        "position": {p: state.position[p] for p in sorted(state.position)},
+        "timestamp": state.timestamp,
+        "traderData": state.traderData,
+    })
+
+
+def encode_orders(orders: Dict[Symbol, list]) -> str:
+    # Compact [[symbol, price, quantity], ...] replacement for ProsperityEncoder
+    return json.dumps([[o.symbol, o.price, o.quantity] for symbol in orders for o in orders[symbol]],
+                      separators=(",", ":"))
+
+
+def benchmark(path: str = "data.csv", repeat: int = 3) -> None:
+    # Builds the full replay's TradingStates with both models and compares
+    # construction time, retained memory per state and JSON encoding
+    # (toJSON for datamodel, encode_state for fastmodel)
+    from backtester import load_prices
+
+    ticks = list(load_prices(path).ticks())
+
+    def build(model):
+        states = []
+        own: Dict[str, list] = {}
+        for tick in ticks:
+            depths = {}
+            for product, (bp, bv, ap, av) in tick.levels.items():
+                depth = model.OrderDepth()
+                for p, v in zip(bp, bv):
+                    depth.buy_orders[p] = v
+                for p, v in zip(ap, av):
+                    depth.sell_orders[p] = -v
+                depths[product] = depth
+            listings = {p: model.Listing(p, p, "SEASHELLS") for p in depths}
+            own = {p: [model.Trade(p, bp[0], 1, "SUBMISSION", "", tick.timestamp)]
+                   for p, (bp, bv, ap, av) in tick.levels.items() if bp}
+            states.append(model.TradingState("", tick.timestamp, listings, depths, own, {}, {p: 0 for p in depths},
+                                             model.Observation({}, {})))
+        return states
+
+    print(f"{len(ticks)} states from {path}")
+    for name, model in (("datamodel", datamodel), ("fastmodel", sys.modules[__name__])):
+        best = min(_timed(lambda: build(model)) for _ in range(repeat))
+        tracemalloc.start()
+        states = build(model)
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        if model is datamodel:
+            encode = lambda: [s.toJSON() for s in states]
+        else:
+            encode = lambda: [encode_state(s) for s in states]
+        encode_time = min(_timed(encode) for _ in range(repeat))
+        order = model.Order("KELP", 2028, 5)
+        trade = model.Trade("KELP", 2028, 5, "A", "B", 0)
+        print(f"{name:>10}: build {best * 1e3:7.1f} ms, {retained / len(states):7.0f} B/state retained, "
+              f"encode {encode_time * 1e3:7.1f} ms, Order {_deep_size(order)} B, Trade {_deep_size(trade)} B")
+    for state in build(datamodel)[::97]:
+        assert encode_state(state) == state.toJSON()
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _deep_size(obj) -> int:
+    # Instance plus its __dict__, if it has one
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,237 @@
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from datamodel import Order, Trade
+
+# Exchange rules from notes.md, applied per product per tick:
+#   1. if the orders could push the position past the limit in either
+#      direction, all of them are rejected;
+#   2. marketable quantity executes immediately against the bots' book;
+#   3. the unmatched remainder rests as our quote until the next tick and
+#      is then cancelled. Whether bots trade against it in between is up to
+#      a pluggable FillModel, evaluated when the next tick arrives.
+#
+# Books are the backtester's Levels tuples: (bid prices, bid volumes, ask
+# prices, ask volumes) as plain int lists, best level first, volumes > 0.
+
+Levels = Tuple[List[int], List[int], List[int], List[int]]
+
+
+class Fill(NamedTuple):
+    price: int
+    quantity: int  # signed, > 0 for buys
+    passive: bool
+
+
+class Quote:
+    # A resting remainder. queue_ahead is the bot volume already quoted at
+    # the same price when we joined, which trades at our price fill first.
+    __slots__ = ("price", "remaining", "queue_ahead", "mid")
+
+    def __init__(self, price: int, remaining: int, queue_ahead: int, mid: float):
+        self.price = price
+        self.remaining = remaining  # signed like the order
+        self.queue_ahead = queue_ahead
+        self.mid = mid
+
+    def __repr__(self) -> str:
+        return f"Quote({self.price}, {self.remaining}, queue_ahead={self.queue_ahead})"
+
+
+class FillModel:
+    # Returns the signed passive fills for our quotes on one product, given
+    # the book and market trades of the tick that follows their placement
+
+    def fills(self, quotes: List[Quote], levels: Levels, market_trades: List[Trade]) -> List[Fill]:
+        return []
+
+
+class NoPassiveFills(FillModel):
+    pass
+
+
+def _fill(quote: Quote, quantity: int, out: List[Fill]) -> None:
+    if quantity <= 0:
+        return
+    quantity = min(quantity, abs(quote.remaining))
+    if quantity <= 0:
+        return
+    signed = quantity if quote.remaining > 0 else -quantity
+    quote.remaining -= signed
+    out.append(Fill(quote.price, signed, True))
+
+
+class TradeThroughFills(FillModel):
+    # A quote fills when the next book crosses strictly through it: a new
+    # best ask below our bid (or best bid above our ask) would have traded
+    # with us first. Fill size is the volume priced through our quote.
+
+    def fills(self, quotes: List[Quote], levels: Levels, market_trades: List[Trade]) -> List[Fill]:
+        bp, bv, ap, av = levels
+        out: List[Fill] = []
+        for quote in quotes:
+            if quote.remaining > 0:
+                volume = sum(v for p, v in zip(ap, av) if p < quote.price)
+            else:
+                volume = sum(v for p, v in zip(bp, bv) if p > quote.price)
+            _fill(quote, volume, out)
+        return out
+
+
+class ProbabilisticFills(FillModel):
+    # Each quote fills completely with probability
+    #   intensity * exp(-distance_from_mid / scale)
+    # where the distance is measured against the mid at placement.
+
+    def __init__(self, intensity: float = 0.2, scale: float = 1.0, seed: int = 0):
+        self.intensity = intensity
+        self.scale = scale
+        self.rng = np.random.default_rng(seed)
+
+    def fills(self, quotes: List[Quote], levels: Levels, market_trades: List[Trade]) -> List[Fill]:
+        if not quotes:
+            return []
+        draws = self.rng.random(len(quotes))
+        out: List[Fill] = []
+        for quote, draw in zip(quotes, draws.tolist()):
+            distance = abs(quote.price - quote.mid) if not math.isnan(quote.mid) else 0.0
+            if draw < self.intensity * math.exp(-distance / self.scale):
+                _fill(quote, abs(quote.remaining), out)
+        return out
+
+
+class MarketTradeFills(FillModel):
+    # Replays the bots' market trades against our quotes. A trade strictly
+    # through our price fills us first; a trade at our price only fills what
+    # is left after the queue ahead of us has been consumed.
+    #
+    # Trades don't say who was the aggressor, so it is inferred from the
+    # price: below the reference mid a seller hit the bids, above it a buyer
+    # lifted the asks, and only that side of our quotes can fill. The
+    # reference is the mid our quotes were placed at, or this tick's touch
+    # if that is unknown. A trade at the mid may fill either side, but its
+    # volume is only used once.
+
+    def fills(self, quotes: List[Quote], levels: Levels, market_trades: List[Trade]) -> List[Fill]:
+        out: List[Fill] = []
+        if not market_trades or not quotes:
+            return out
+        mid = quotes[0].mid
+        if math.isnan(mid):
+            bp, _, ap, _ = levels
+            mid = (bp[0] + ap[0]) / 2 if bp and ap else math.nan
+        # Better-priced quotes first: they would be hit before ours behind them
+        bids = sorted((q for q in quotes if q.remaining > 0), key=lambda q: -q.price)
+        asks = sorted((q for q in quotes if q.remaining < 0), key=lambda q: q.price)
+        for trade in market_trades:
+            volume = trade.quantity
+            if not trade.price > mid:
+                for quote in bids:
+                    if volume <= 0 or trade.price > quote.price:
+                        break
+                    if trade.price == quote.price:
+                        used = min(volume, quote.queue_ahead)
+                        quote.queue_ahead -= used
+                        volume -= used
+                    before = quote.remaining
+                    _fill(quote, volume, out)
+                    volume -= before - quote.remaining
+            if not trade.price < mid:
+                for quote in asks:
+                    if volume <= 0 or trade.price < quote.price:
+                        break
+                    if trade.price == quote.price:
+                        used = min(volume, quote.queue_ahead)
+                        quote.queue_ahead -= used
+                        volume -= used
+                    before = quote.remaining
+                    _fill(quote, volume, out)
+                    volume -= quote.remaining - before
+        return out
+
+
+FILL_MODELS = {
+    "none": NoPassiveFills,
+    "trade-through": TradeThroughFills,
+    "probabilistic": ProbabilisticFills,
+    "market-trades": MarketTradeFills,
+}
+
+
+class MatchingEngine:
+
+    def __init__(self, fill_model: Optional[FillModel] = None):
+        self.fill_model = fill_model or NoPassiveFills()
+        self.resting: Dict[str, List[Quote]] = {}
+
+    def reset(self) -> None:
+        self.resting = {}
+
+    def execute(self, product: str, levels: Levels, orders: List[Order],
+                position: int, limit: int, mid: float = math.nan) -> List[Fill]:
+        total_buy = 0
+        total_sell = 0
+        for order in orders:
+            if order.quantity > 0:
+                total_buy += order.quantity
+            else:
+                total_sell -= order.quantity
+        if position + total_buy > limit or position - total_sell < -limit:
+            return []
+
+        bp, bv, ap, av = levels
+        bid_volume = list(bv)
+        ask_volume = list(av)
+        fills: List[Fill] = []
+        quotes: List[Quote] = []
+        for order in orders:
+            if order.quantity > 0:
+                remaining = order.quantity
+                for i, price in enumerate(ap):
+                    if price > order.price or remaining == 0:
+                        break
+                    qty = min(remaining, ask_volume[i])
+                    if qty > 0:
+                        ask_volume[i] -= qty
+                        remaining -= qty
+                        fills.append(Fill(price, qty, False))
+                if remaining:
+                    queue = sum(v for p, v in zip(bp, bid_volume) if p == order.price)
+                    quotes.append(Quote(order.price, remaining, queue, mid))
+            elif order.quantity < 0:
+                remaining = -order.quantity
+                for i, price in enumerate(bp):
+                    if price < order.price or remaining == 0:
+                        break
+                    qty = min(remaining, bid_volume[i])
+                    if qty > 0:
+                        bid_volume[i] -= qty
+                        remaining -= qty
+                        fills.append(Fill(price, -qty, False))
+                if remaining:
+                    queue = sum(v for p, v in zip(ap, ask_volume) if p == order.price)
+                    quotes.append(Quote(order.price, -remaining, queue, mid))
+        if quotes:
+            self.resting[product] = quotes
+        return fills
+
+    def settle(self, levels: Dict[str, Levels], market_trades: Dict[str, List[Trade]]) -> Dict[str, List[Fill]]:
+        # Passive fills for last tick's quotes against this tick's book and
+        # trades; all quotes are cancelled afterwards
+        fills = {}
+        empty: Levels = ([], [], [], [])
+        for product, quotes in self.resting.items():
+            product_fills = self.fill_model.fills(quotes, levels.get(product, empty), market_trades.get(product, []))
+            if product_fills:
+                fills[product] = product_fills
+        self.resting = {}
+        return fills
+
+    def quotes(self) -> Dict[str, List[Quote]]:
+        return self.resting
+
+
+def make_engine(name: str = "none", **kwargs) -> MatchingEngine:
+    return MatchingEngine(FILL_MODELS[name](**kwargs))
@@ -1,46 +1,44 @@
-import numpy as np
-import statistics
-import jsonpickle
 from typing import Dict, List
-from datamodel import OrderDepth, TradingState, Order, Trade
-
+from datamodel import OrderDepth, TradingState, Order
+from state_codec import encode, decode
+from rolling import RollingVariance
+import orderbook
+from tradelog import TradeLogger, OPEN, CLOSE, INCREASE
+from strategy import log_state
 
 class Trader:
+    RESIN_LO = 9999
+    RESIN_HI = 10001
+    WINDOW = 5
+    INVENTORY_LIMIT = 40
+    LIQUIDATION_WINDOW = 200
+
     def __init__(self):
-        self.traderData = jsonpickle.encode({
-            "RAINFOREST_RESIN_mid": [],
-            "KELP_mid": [],
-            "KELP_spreads": [],
-        })
+        self.logger = TradeLogger()
+        self.handlers = {
+            "RAINFOREST_RESIN": self.process_resin,
+            "KELP": self.process_kelp,
+        }
+        self.traderData = encode(self.initial_data())
+
+    def initial_data(self) -> dict:
+        return {
+            "KELP_mid_var": RollingVariance(self.WINDOW),
+        }
 
     def run(self, state: TradingState):
         conversions = 0
         if state.traderData:
-            data = jsonpickle.decode(state.traderData)
+            data = decode(state.traderData)
         else:
-            data = {
-                "RAINFOREST_RESIN_mid": [],
-                "KELP_mid": [],
-                "KELP_spreads": [],
-                }
+            data = self.initial_data()
 
         result = {}
-        for product in ["RAINFOREST_RESIN", "KELP"]:
+        for product, handler in self.handlers.items():
             if product in state.order_depths:
                 order_depth = state.order_depths[product]
-                best_bid, best_ask = self.get_best_prices(order_depth)
-                mid_price = (best_bid + best_ask) / 2 if best_bid and best_ask else None
-                data[f"{product}_mid"].append(mid_price) if mid_price else None
                 position = state.position.get(product, 0)
-                if product == "KELP":
-                    spread = best_ask - best_bid if best_bid and best_ask else None
-                    data["KELP_spreads"].append(spread) if spread else None
-                # Generate orders
-                if product == "RAINFOREST_RESIN":
-                    orders = self.process_resin(order_depth, position, data)
-                else:
-                    orders = self.process_kelp(order_depth, position, data)
-                result[product] = orders
+                result[product] = handler(order_depth, position, data)
 
         # Close positions if time is running out
         self.close_positions(state, data, result)
@@ -48,18 +46,15 @@ class Trader:
         # Logging
         self.log(state, data)
 
-        new_trader_data = jsonpickle.encode(data)
+        self.logger.flush(state.timestamp)
+        new_trader_data = encode(data)
         return result, conversions, new_trader_data
 
     def get_best_prices(self, order_depth: OrderDepth):
-        best_bid = max(order_depth.buy_orders.keys()) if order_depth.buy_orders else None
-        best_ask = min(order_depth.sell_orders.keys()) if order_depth.sell_orders else None
-        return best_bid, best_ask
+        return orderbook.best_bid(order_depth), orderbook.best_ask(order_depth)
 
     def get_farthest_price(self, order_depth: OrderDepth):
-        far_bid = min(order_depth.buy_orders.keys()) if order_depth.buy_orders else None
-        far_ask = max(order_depth.sell_orders.keys()) if order_depth.sell_orders else None
-        return far_bid, far_ask
+        return orderbook.far_bid(order_depth), orderbook.far_ask(order_depth)
 
     def process_resin(self, order_depth: OrderDepth, position: int, data: dict) -> List[Order]:
         orders = []
@@ -68,49 +63,53 @@ class Trader:
         mid_price = (best_bid + best_ask) / 2
         if best_bid is None or best_ask is None:
             return []
-        lo = 9999
-        hi = 10001
+        lo = self.RESIN_LO
+        hi = self.RESIN_HI
         if position == 0:
             if mid_price <= lo:
-                print("Opening long position")
                 orders.append(Order("RAINFOREST_RESIN", lo, 20))
+                self.logger.info(OPEN, "RAINFOREST_RESIN", lo, 20, position)
             elif mid_price >= hi:
-                print("Opening short position")
                 orders.append(Order("RAINFOREST_RESIN", hi, -20))
+                self.logger.info(OPEN, "RAINFOREST_RESIN", hi, -20, position)
         elif position > 0:
             if mid_price >= hi:
-                print("Closing long position")
                 price = max(int(mid_price+0.5), hi)
                 orders.append(Order("RAINFOREST_RESIN", price, -position))
+                self.logger.info(CLOSE, "RAINFOREST_RESIN", price, -position, position)
             elif mid_price < lo:
                 size = min(10, position_limit - position)
                 price = min((int(mid_price), best_ask, lo))
-                print("Increasing long position")
-                orders.append(Order("RAINFOREST_RESIN", price, size)) if size > 0 else None
+                if size > 0:
+                    orders.append(Order("RAINFOREST_RESIN", price, size))
+                    self.logger.info(INCREASE, "RAINFOREST_RESIN", price, size, position)
         elif position < 0:
             if mid_price <= lo:
-                print("Closing short position")
                 price = min(int(mid_price), lo)
                 orders.append(Order("RAINFOREST_RESIN", price, -position))
+                self.logger.info(CLOSE, "RAINFOREST_RESIN", price, -position, position)
             elif mid_price >= hi:
                 size = min(10, position_limit + position)
                 price = max((int(mid_price+0.5), best_bid, hi))
-                print("Increasing short position")
-                orders.append(Order("RAINFOREST_RESIN", price, -size)) if size > 0 else None
+                if size > 0:
+                    orders.append(Order("RAINFOREST_RESIN", price, -size))
+                    self.logger.info(INCREASE, "RAINFOREST_RESIN", price, -size, position)
         return orders
 
     def process_kelp(self, order_depth: OrderDepth, position: int, data: dict) -> List[Order]:
-        WINDOW = 5
-        INVENTORY_LIMIT = 40
+        WINDOW = self.WINDOW
+        INVENTORY_LIMIT = self.INVENTORY_LIMIT
         orders = []
         best_bid, best_ask = self.get_best_prices(order_depth)
         if best_bid is None or best_ask is None:
             return []
         mid_price = (best_bid + best_ask) / 2
-        spread = best_ask - best_bid
-        data["KELP_mid"].append(mid_price)
-        data["KELP_spreads"].append(spread)
-        if len(data["KELP_mid"]) < WINDOW:
+        # Each mid is counted twice on purpose: the original appended every
+        # KELP mid to its history in both run() and here, so the WINDOW
+        # statistics cover the last WINDOW / 2 ticks. Kept to preserve its fills.
+        data["KELP_mid_var"].update(mid_price)
+        data["KELP_mid_var"].update(mid_price)
+        if not data["KELP_mid_var"].ready:
             return []
 
         # Volume imbalance
@@ -118,10 +117,9 @@ class Trader:
         ask_volume = sum(order_depth.sell_orders.values())
         # vol_imb = (ask_volume - bid_volume) / (ask_volume + bid_volume)
 
-        # Rolling mean and std
-        mid = np.array(data["KELP_mid"][-WINDOW:])
-        mean = np.mean(mid)
-        std = np.std(mid)
+        # Rolling mean and std over the last WINDOW mids
+        mean = data["KELP_mid_var"].mean
+        std = data["KELP_mid_var"].std
 
         position_limit = 50
         position_factor = position / position_limit * 2
@@ -141,13 +139,15 @@ class Trader:
         return orders
 
     def close_positions(self, state: TradingState, data: dict, result: Dict[str, List[Order]]) -> None:
-        LIQUIDATION_WINDOW = 200
+        LIQUIDATION_WINDOW = self.LIQUIDATION_WINDOW
         FINAL_TIMESTAMP = 199900
         TIME_LEFT = FINAL_TIMESTAMP - state.timestamp
         if TIME_LEFT > LIQUIDATION_WINDOW:
             return
 
-        for product in ["RAINFOREST_RESIN", "KELP"]:
+        for product in self.handlers:
+            if product not in state.order_depths:
+                continue
             orders = []
             position = state.position.get(product, 0)
             if position > 0:
@@ -167,13 +167,4 @@ class Trader:
             result[product] = orders
 
     def log(self, state, data):
-        # print executed orders
-        for product in ["RAINFOREST_RESIN", "KELP"]:
-            for trade in state.own_trades.get(product, []):
-                if trade.timestamp == state.timestamp - 100:
-                    action = "BUY" if trade.buyer else "SELL"
-                    print(f"[Executed] {action} {trade.quantity} {trade.symbol} @ {trade.price}")
-        # print current positions
-        for product in ["RAINFOREST_RESIN", "KELP"]:
-            position = state.position.get(product, 0)
-            print(f"{product} position: {position}")
+        log_state(self.logger, state, self.handlers)
@@ -0,0 +1,247 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional
+
+from datamodel import OrderDepth
+
+# Drop-in replacement for OrderDepth whose buy_orders/sell_orders are dicts
+# that also keep their prices sorted. Best and farthest prices are O(1),
+# depth queries are a bisect over cached prefix sums, and the in-place
+# `levels[price] -= qty` / `del levels[price]` path used by take_best_orders
+# stays cheap (a bisect when a price level disappears or appears).
+#
+# The module-level helpers accept either kind of book so strategy code can
+# use them unconditionally and only gets the fast path when the backtester
+# (or exchange) hands it a SortedOrderDepth.
+
+
+class SortedLevels(dict):
+    # Iteration order is still insertion order, like the plain dicts the
+    # exchange sends; only the lookups below use the sorted key list.
+
+    def __init__(self, descending: bool, *args, **kwargs):
+        super().__init__()
+        self.descending = descending
+        self._prices: List[int] = []  # ascending
+        self._cumulative: Optional[List[int]] = None
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, price, volume) -> None:
+        if price not in self:
+            insort(self._prices, price)
+        super().__setitem__(price, volume)
+        self._cumulative = None
+
+    def __delitem__(self, price) -> None:
+        super().__delitem__(price)
+        del self._prices[bisect_left(self._prices, price)]
+        self._cumulative = None
+
+    def update(self, *args, **kwargs) -> None:
+        for price, volume in dict(*args, **kwargs).items():
+            self[price] = volume
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    @classmethod
+    def fromkeys(cls, iterable, value=None):
+        # The side's direction can't be inferred from the keys
+        raise TypeError("SortedLevels.fromkeys is not supported; use SortedLevels(descending, dict.fromkeys(...))")
+
+    def setdefault(self, price, default=None):
+        if price not in self:
+            self[price] = default
+        return self[price]
+
+    def pop(self, price, *default):
+        if price in self:
+            volume = dict.__getitem__(self, price)
+            del self[price]
+            return volume
+        if default:
+            return default[0]
+        raise KeyError(price)
+
+    def popitem(self):
+        price, volume = super().popitem()
+        del self._prices[bisect_left(self._prices, price)]
+        self._cumulative = None
+        return price, volume
+
+    def clear(self) -> None:
+        super().clear()
+        self._prices.clear()
+        self._cumulative = None
+
+    def copy(self) -> "SortedLevels":
+        levels = SortedLevels(self.descending)
+        dict.update(levels, self)
+        levels._prices = list(self._prices)
+        return levels
+
+    def __reduce__(self):
+        return (SortedLevels, (self.descending, dict(self)))
+
+    @property
+    def best(self) -> Optional[int]:
+        if not self._prices:
+            return None
+        return self._prices[-1] if self.descending else self._prices[0]
+
+    @property
+    def farthest(self) -> Optional[int]:
+        if not self._prices:
+            return None
+        return self._prices[0] if self.descending else self._prices[-1]
+
+    def prices(self) -> List[int]:
+        # Best first
+        return self._prices[::-1] if self.descending else list(self._prices)
+
+    def cumulative(self) -> List[int]:
+        # Running total of volume from the best level outwards, aligned with prices()
+        if self._cumulative is None:
+            total = 0
+            cumulative = []
+            for price in self.prices():
+                total += dict.__getitem__(self, price)
+                cumulative.append(total)
+            self._cumulative = cumulative
+        return self._cumulative
+
+    def total_volume(self) -> int:
+        cumulative = self.cumulative()
+        return cumulative[-1] if cumulative else 0
+
+    def volume_at_or_better(self, price: float) -> int:
+        # Sum of volumes priced at `price` or better (>= for bids, <= for asks)
+        if self.descending:
+            count = len(self._prices) - bisect_left(self._prices, price)
+        else:
+            count = bisect_right(self._prices, price)
+        return self.cumulative()[count - 1] if count else 0
+
+    def first_above(self, price: float) -> Optional[int]:
+        i = bisect_right(self._prices, price)
+        return self._prices[i] if i < len(self._prices) else None
+
+    def last_below(self, price: float) -> Optional[int]:
+        i = bisect_left(self._prices, price)
+        return self._prices[i - 1] if i > 0 else None
+
+
+class SortedOrderDepth(OrderDepth):
+
+    def __init__(self):
+        self._buy_orders = SortedLevels(descending=True)
+        self._sell_orders = SortedLevels(descending=False)
+
+    @property
+    def buy_orders(self) -> SortedLevels:
+        return self._buy_orders
+
+    # Like plain attribute assignment, a SortedLevels of the right side is
+    # taken as is; other dicts are sorted into a new one
+    @buy_orders.setter
+    def buy_orders(self, levels: Dict[int, int]) -> None:
+        if not (isinstance(levels, SortedLevels) and levels.descending):
+            levels = SortedLevels(True, levels)
+        self._buy_orders = levels
+
+    @property
+    def sell_orders(self) -> SortedLevels:
+        return self._sell_orders
+
+    @sell_orders.setter
+    def sell_orders(self, levels: Dict[int, int]) -> None:
+        if not (isinstance(levels, SortedLevels) and not levels.descending):
+            levels = SortedLevels(False, levels)
+        self._sell_orders = levels
+
+    @property
+    def best_bid(self) -> Optional[int]:
+        return self._buy_orders.best
+
+    @property
+    def best_ask(self) -> Optional[int]:
+        return self._sell_orders.best
+
+    @property
+    def far_bid(self) -> Optional[int]:
+        return self._buy_orders.farthest
+
+    @property
+    def far_ask(self) -> Optional[int]:
+        return self._sell_orders.farthest
+
+    @classmethod
+    def from_order_depth(cls, order_depth: OrderDepth) -> "SortedOrderDepth":
+        depth = cls()
+        depth.buy_orders = order_depth.buy_orders.copy()
+        depth.sell_orders = order_depth.sell_orders.copy()
+        return depth
+
+    def __getstate__(self):
+        return {"buy_orders": dict(self._buy_orders), "sell_orders": dict(self._sell_orders)}
+
+    def __setstate__(self, state):
+        self.buy_orders = state["buy_orders"]
+        self.sell_orders = state["sell_orders"]
+
+
+def best_bid(order_depth: OrderDepth) -> Optional[int]:
+    levels = order_depth.buy_orders
+    if isinstance(levels, SortedLevels):
+        return levels.best
+    return max(levels.keys()) if levels else None
+
+
+def best_ask(order_depth: OrderDepth) -> Optional[int]:
+    levels = order_depth.sell_orders
+    if isinstance(levels, SortedLevels):
+        return levels.best
+    return min(levels.keys()) if levels else None
+
+
+def far_bid(order_depth: OrderDepth) -> Optional[int]:
+    levels = order_depth.buy_orders
+    if isinstance(levels, SortedLevels):
+        return levels.farthest
+    return min(levels.keys()) if levels else None
+
+
+def far_ask(order_depth: OrderDepth) -> Optional[int]:
+    levels = order_depth.sell_orders
+    if isinstance(levels, SortedLevels):
+        return levels.farthest
+    return max(levels.keys()) if levels else None
+
+
+def bid_volume_at_or_above(order_depth: OrderDepth, price: float) -> int:
+    levels = order_depth.buy_orders
+    if isinstance(levels, SortedLevels):
+        return levels.volume_at_or_better(price)
+    return sum(volume for p, volume in levels.items() if p >= price)
+
+
+def ask_volume_at_or_below(order_depth: OrderDepth, price: float) -> int:
+    # Signed like sell_orders itself, i.e. <= 0
+    levels = order_depth.sell_orders
+    if isinstance(levels, SortedLevels):
+        return levels.volume_at_or_better(price)
+    return sum(volume for p, volume in levels.items() if p <= price)
+
+
+def lowest_ask_above(order_depth: OrderDepth, price: float) -> Optional[int]:
+    levels = order_depth.sell_orders
+    if isinstance(levels, SortedLevels):
+        return levels.first_above(price)
+    return min((p for p in levels.keys() if p > price), default=None)
+
+
+def highest_bid_below(order_depth: OrderDepth, price: float) -> Optional[int]:
+    levels = order_depth.buy_orders
+    if isinstance(levels, SortedLevels):
+        return levels.last_below(price)
+    return max((p for p in levels.keys() if p < price), default=None)
@@ -0,0 +1,276 @@
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from datamodel import TradingState
+
+# Per-tick latency and allocation profiling for any Trader. Sections are
+# timed by wrapping, on the instance, the helper methods whose names match
+# SECTION_PREFIXES, and by swapping the trader module's encode/decode,
+# jsonpickle, print and log_state globals for timed versions, plus the
+# trader's logger.flush (it prints from tradelog.py). Section times are
+# inclusive: a print inside process_kelp counts towards both. For
+# strategy.Strategy traders the registered components are timed too, per
+# component type (fair value, taker, ...), summed over products unless
+# per_product is set, which reports e.g. taker[KELP] separately.
+
+BUDGET_MS = 900.0
+SECTION_PREFIXES = ("process_", "take_best_orders", "clear_position_orders", "make_market",
+                    "close_positions", "log")
+MODULE_SECTIONS = {"decode": "decode", "encode": "encode", "print": "logging", "log_state": "logging"}
+
+
+class _TimedJsonpickle:
+    # Stand-in for the jsonpickle module inside a trader module
+
+    def __init__(self, module, timed: Callable):
+        self._module = module
+        self.encode = timed("encode", module.encode)
+        self.decode = timed("decode", module.decode)
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+class ProfiledTrader:
+
+    def __init__(self, trader, trace_memory: bool = True,
+                 section_prefixes: Iterable[str] = SECTION_PREFIXES, per_product: bool = False):
+        self.trader = trader
+        self.trace_memory = trace_memory
+        self.per_product = per_product
+        self.ticks: List[int] = []
+        self.total_ms: List[float] = []
+        self.peak_bytes: List[int] = []
+        self.trader_data_in: List[int] = []
+        self.trader_data_out: List[int] = []
+        self.section_ms: Dict[str, List[float]] = defaultdict(list)
+        self._current: Dict[str, float] = defaultdict(float)
+        self._patched = []
+
+        for name in dir(type(trader)):
+            if name.startswith(section_prefixes) and callable(getattr(trader, name)):
+                self._patch_method(name, self._timed(name, getattr(trader, name)))
+        registry = getattr(trader, "registry", None)
+        if isinstance(registry, dict):
+            for product, spec in registry.items():
+                self._patch_steps(product, spec)
+        # The module defining the trader class, and the one defining run() if
+        # that is inherited (strategy.py for Strategy subclasses)
+        modules = {sys.modules.get(type(trader).__module__), sys.modules.get(type(trader).run.__module__)}
+        for module in modules - {None}:
+            for name, section in MODULE_SECTIONS.items():
+                original = module.__dict__.get(name, print if name == "print" else None)
+                if original is not None:
+                    self._patch(module, name, self._timed(section, original))
+            if "jsonpickle" in module.__dict__:
+                self._patch(module, "jsonpickle", _TimedJsonpickle(module.jsonpickle, self._timed))
+        # TradeLogger prints from tradelog.py, so time its flush directly
+        logger = getattr(trader, "logger", None)
+        if logger is not None and callable(getattr(logger, "flush", None)):
+            self._patch(logger, "flush", self._timed("logging", logger.flush))
+
+    def _section(self, name: str, product: str) -> str:
+        return f"{name}[{product}]" if self.per_product else name
+
+    def _patch_method(self, name: str, wrapper: Callable) -> None:
+        # On the instance, and in dispatch tables holding the bound method
+        # (mean_reversion+MM's handlers)
+        trader = self.trader
+        bound = getattr(trader, name)
+        for table in [value for value in vars(trader).values() if isinstance(value, dict)]:
+            for key, value in table.items():
+                if value == bound:
+                    self._patched.append((table, key, value))
+                    table[key] = wrapper
+        self._patched.append((trader, name, _MISSING))
+        setattr(trader, name, wrapper)
+
+    def _patch_steps(self, product: str, spec) -> None:
+        self._patched.append((spec, "steps", spec.steps))
+        spec.steps = [self._timed(self._section(type(step).__name__.lower(), product), step) for step in spec.steps]
+        estimator = spec.fair_value
+        self._patched.append((estimator, "estimate", _MISSING))
+        estimator.estimate = self._timed(self._section("fair_value", product), estimator.estimate)
+
+    def _patch(self, module, name: str, value) -> None:
+        self._patched.append((module, name, module.__dict__.get(name, _MISSING)))
+        setattr(module, name, value)
+
+    def restore(self) -> None:
+        for target, name, original in reversed(self._patched):
+            if isinstance(target, dict):
+                target[name] = original
+            elif original is _MISSING:
+                delattr(target, name)
+            else:
+                setattr(target, name, original)
+        self._patched.clear()
+
+    def _timed(self, section: str, fn: Callable) -> Callable:
+        current = self._current
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                current[section] += time.perf_counter() - start
+
+        return wrapper
+
+    def run(self, state: TradingState):
+        self._current.clear()
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = self.trader.run(state)
+        elapsed = time.perf_counter() - start
+        if self.trace_memory:
+            self.peak_bytes.append(tracemalloc.get_traced_memory()[1] - baseline)
+
+        self.ticks.append(state.timestamp)
+        self.total_ms.append(elapsed * 1e3)
+        self.trader_data_in.append(len(state.traderData or ""))
+        self.trader_data_out.append(len(result[2] or "") if len(result) > 2 else 0)
+        # Keep every section list aligned with the tick index
+        for section in set(self.section_ms) | set(self._current):
+            series = self.section_ms[section]
+            series.extend([0.0] * (len(self.total_ms) - 1 - len(series)))
+            series.append(self._current.get(section, 0.0) * 1e3)
+        return result
+
+    def report(self, budget_ms: float = BUDGET_MS) -> "ProfileReport":
+        n = len(self.total_ms)
+        sections = {name: np.array(values + [0.0] * (n - len(values))) for name, values in self.section_ms.items()}
+        return ProfileReport(
+            np.array(self.ticks),
+            np.array(self.total_ms),
+            sections,
+            np.array(self.peak_bytes) if self.peak_bytes else None,
+            np.array(self.trader_data_out),
+            budget_ms,
+        )
+
+
+_MISSING = object()
+
+
+def trend(values: np.ndarray) -> Dict[str, float]:
+    # Linear fit against tick index plus a first-vs-last decile comparison,
+    # which is less sensitive to a few slow outlier ticks
+    n = len(values)
+    if n < 10:
+        return {"slope": 0.0, "ratio": 1.0}
+    slope = float(np.polyfit(np.arange(n), values, 1)[0])
+    decile = max(n // 10, 1)
+    head = float(np.median(values[:decile]))
+    tail = float(np.median(values[-decile:]))
+    return {"slope": slope, "ratio": tail / head if head > 0 else (np.inf if tail > 0 else 1.0)}
+
+
+class ProfileReport:
+
+    def __init__(self, ticks: np.ndarray, total_ms: np.ndarray, sections: Dict[str, np.ndarray],
+                 peak_bytes: Optional[np.ndarray], trader_data_size: np.ndarray, budget_ms: float):
+        self.ticks = ticks
+        self.total_ms = total_ms
+        self.sections = sections
+        self.peak_bytes = peak_bytes
+        self.trader_data_size = trader_data_size
+        self.budget_ms = budget_ms
+
+    @staticmethod
+    def percentiles(values: np.ndarray) -> Dict[str, float]:
+        if len(values) == 0:
+            return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+        p50, p99 = np.percentile(values, [50, 99])
+        return {"p50": float(p50), "p99": float(p99), "max": float(values.max())}
+
+    def over_budget(self) -> np.ndarray:
+        return self.ticks[self.total_ms > self.budget_ms]
+
+    def growth_flags(self, ratio: float = 1.5) -> Dict[str, Dict[str, float]]:
+        # Series whose last-decile median is `ratio` times the first decile's
+        flags = {}
+        for name, values in (("latency", self.total_ms), ("traderData", self.trader_data_size.astype(float))):
+            t = trend(values)
+            if t["slope"] > 0 and t["ratio"] >= ratio:
+                flags[name] = t
+        return flags
+
+    def histogram(self, bins: int = 12, width: int = 40) -> List[str]:
+        values = self.total_ms[self.total_ms > 0]
+        if len(values) == 0:
+            return []
+        edges = np.geomspace(values.min(), values.max() * 1.0001, bins + 1)
+        counts, _ = np.histogram(values, edges)
+        scale = width / max(counts.max(), 1)
+        return [f"{lo:9.3f}-{hi:9.3f} ms {count:6d} {'#' * int(round(count * scale))}"
+                for lo, hi, count in zip(edges[:-1], edges[1:], counts)]
+
+    def format(self) -> str:
+        lines = [f"{len(self.total_ms)} ticks, budget {self.budget_ms:.0f} ms"]
+        lines.append(f"{'section':<30}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'total s':>10}")
+        rows = [("run", self.total_ms)] + sorted(self.sections.items(), key=lambda kv: -kv[1].sum())
+        for name, values in rows:
+            p = self.percentiles(values)
+            lines.append(f"{name:<30}{p['p50']:>10.3f}{p['p99']:>10.3f}{p['max']:>10.3f}{values.sum() / 1e3:>10.3f}")
+        if self.peak_bytes is not None:
+            p = self.percentiles(self.peak_bytes / 1024)
+            lines.append(f"peak alloc per tick: p50 {p['p50']:.1f} KiB, p99 {p['p99']:.1f} KiB, max {p['max']:.1f} KiB")
+        p = self.percentiles(self.trader_data_size.astype(float))
+        lines.append(f"traderData size: p50 {p['p50']:.0f}, max {p['max']:.0f} chars")
+        lines.append("latency histogram:")
+        lines.extend("  " + line for line in self.histogram())
+        over = self.over_budget()
+        if len(over):
+            lines.append(f"WARNING: {len(over)} ticks over budget, first at timestamp {over[0]}")
+        for name, t in self.growth_flags().items():
+            lines.append(f"WARNING: {name} grows through the run (last/first decile median x{t['ratio']:.1f}, "
+                         f"slope {t['slope']:.3g} per tick)")
+        return "\n".join(lines)
+
+
+def profile(trader, data, trace_memory: bool = True, budget_ms: float = BUDGET_MS,
+            per_product: bool = False) -> ProfileReport:
+    from backtester import Backtester
+
+    # Leave tracing on if the caller had started it
+    was_tracing = tracemalloc.is_tracing()
+    profiled = ProfiledTrader(trader, trace_memory, per_product=per_product)
+    try:
+        Backtester(profiled).run(data.ticks(), data.products)
+    finally:
+        profiled.restore()
+        if trace_memory and not was_tracing:
+            tracemalloc.stop()
+    return profiled.report(budget_ms)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    from backtester import load_prices, load_trader
+
+    parser = argparse.ArgumentParser(description="Per-tick latency profile of Trader.run")
+    parser.add_argument("trader")
+    parser.add_argument("data", nargs="?", default="data.csv")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (less overhead)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--per-product", action="store_true", help="time strategy components per product")
+    args = parser.parse_args(argv)
+
+    trader = load_trader(args.trader)()
+    report = profile(trader, load_prices(args.data), not args.no_memory, args.budget_ms, args.per_product)
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import time
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from backtester import PriceData, load_prices
+from rolling import ema, rolling_mean
+
+# Whole-day signal research without the tick loop. Every product's book is
+# held as (ticks, levels) arrays and every candidate fair value, feature and
+# score below is a vectorized expression over them.
+
+FIXED_FAIR_VALUES = {"RAINFOREST_RESIN": 10000.0}
+
+
+class ProductBook:
+
+    def __init__(self, product: str, day: np.ndarray, timestamp: np.ndarray,
+                 bid_price: np.ndarray, bid_volume: np.ndarray,
+                 ask_price: np.ndarray, ask_volume: np.ndarray):
+        self.product = product
+        self.day = day
+        self.timestamp = timestamp
+        # Empty levels become NaN prices and 0 volume
+        self.bid_price = np.where(bid_volume > 0, bid_price, np.nan)
+        self.bid_volume = bid_volume.astype(float)
+        self.ask_price = np.where(ask_volume > 0, ask_price, np.nan)
+        self.ask_volume = ask_volume.astype(float)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def best_bid(self) -> np.ndarray:
+        return self.bid_price[:, 0]
+
+    @property
+    def best_ask(self) -> np.ndarray:
+        return self.ask_price[:, 0]
+
+    @property
+    def mid(self) -> np.ndarray:
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def spread(self) -> np.ndarray:
+        return self.best_ask - self.best_bid
+
+    @property
+    def microprice(self) -> np.ndarray:
+        bid_volume = self.bid_volume[:, 0]
+        ask_volume = self.ask_volume[:, 0]
+        total = bid_volume + ask_volume
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.best_bid * ask_volume + self.best_ask * bid_volume) / total
+
+    @property
+    def imbalance(self) -> np.ndarray:
+        # (ask - bid) / (ask + bid) over all visible levels, as vol_imb in process_kelp
+        bid_volume = self.bid_volume.sum(axis=1)
+        ask_volume = self.ask_volume.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (ask_volume - bid_volume) / (ask_volume + bid_volume)
+
+    def forward_return(self, horizon: int) -> np.ndarray:
+        # mid[t + horizon] - mid[t], NaN where the horizon runs past the data
+        mid = self.mid
+        out = np.full(len(mid), np.nan)
+        if horizon < len(mid):
+            out[:len(mid) - horizon] = mid[horizon:] - mid[:len(mid) - horizon]
+        return out
+
+
+def load_books(source: Union[str, PriceData]) -> Dict[str, ProductBook]:
+    data = load_prices(source) if isinstance(source, str) else source
+    books = {}
+    for code, product in enumerate(data.products):
+        rows = data.product == code
+        books[product] = ProductBook(
+            product, data.day[rows], data.timestamp[rows],
+            data.bid_price[rows], data.bid_volume[rows],
+            data.ask_price[rows], data.ask_volume[rows],
+        )
+    return books
+
+
+def candidate_fair_values(book: ProductBook, windows: Sequence[int] = (3, 5, 10, 20),
+                          alphas: Sequence[float] = (0.1, 0.3),
+                          imbalance_weights: Sequence[float] = (0.5, 1.0)) -> pd.DataFrame:
+    mid = book.mid
+    candidates = {"mid": mid, "microprice": book.microprice}
+    fixed = FIXED_FAIR_VALUES.get(book.product)
+    if fixed is not None:
+        candidates[f"fixed_{fixed:g}"] = np.full(len(book), fixed)
+    for window in windows:
+        candidates[f"mean_{window}"] = rolling_mean(mid, window)
+    for alpha in alphas:
+        candidates[f"ema_{alpha:g}"] = ema(mid, alpha)
+    # Positive imbalance means more resting ask volume, i.e. selling pressure
+    for weight in imbalance_weights:
+        candidates[f"imb_{weight:g}"] = mid - weight * book.imbalance * book.spread / 2
+    return pd.DataFrame(candidates, index=book.timestamp)
+
+
+def features(book: ProductBook) -> pd.DataFrame:
+    return pd.DataFrame({
+        "mid": book.mid,
+        "spread": book.spread,
+        "microprice": book.microprice,
+        "imbalance": book.imbalance,
+        "bid_volume": book.bid_volume.sum(axis=1),
+        "ask_volume": book.ask_volume.sum(axis=1),
+    }, index=book.timestamp)
+
+
+def forward_correlations(book: ProductBook, fair: pd.DataFrame,
+                         horizons: Sequence[int] = (1, 5, 20)) -> pd.DataFrame:
+    # Correlation of each candidate's (fair - mid) signal with future mid moves
+    signal = fair.to_numpy() - book.mid[:, None]
+    out = {}
+    for horizon in horizons:
+        future = book.forward_return(horizon)
+        valid = ~np.isnan(signal) & ~np.isnan(future)[:, None]
+        s = np.where(valid, signal, 0.0)
+        f = np.where(valid, future[:, None], 0.0)
+        n = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            s_mean = s.sum(axis=0) / n
+            f_mean = f.sum(axis=0) / n
+            cov = (s * f).sum(axis=0) / n - s_mean * f_mean
+            s_var = (s * s).sum(axis=0) / n - s_mean ** 2
+            f_var = (f * f).sum(axis=0) / n - f_mean ** 2
+            out[f"corr_{horizon}"] = cov / np.sqrt(s_var * f_var)
+    return pd.DataFrame(out, index=fair.columns)
+
+
+def take_pnl(book: ProductBook, fair: np.ndarray, edge: float = 1.0, horizon: Optional[int] = 20) -> Dict[str, float]:
+    # Take every visible level priced at least `edge` through fair, valued at
+    # the mid `horizon` ticks later (or the last mid if horizon is None).
+    # Position limits are ignored, so this is an upper bound used for ranking.
+    mid = book.mid
+    if horizon is None:
+        value = np.full(len(mid), mid[~np.isnan(mid)][-1] if (~np.isnan(mid)).any() else np.nan)
+    else:
+        value = mid + book.forward_return(horizon)
+    fair = np.asarray(fair, dtype=float)[:, None]
+    value = value[:, None]
+    with np.errstate(invalid="ignore"):
+        buys = (book.ask_price <= fair - edge) & (book.ask_volume > 0) & ~np.isnan(value)
+        sells = (book.bid_price >= fair + edge) & (book.bid_volume > 0) & ~np.isnan(value)
+    buy_pnl = np.where(buys, (value - book.ask_price) * book.ask_volume, 0.0)
+    sell_pnl = np.where(sells, (book.bid_price - value) * book.bid_volume, 0.0)
+    volume = np.where(buys, book.ask_volume, 0.0).sum() + np.where(sells, book.bid_volume, 0.0).sum()
+    return {
+        "take_pnl": float(buy_pnl.sum() + sell_pnl.sum()),
+        "take_volume": float(volume),
+        "take_ticks": int((buys.any(axis=1) | sells.any(axis=1)).sum()),
+    }
+
+
+def screen(source: Union[str, PriceData], edges: Iterable[float] = (0.5, 1.0, 2.0),
+           horizons: Sequence[int] = (1, 5, 20), **candidate_kwargs) -> pd.DataFrame:
+    rows = []
+    for product, book in load_books(source).items():
+        fair = candidate_fair_values(book, **candidate_kwargs)
+        corr = forward_correlations(book, fair, horizons)
+        for name in fair.columns:
+            base = {"product": product, "model": name, **corr.loc[name].to_dict()}
+            for edge in edges:
+                rows.append({**base, "edge": edge, **take_pnl(book, fair[name].to_numpy(), edge, horizons[-1])})
+    return pd.DataFrame(rows)
+
+
+def main(argv=None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vectorized fair-value screen over a prices file")
+    parser.add_argument("data", nargs="?", default="data.csv")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    data = load_prices(args.data)
+    start = time.perf_counter()
+    table = screen(data)
+    elapsed = time.perf_counter() - start
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        for product, rows in table.groupby("product"):
+            print(rows.sort_values("take_pnl", ascending=False).head(args.top).to_string(index=False))
+            print()
+    print(f"Screened {table.model.nunique()} models x {table.edge.nunique()} edges "
+          f"for {table['product'].nunique()} products in {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import ast
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester import Backtester, BacktestResult, load_prices, load_trader
+from matching import make_engine
+from sweep import Params, make_trader, result_row
+
+# Persistent cache of backtest results. An entry is keyed by
+#   - the trader file's source and that of every repo module it imports
+#     (datamodel, state_codec, rolling, ...), followed recursively,
+#   - the backtester/matching source, so engine changes invalidate it,
+#   - the parameters and fill model,
+#   - a content hash of the market data (CSV file or store directory),
+# and stored as <key>.npz (the BacktestResult arrays) next to <key>.json
+# (what ran, when, and its summary). Listing summaries reads only the JSON.
+# Both files are written to a temp name and os.replace'd into place, arrays
+# first. Hits touch both files; when the cache grows past max_bytes the least
+# recently used entries are deleted, along with any arrays left without meta.
+
+CACHE_DIR = ".backtest_cache"
+MAX_BYTES = 512 * 1024 * 1024
+ENGINE_MODULES = ("backtester.py", "matching.py")
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _sha1_file(path: str, h=None):
+    h = h or hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h
+
+
+def source_hash(trader_path: str) -> str:
+    # The trader file plus local modules it imports, followed recursively
+    root = os.path.dirname(os.path.abspath(trader_path))
+    pending = [os.path.abspath(trader_path)] + [os.path.join(ROOT, name) for name in ENGINE_MODULES]
+    seen = set()
+    h = hashlib.sha1()
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path, "rb") as f:
+            source = f.read()
+        h.update(os.path.basename(path).encode() + b"\0" + source + b"\0")
+        for node in ast.walk(ast.parse(source)):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                candidate = os.path.join(root, name.split(".")[0] + ".py")
+                if os.path.exists(candidate):
+                    pending.append(candidate)
+    return h.hexdigest()
+
+
+def data_files(data_path: str) -> List[str]:
+    path = os.path.abspath(data_path)
+    return sorted(os.path.join(path, f) for f in os.listdir(path)) if os.path.isdir(path) else [path]
+
+
+def data_hash(data_path: str) -> str:
+    # Content hash of a CSV file or a store directory
+    h = hashlib.sha1()
+    for name in data_files(data_path):
+        h.update(os.path.basename(name).encode() + b"\0")
+        _sha1_file(name, h)
+    return h.hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._fingerprints_path = os.path.join(cache_dir, "fingerprints.json")
+
+    def data_fingerprint(self, data_path: str) -> str:
+        # Content hash, remembered per (path, size, mtime) so unchanged files
+        # are not re-read on every lookup
+        path = os.path.abspath(data_path)
+        files = data_files(path)
+        stamp = ";".join(f"{f}:{os.stat(f).st_size}:{os.stat(f).st_mtime_ns}" for f in files)
+        known = {}
+        if os.path.exists(self._fingerprints_path):
+            with open(self._fingerprints_path) as f:
+                known = json.load(f)
+        entry = known.get(path)
+        if entry and entry["stamp"] == stamp:
+            return entry["sha1"]
+        known[path] = {"stamp": stamp, "sha1": data_hash(path)}
+        tmp = self._fingerprints_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(known, f)
+        os.replace(tmp, self._fingerprints_path)
+        return known[path]["sha1"]
+
+    def key(self, trader_path: str, data_path: str, params: Optional[Params] = None,
+            fills: str = "none") -> str:
+        payload = json.dumps({
+            "source": source_hash(trader_path),
+            "data": self.data_fingerprint(data_path),
+            "params": params or {},
+            "fills": fills,
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, key)
+        return base + ".npz", base + ".json"
+
+    def get(self, key: str) -> Optional[BacktestResult]:
+        arrays_path, meta_path = self._paths(key)
+        if not (os.path.exists(arrays_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with np.load(arrays_path) as arrays:
+            result = BacktestResult(
+                meta["products"], arrays["day"], arrays["timestamp"], arrays["mid_price"], arrays["position"],
+                arrays["cash"], arrays["fills"], arrays["quotes"], meta["trader_data"], meta["elapsed"],
+            )
+        now = time.time()
+        os.utime(arrays_path, (now, now))
+        os.utime(meta_path, (now, now))
+        return result
+
+    def put(self, key: str, result: BacktestResult, info: Optional[Dict[str, Any]] = None) -> None:
+        arrays_path, meta_path = self._paths(key)
+        tmp = arrays_path + ".tmp.npz"
+        np.savez(tmp, day=result.day, timestamp=result.timestamp, mid_price=result.mid_price,
+                 position=result.position, cash=result.cash, fills=result.fills, quotes=result.quotes)
+        os.replace(tmp, arrays_path)
+        meta = {
+            "key": key,
+            "products": list(result.products),
+            "trader_data": result.trader_data,
+            "elapsed": result.elapsed,
+            "created": time.time(),
+            "summary": result_row(result),
+            **(info or {}),
+        }
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+        self.evict()
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        # (last used, bytes, key) per entry
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json") or name == "fingerprints.json":
+                continue
+            key = name[:-5]
+            arrays_path, meta_path = self._paths(key)
+            if not os.path.exists(arrays_path):
+                continue
+            a, m = os.stat(arrays_path), os.stat(meta_path)
+            entries.append((max(a.st_mtime, m.st_mtime), a.st_size + m.st_size, key))
+        return entries
+
+    def orphans(self) -> List[str]:
+        # Arrays whose meta was never written, e.g. a put interrupted between
+        # the two replaces; entries() skips them, so they would never be evicted
+        orphans = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz") and not name.endswith(".tmp.npz"):
+                arrays_path, meta_path = self._paths(name[:-4])
+                if not os.path.exists(meta_path):
+                    orphans.append(arrays_path)
+        return orphans
+
+    def evict(self) -> List[str]:
+        for path in self.orphans():
+            os.remove(path)
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                os.remove(path)
+            total -= size
+            evicted.append(key)
+        return evicted
+
+    def clear(self) -> None:
+        for path in self.orphans():
+            os.remove(path)
+        for _, _, key in self.entries():
+            for path in self._paths(key):
+                os.remove(path)
+
+    def summaries(self) -> pd.DataFrame:
+        rows = []
+        for last_used, size, key in self.entries():
+            with open(self._paths(key)[1]) as f:
+                meta = json.load(f)
+            rows.append({
+                "key": key[:12],
+                "trader": meta.get("trader"),
+                "data": meta.get("data"),
+                "params": json.dumps(meta.get("params", {}), sort_keys=True),
+                "fill_model": meta.get("fills"),
+                **meta["summary"],
+                "last_used": pd.Timestamp(last_used, unit="s"),
+                "bytes": size,
+            })
+        return pd.DataFrame(rows)
+
+
+def cached_backtest(trader_path: str, data_path: str = "data.csv", params: Optional[Params] = None,
+                    fills: str = "none", cache: Optional[ResultCache] = None) -> Tuple[BacktestResult, bool]:
+    # Returns (result, hit)
+    cache = cache or ResultCache()
+    params = params or {}
+    key = cache.key(trader_path, data_path, params, fills)
+    result = cache.get(key)
+    if result is not None:
+        return result, True
+    data = load_prices(data_path)
+    trader = make_trader(load_trader(trader_path), params)
+    result = Backtester(trader, engine=make_engine(fills)).run(data.ticks(), data.products)
+    cache.put(key, result, {"trader": trader_path, "data": data_path, "params": params, "fills": fills})
+    return result, False
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    from sweep import parse_values
+
+    parser = argparse.ArgumentParser(description="Cached backtests and a summary of everything cached")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--max-mb", type=float, default=MAX_BYTES / 2 ** 20)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="backtest unless an identical run is cached")
+    run.add_argument("trader")
+    run.add_argument("data", nargs="?", default="data.csv")
+    run.add_argument("--param", action="append", default=[], metavar="NAME=VALUE")
+    run.add_argument("--fills", default="none", choices=["none", "trade-through", "probabilistic", "market-trades"])
+    commands.add_parser("summary", help="list cached runs without re-simulating")
+    commands.add_parser("clear")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.cache_dir, int(args.max_mb * 2 ** 20))
+    if args.command == "run":
+        params = {}
+        for spec in args.param:
+            name, _, value = spec.partition("=")
+            params[name] = parse_values(value)[0]
+        start = time.perf_counter()
+        result, hit = cached_backtest(args.trader, args.data, params, args.fills, cache)
+        summary = result.summary()
+        print(f"{'cached' if hit else 'ran'} in {time.perf_counter() - start:.3f}s: pnl {summary['pnl']:.1f}, "
+              f"max drawdown {summary['max_drawdown']:.1f}, {summary['fills']} fills")
+    elif args.command == "summary":
+        table = cache.summaries()
+        if table.empty:
+            print("cache is empty")
+        else:
+            with pd.option_context("display.max_rows", 100, "display.width", 250, "display.max_columns", 30):
+                print(table.sort_values("last_used", ascending=False).to_string(index=False))
+    else:
+        cache.clear()
+
+
+if __name__ == "__main__":
+    main()
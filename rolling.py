@@ -0,0 +1,423 @@
+import math
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from state_codec import RingBuffer, register
+
+# Incremental estimators for fair-value signals. update() is O(1) per tick and
+# every estimator can be stored directly in traderData through state_codec.
+# Windowed estimators only persist their window and rebuild running sums on
+# load and once every `window` updates (amortised O(1)), so rounding error
+# cannot accumulate over a day. The batch functions at the bottom
+# compute the same series over whole arrays for research.
+
+VARIANCE_EPS = 1e-14
+
+
+@register
+class RollingMean:
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.count = 0  # total updates, not capped at window
+        self._sum = 0.0
+
+    def update(self, x: float) -> float:
+        if len(self.buffer) == self.window:
+            self._sum -= self.buffer[0]
+        self.buffer.append(x)
+        self._sum += x
+        self.count += 1
+        if self.count % self.window == 0:
+            self._resync()
+        return self.value
+
+    def _resync(self) -> None:
+        self._sum = math.fsum(self.buffer)
+
+    @property
+    def n(self) -> int:
+        return len(self.buffer)
+
+    @property
+    def ready(self) -> bool:
+        return self.n == self.window
+
+    @property
+    def value(self) -> float:
+        return self._sum / self.n if self.n else math.nan
+
+    def state(self) -> Dict:
+        return {"window": self.window, "count": self.count, "buffer": self.buffer}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "RollingMean":
+        est = cls(state["window"])
+        est.buffer = state["buffer"]
+        est.count = state["count"]
+        est._resync()
+        return est
+
+
+@register
+class RollingVariance:
+    # Windowed Welford update: adding x and dropping the oldest value y moves
+    # the mean by (x - y) / n and M2 by (x - y) * (x - new_mean + y - old_mean)
+
+    def __init__(self, window: int, ddof: int = 0):
+        self.window = window
+        self.ddof = ddof
+        self.buffer = RingBuffer(window)
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, x: float) -> float:
+        n = len(self.buffer)
+        if n == self.window:
+            y = self.buffer[0]
+            old_mean = self._mean
+            self._mean += (x - y) / n
+            self._m2 += (x - y) * (x - self._mean + y - old_mean)
+        else:
+            n += 1
+            delta = x - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (x - self._mean)
+        # Cancellation leaves ~1e-12 residue on flat windows; snap it to zero
+        if self._m2 < VARIANCE_EPS * max(1.0, self._mean * self._mean) * n:
+            self._m2 = 0.0
+        self.buffer.append(x)
+        self.count += 1
+        if self.count % self.window == 0:
+            self._resync()
+        return self.value
+
+    def _resync(self) -> None:
+        values = self.buffer.tolist()
+        if values:
+            self._mean = math.fsum(values) / len(values)
+            self._m2 = math.fsum((v - self._mean) ** 2 for v in values)
+
+    @property
+    def n(self) -> int:
+        return len(self.buffer)
+
+    @property
+    def ready(self) -> bool:
+        return self.n == self.window
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.n else math.nan
+
+    @property
+    def value(self) -> float:
+        if self.n <= self.ddof:
+            return math.nan
+        return max(self._m2, 0.0) / (self.n - self.ddof)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.value)
+
+    def state(self) -> Dict:
+        return {"window": self.window, "ddof": self.ddof, "count": self.count, "buffer": self.buffer}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "RollingVariance":
+        est = cls(state["window"], state["ddof"])
+        est.buffer = state["buffer"]
+        est.count = state["count"]
+        est._resync()
+        return est
+
+
+@register
+class EMA:
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.count = 0
+        self.value = math.nan
+
+    @classmethod
+    def from_span(cls, span: float) -> "EMA":
+        return cls(2.0 / (span + 1.0))
+
+    def update(self, x: float) -> float:
+        if self.count == 0:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        self.count += 1
+        return self.value
+
+    def state(self) -> Dict:
+        return {"alpha": self.alpha, "count": self.count, "value": self.value}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "EMA":
+        est = cls(state["alpha"])
+        est.count = state["count"]
+        est.value = state["value"]
+        return est
+
+
+@register
+class EWMVariance:
+    # Biased exponentially weighted variance, same recursion as
+    # pandas ewm(alpha, adjust=False).var(bias=True)
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.count = 0
+        self.mean = math.nan
+        self.value = math.nan
+
+    def update(self, x: float) -> float:
+        if self.count == 0:
+            self.mean = x
+            self.value = 0.0
+        else:
+            delta = x - self.mean
+            increment = self.alpha * delta
+            self.mean += increment
+            self.value = (1.0 - self.alpha) * (self.value + delta * increment)
+        self.count += 1
+        return self.value
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.value)
+
+    def state(self) -> Dict:
+        return {"alpha": self.alpha, "count": self.count, "mean": self.mean, "value": self.value}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "EWMVariance":
+        est = cls(state["alpha"])
+        est.count = state["count"]
+        est.mean = state["mean"]
+        est.value = state["value"]
+        return est
+
+
+@register
+class RollingVWAP:
+
+    def __init__(self, window: int):
+        self.window = window
+        self.notional = RingBuffer(window)
+        self.volume = RingBuffer(window)
+        self.count = 0
+        self._notional = 0.0
+        self._volume = 0.0
+
+    def update(self, price: float, volume: float) -> float:
+        if len(self.volume) == self.window:
+            self._notional -= self.notional[0]
+            self._volume -= self.volume[0]
+        self.notional.append(price * volume)
+        self.volume.append(volume)
+        self._notional += price * volume
+        self._volume += volume
+        self.count += 1
+        if self.count % self.window == 0:
+            self._resync()
+        return self.value
+
+    def _resync(self) -> None:
+        self._notional = math.fsum(self.notional)
+        self._volume = math.fsum(self.volume)
+
+    @property
+    def value(self) -> float:
+        return self._notional / self._volume if self._volume else math.nan
+
+    def state(self) -> Dict:
+        return {"window": self.window, "count": self.count, "notional": self.notional, "volume": self.volume}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "RollingVWAP":
+        est = cls(state["window"])
+        est.notional = state["notional"]
+        est.volume = state["volume"]
+        est.count = state["count"]
+        est._resync()
+        return est
+
+
+@register
+class RollingMinMax:
+    # Monotonic deques of (update index, value): front of _min is the window
+    # minimum, front of _max the maximum. Amortised O(1) per update.
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.count = 0
+        self._min: deque = deque()
+        self._max: deque = deque()
+
+    def update(self, x: float) -> None:
+        i = self.count
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((i, x))
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((i, x))
+        expired = i - self.window
+        if self._min[0][0] <= expired:
+            self._min.popleft()
+        if self._max[0][0] <= expired:
+            self._max.popleft()
+        self.buffer.append(x)
+        self.count += 1
+
+    @property
+    def min(self) -> float:
+        return self._min[0][1] if self._min else math.nan
+
+    @property
+    def max(self) -> float:
+        return self._max[0][1] if self._max else math.nan
+
+    def state(self) -> Dict:
+        return {"window": self.window, "count": self.count, "buffer": self.buffer}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "RollingMinMax":
+        est = cls(state["window"])
+        values = state["buffer"].tolist()
+        est.count = state["count"] - len(values)
+        for x in values:
+            est.update(x)
+        return est
+
+
+@register
+class ZScore:
+
+    def __init__(self, window: int, ddof: int = 0):
+        self.variance = RollingVariance(window, ddof)
+        self.value = math.nan
+
+    def update(self, x: float) -> float:
+        self.variance.update(x)
+        std = self.variance.std
+        self.value = (x - self.variance.mean) / std if std > 0 else 0.0
+        return self.value
+
+    @property
+    def ready(self) -> bool:
+        return self.variance.ready
+
+    def state(self) -> Dict:
+        return {"variance": self.variance.state(), "value": self.value}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "ZScore":
+        variance = RollingVariance.from_state(state["variance"])
+        est = cls(variance.window, variance.ddof)
+        est.variance = variance
+        est.value = state["value"]
+        return est
+
+
+# Batch mode. Each function returns an array aligned with x, matching what
+# the streaming estimator reports at each step: rolling_mean/var/std and
+# zscore are NaN before the first full window (their .ready), while
+# rolling_vwap/min/max, like RollingVWAP and RollingMinMax, use the partial
+# window from the first value on (min_periods=1).
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    return pd.Series(x, dtype=float).rolling(window).mean().to_numpy()
+
+
+def rolling_var(x: np.ndarray, window: int, ddof: int = 0) -> np.ndarray:
+    return pd.Series(x, dtype=float).rolling(window).var(ddof=ddof).to_numpy()
+
+
+def rolling_std(x: np.ndarray, window: int, ddof: int = 0) -> np.ndarray:
+    return np.sqrt(rolling_var(x, window, ddof))
+
+
+def ema(x: np.ndarray, alpha: float) -> np.ndarray:
+    return pd.Series(x, dtype=float).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def ewm_var(x: np.ndarray, alpha: float) -> np.ndarray:
+    return pd.Series(x, dtype=float).ewm(alpha=alpha, adjust=False).var(bias=True).to_numpy()
+
+
+def rolling_vwap(price: np.ndarray, volume: np.ndarray, window: int) -> np.ndarray:
+    notional = pd.Series(np.asarray(price, dtype=float) * volume).rolling(window, min_periods=1).sum()
+    total = pd.Series(volume, dtype=float).rolling(window, min_periods=1).sum()
+    return (notional / total.where(total != 0)).to_numpy()
+
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    return pd.Series(x, dtype=float).rolling(window, min_periods=1).min().to_numpy()
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    return pd.Series(x, dtype=float).rolling(window, min_periods=1).max().to_numpy()
+
+
+def zscore(x: np.ndarray, window: int, ddof: int = 0) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    std = rolling_std(x, window, ddof)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (x - rolling_mean(x, window)) / std
+    return np.where(std > 0, z, np.where(np.isnan(std), np.nan, 0.0))
+
+
+def check_consistency(x: np.ndarray, volume: Optional[np.ndarray] = None,
+                      window: int = 5, alpha: float = 0.2) -> None:
+    # Streams x through every estimator and asserts it matches batch mode
+    x = np.asarray(x, dtype=float)
+    if volume is None:
+        volume = np.ones_like(x)
+    volume = np.asarray(volume, dtype=float)
+
+    streams = {
+        "mean": (RollingMean(window), lambda e: e.value if e.ready else math.nan, rolling_mean(x, window)),
+        "var": (RollingVariance(window, 1), lambda e: e.value if e.ready else math.nan, rolling_var(x, window, 1)),
+        "ema": (EMA(alpha), lambda e: e.value, ema(x, alpha)),
+        "ewm_var": (EWMVariance(alpha), lambda e: e.value, ewm_var(x, alpha)),
+        "min": (RollingMinMax(window), lambda e: e.min, rolling_min(x, window)),
+        "max": (RollingMinMax(window), lambda e: e.max, rolling_max(x, window)),
+        "zscore": (ZScore(window), lambda e: e.value if e.ready else math.nan, zscore(x, window)),
+    }
+    for name, (est, read, expected) in streams.items():
+        got = np.empty_like(x)
+        for i, value in enumerate(x):
+            est.update(value)
+            # Round-trip part of the way through to cover state()/from_state()
+            if i == len(x) // 2:
+                est = type(est).from_state(est.state())
+            got[i] = read(est)
+        np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+
+    vwap = RollingVWAP(window)
+    got = np.array([vwap.update(p, v) for p, v in zip(x, volume)])
+    np.testing.assert_allclose(got, rolling_vwap(x, volume, window), rtol=1e-9, equal_nan=True, err_msg="vwap")
+
+
+if __name__ == "__main__":
+    from backtester import load_prices
+
+    data = load_prices("data.csv")
+    for code, product in enumerate(data.products):
+        rows = data.product == code
+        mid = data.mid_price[rows]
+        volume = data.bid_volume[rows, 0] + data.ask_volume[rows, 0]
+        for window in (3, 5, 20):
+            check_consistency(mid, volume, window=window)
+        print(f"{product}: streaming and batch estimators agree over {len(mid)} ticks")
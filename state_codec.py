@@ -0,0 +1,222 @@
+import base64
+import struct
+from array import array
+from typing import Dict, Iterable, List, Union
+
+# Compact traderData codec. Rolling series live in fixed-capacity ring buffers,
+# so both the state and its encoded string stay O(window) for the whole day
+# instead of growing with every tick like appended jsonpickle lists.
+
+MAGIC = b"TD1"
+
+# Classes with state() -> Dict[str, Value] and from_state(dict) that can be
+# stored directly in the encoded dict, see register()
+_REGISTRY: Dict[str, type] = {}
+
+
+def register(cls: type) -> type:
+    _REGISTRY[cls.__name__] = cls
+    return cls
+
+
+class RingBuffer:
+
+    def __init__(self, capacity: int, typecode: str = "d", values: Iterable = ()):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.typecode = typecode
+        self._data = array(typecode, bytes(array(typecode).itemsize * capacity))
+        self._head = 0  # index of the oldest value
+        self._count = 0
+        for value in values:
+            self.append(value)
+
+    def append(self, value) -> None:
+        if self._count < self.capacity:
+            self._data[(self._head + self._count) % self.capacity] = value
+            self._count += 1
+        else:
+            self._data[self._head] = value
+            self._head = (self._head + 1) % self.capacity
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.tolist()[index]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("ring buffer index out of range")
+        return self._data[(self._head + index) % self.capacity]
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __repr__(self) -> str:
+        return f"RingBuffer({self.capacity}, {self.typecode!r}, {self.tolist()})"
+
+    def last(self, n: int) -> List:
+        n = min(n, self._count)
+        return [self[i] for i in range(self._count - n, self._count)]
+
+    def ordered(self) -> array:
+        # Values oldest first
+        end = self._head + self._count
+        if end <= self.capacity:
+            return self._data[self._head:end]
+        return self._data[self._head:] + self._data[:end - self.capacity]
+
+    def tolist(self) -> List:
+        return self.ordered().tolist()
+
+
+Value = Union[RingBuffer, array, int, float, str, bool, None, dict]
+
+
+def _pack_str(out: List[bytes], s: str) -> None:
+    raw = s.encode("utf-8")
+    out.append(struct.pack("<I", len(raw)))
+    out.append(raw)
+
+
+def encode(data: Dict[str, Value]) -> str:
+    out = [MAGIC]
+    _pack_dict(out, data)
+    return base64.b64encode(b"".join(out)).decode("ascii")
+
+
+def _pack_dict(out: List[bytes], data: Dict[str, Value]) -> None:
+    out.append(struct.pack("<H", len(data)))
+    for key, value in data.items():
+        _pack_str(out, key)
+        if isinstance(value, RingBuffer):
+            values = value.ordered()
+            out.append(struct.pack("<ccII", b"r", value.typecode.encode(), value.capacity, len(values)))
+            out.append(values.tobytes())
+        elif isinstance(value, array):
+            out.append(struct.pack("<ccI", b"a", value.typecode.encode(), len(value)))
+            out.append(value.tobytes())
+        elif value is None:
+            out.append(b"n")
+        elif isinstance(value, bool):
+            out.append(b"b" + struct.pack("<?", value))
+        elif isinstance(value, int):
+            out.append(b"i" + struct.pack("<q", value))
+        elif isinstance(value, float):
+            out.append(b"f" + struct.pack("<d", value))
+        elif isinstance(value, str):
+            out.append(b"s")
+            _pack_str(out, value)
+        elif isinstance(value, dict):
+            out.append(b"d")
+            _pack_dict(out, value)
+        elif _REGISTRY.get(type(value).__name__) is type(value):
+            out.append(b"o")
+            _pack_str(out, type(value).__name__)
+            _pack_dict(out, value.state())
+        else:
+            raise TypeError(f"Cannot encode {type(value).__name__} for key {key!r}")
+
+
+def decode(encoded: str) -> Dict[str, Value]:
+    raw = base64.b64decode(encoded)
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not an encoded trader state")
+    pos = len(MAGIC)
+
+    def read(fmt: str):
+        nonlocal pos
+        values = struct.unpack_from(fmt, raw, pos)
+        pos += struct.calcsize(fmt)
+        return values
+
+    def read_str() -> str:
+        nonlocal pos
+        (n,) = read("<I")
+        s = raw[pos:pos + n].decode("utf-8")
+        pos += n
+        return s
+
+    def read_dict() -> Dict[str, Value]:
+        (count,) = read("<H")
+        data: Dict[str, Value] = {}
+        for _ in range(count):
+            key = read_str()
+            data[key] = read_value(key)
+        return data
+
+    def read_value(key: str) -> Value:
+        nonlocal pos
+        tag = raw[pos:pos + 1]
+        pos += 1
+        if tag == b"r":
+            typecode, capacity, n = read("<cII")
+            buffer = RingBuffer(capacity, typecode.decode())
+            values = array(buffer.typecode)
+            size = values.itemsize * n
+            values.frombytes(raw[pos:pos + size])
+            pos += size
+            buffer._data[:n] = values
+            buffer._count = n
+            return buffer
+        if tag == b"a":
+            typecode, n = read("<cI")
+            values = array(typecode.decode())
+            size = values.itemsize * n
+            values.frombytes(raw[pos:pos + size])
+            pos += size
+            return values
+        if tag == b"n":
+            return None
+        if tag == b"b":
+            return read("<?")[0]
+        if tag == b"i":
+            return read("<q")[0]
+        if tag == b"f":
+            return read("<d")[0]
+        if tag == b"s":
+            return read_str()
+        if tag == b"d":
+            return read_dict()
+        if tag == b"o":
+            name = read_str()
+            if name not in _REGISTRY:
+                raise ValueError(f"Unregistered class {name!r} for key {key!r}")
+            return _REGISTRY[name].from_state(read_dict())
+        raise ValueError(f"Unknown value tag {tag!r} for key {key!r}")
+
+    return read_dict()
+
+
+def benchmark(ticks: int = 2000, window: int = 50, series: int = 3) -> None:
+    # Encode/decode cost per tick at the end of a day: jsonpickle over the
+    # full appended history vs. this codec over fixed windows
+    import timeit
+    import warnings
+    import jsonpickle
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    history = {f"series_{i}": [10000.0 + j * 0.5 for j in range(ticks)] for i in range(series)}
+    rings = {k: RingBuffer(window, "d", v) for k, v in history.items()}
+    pickled = jsonpickle.encode(history)
+    packed = encode(rings)
+    rounds = 200
+    rows = [
+        ("jsonpickle", pickled, lambda: jsonpickle.decode(jsonpickle.encode(history))),
+        ("state_codec", packed, lambda: decode(encode(rings))),
+    ]
+    print(f"{series} series, {ticks} ticks of history, window {window}")
+    for name, encoded, roundtrip in rows:
+        seconds = timeit.timeit(roundtrip, number=rounds) / rounds
+        print(f"{name:>12}: {seconds * 1e6:9.1f} us per round trip, {len(encoded):7d} chars")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,296 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from datamodel import Order, OrderDepth, Trade, TradingState
+from orderbook import (SortedOrderDepth, ask_volume_at_or_below, bid_volume_at_or_above, highest_bid_below,
+                       lowest_ask_above)
+from state_codec import decode, encode
+from rolling import RollingVariance
+from tradelog import TradeLogger, SUBMIT, EXECUTED, POSITION
+
+# Per-product strategy pipeline. A Strategy subclass maps each product to a
+#   fair value estimator -> taker -> clearer -> quoter
+# chain. Each tick every registered product's OrderDepth is copied once into a
+# BookSnapshot (an orderbook.SortedOrderDepth) and all components, the fair
+# value included, work off a ProductContext holding that snapshot, the
+# product's market trades, the position and the orders and volume committed
+# so far. Takes consume snapshot volume, so later components
+# see the book as it would be after our own aggressive orders.
+#
+# Components read their parameters when components() runs, on the first
+# tick, so class-attribute constants can still be set by sweep.py.
+
+
+class BookSnapshot(SortedOrderDepth):
+    # This tick's book as a private SortedOrderDepth copy, signed like the
+    # exchange's (sell volumes < 0); query it with the orderbook helpers.
+
+    def __init__(self, order_depth: Optional[OrderDepth] = None):
+        super().__init__()
+        if order_depth is not None:
+            self.buy_orders = order_depth.buy_orders.copy()
+            self.sell_orders = order_depth.sell_orders.copy()
+
+    @property
+    def mid(self) -> Optional[float]:
+        bid, ask = self.best_bid, self.best_ask
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    @property
+    def spread(self) -> Optional[int]:
+        bid, ask = self.best_bid, self.best_ask
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def take_ask(self, price: int, quantity: int) -> None:
+        volume = self.sell_orders[price] + quantity
+        if volume >= 0:
+            del self.sell_orders[price]
+        else:
+            self.sell_orders[price] = volume
+
+    def take_bid(self, price: int, quantity: int) -> None:
+        volume = self.buy_orders[price] - quantity
+        if volume <= 0:
+            del self.buy_orders[price]
+        else:
+            self.buy_orders[price] = volume
+
+
+class ProductContext:
+    __slots__ = ("product", "book", "market_trades", "position", "limit", "logger", "fair", "std", "orders",
+                 "buy_volume", "sell_volume")
+
+    def __init__(self, product: str, book: BookSnapshot, position: int, limit: int, logger: TradeLogger,
+                 market_trades: Sequence[Trade] = ()):
+        self.product = product
+        self.book = book
+        self.market_trades = market_trades
+        self.position = position
+        self.limit = limit
+        self.logger = logger
+        self.fair = 0.0
+        self.std = 0.0
+        self.orders: List[Order] = []
+        self.buy_volume = 0
+        self.sell_volume = 0
+
+    @property
+    def max_buy(self) -> int:
+        return self.limit - (self.position + self.buy_volume)
+
+    @property
+    def max_sell(self) -> int:
+        return self.limit + (self.position - self.sell_volume)
+
+    @property
+    def net_position(self) -> int:
+        # Position if everything sent so far fills
+        return self.position + self.buy_volume - self.sell_volume
+
+    def buy(self, price: int, quantity: int) -> None:
+        self.orders.append(Order(self.product, price, quantity))
+        self.logger.info(SUBMIT, self.product, price, quantity, self.position)
+        self.buy_volume += quantity
+
+    def sell(self, price: int, quantity: int) -> None:
+        self.orders.append(Order(self.product, price, -quantity))
+        self.logger.info(SUBMIT, self.product, price, -quantity, self.position)
+        self.sell_volume += quantity
+
+
+# Fair value estimators return (fair, std) or None while warming up. Their
+# state lives in traderData under the product name, so it must be None or
+# a state_codec-encodable object.
+
+class FairValue:
+
+    def initial_state(self):
+        return None
+
+    def estimate(self, ctx: ProductContext, memory) -> Optional[Tuple[float, float]]:
+        raise NotImplementedError
+
+
+class FixedFairValue(FairValue):
+
+    def __init__(self, value: float):
+        self.value = value
+
+    def estimate(self, ctx: ProductContext, memory) -> Optional[Tuple[float, float]]:
+        return self.value, 0.0
+
+
+class RollingFairValue(FairValue):
+    # Mean and sample std of the last `window` mids, once more than `window`
+    # mids have been seen
+
+    def __init__(self, window: int, ddof: int = 1):
+        self.window = window
+        self.ddof = ddof
+
+    def initial_state(self) -> RollingVariance:
+        return RollingVariance(self.window, ddof=self.ddof)
+
+    def estimate(self, ctx: ProductContext, memory: RollingVariance) -> Optional[Tuple[float, float]]:
+        mid = ctx.book.mid
+        if mid is not None:
+            memory.update(mid)
+        if memory.count <= self.window:
+            return None
+        return memory.mean, memory.std
+
+
+class Taker:
+    # Takes the best level on each side when it is priced at least
+    # edge + edge_std * std through fair
+
+    def __init__(self, edge: float = 0.0, edge_std: float = 0.0):
+        self.edge = edge
+        self.edge_std = edge_std
+
+    def __call__(self, ctx: ProductContext) -> None:
+        book = ctx.book
+        width = self.edge + self.edge_std * ctx.std
+        best_ask = book.best_ask
+        if best_ask is not None and best_ask <= ctx.fair - width:
+            qty = min(-book.sell_orders[best_ask], ctx.max_buy)
+            if qty > 0:
+                ctx.buy(best_ask, qty)
+                book.take_ask(best_ask, qty)
+        best_bid = book.best_bid
+        if best_bid is not None and best_bid >= ctx.fair + width:
+            qty = min(book.buy_orders[best_bid], ctx.max_sell)
+            if qty > 0:
+                ctx.sell(best_bid, qty)
+                book.take_bid(best_bid, qty)
+
+
+class Clearer:
+    # Works inventory back towards flat at fair +/- width, sized by the bot
+    # volume resting at or through that price
+
+    def __init__(self, width: float = 0.0):
+        self.width = width
+
+    def __call__(self, ctx: ProductContext) -> None:
+        book = ctx.book
+        net = ctx.net_position
+        our_bid = int(round(ctx.fair - self.width))
+        our_ask = int(round(ctx.fair + self.width))
+        if net > 0:
+            qty = min(bid_volume_at_or_above(book, our_ask), net, ctx.max_sell)
+            if qty > 0:
+                ctx.sell(our_ask, qty)
+        elif net < 0:
+            qty = min(-ask_volume_at_or_below(book, our_bid), -net, ctx.max_buy)
+            if qty > 0:
+                ctx.buy(our_bid, qty)
+
+
+class Quoter:
+    # Quotes the remaining capacity on both sides: joins bot levels within
+    # match_spread of fair, pennies those further out, ignores those within
+    # ignore_spread, and falls back to fair +/- base_spread. Past the soft
+    # limit the reducing side is improved by one tick.
+
+    def __init__(self, ignore_spread: float, match_spread: float, base_spread: float, soft_limit: int):
+        self.ignore_spread = ignore_spread
+        self.match_spread = match_spread
+        self.base_spread = base_spread
+        self.soft_limit = soft_limit
+
+    def __call__(self, ctx: ProductContext) -> None:
+        book = ctx.book
+        fair = ctx.fair
+        ask_above = lowest_ask_above(book, fair + self.ignore_spread)
+        bid_below = highest_bid_below(book, fair - self.ignore_spread)
+        our_ask = round(fair + self.base_spread)
+        our_bid = round(fair - self.base_spread)
+        if ask_above is not None:
+            our_ask = ask_above if abs(ask_above - fair) <= self.match_spread else ask_above - 1
+        if bid_below is not None:
+            our_bid = bid_below if abs(bid_below - fair) <= self.match_spread else bid_below + 1
+        if ctx.position > self.soft_limit:
+            our_ask -= 1
+        if ctx.position < -self.soft_limit:
+            our_bid += 1
+        buy_qty = ctx.max_buy
+        sell_qty = ctx.max_sell
+        if buy_qty > 0:
+            ctx.buy(our_bid, buy_qty)
+        if sell_qty > 0:
+            ctx.sell(our_ask, sell_qty)
+
+
+class ProductStrategy:
+
+    def __init__(self, fair_value: FairValue, taker: Optional[Taker] = None, clearer: Optional[Clearer] = None,
+                 quoter: Optional[Quoter] = None):
+        self.fair_value = fair_value
+        self.steps = [step for step in (taker, clearer, quoter) if step is not None]
+
+    def estimate(self, ctx: ProductContext, memory) -> Optional[Tuple[float, float]]:
+        # Hook for strategies that adjust their steps to the estimate
+        return self.fair_value.estimate(ctx, memory)
+
+
+def log_state(logger: TradeLogger, state: TradingState, products) -> None:
+    # Last tick's executions and the current positions
+    for product in products:
+        position = state.position.get(product, 0)
+        for trade in state.own_trades.get(product, []):
+            if trade.timestamp == state.timestamp - 100:
+                qty = trade.quantity if trade.buyer else -trade.quantity
+                logger.info(EXECUTED, product, trade.price, qty, position)
+    for product in products:
+        position = state.position.get(product, 0)
+        logger.info(POSITION, product, 0, position, position)
+
+
+class Strategy:
+    POSITION_LIMIT = 50
+    POSITION_LIMITS: Dict[str, int] = {}
+
+    def __init__(self):
+        self.logger = TradeLogger()
+        self._registry: Optional[Dict[str, ProductStrategy]] = None
+
+    def components(self) -> Dict[str, ProductStrategy]:
+        raise NotImplementedError
+
+    @property
+    def registry(self) -> Dict[str, ProductStrategy]:
+        if self._registry is None:
+            self._registry = self.components()
+        return self._registry
+
+    def limit(self, product: str) -> int:
+        return self.POSITION_LIMITS.get(product, self.POSITION_LIMIT)
+
+    def run(self, state: TradingState):
+        registry = self.registry
+        data = decode(state.traderData) if state.traderData else {}
+        log_state(self.logger, state, registry)
+
+        result = {}
+        for product, spec in registry.items():
+            order_depth = state.order_depths.get(product)
+            if order_depth is None:
+                continue
+            if product not in data:
+                data[product] = spec.fair_value.initial_state()
+            ctx = ProductContext(product, BookSnapshot(order_depth), state.position.get(product, 0),
+                                 self.limit(product), self.logger, state.market_trades.get(product, []))
+            estimate = spec.estimate(ctx, data[product])
+            if estimate is None:
+                continue
+            ctx.fair, ctx.std = estimate
+            for step in spec.steps:
+                step(ctx)
+            result[product] = ctx.orders
+
+        self.logger.flush(state.timestamp)
+        return result, 0, encode(data)
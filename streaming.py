@@ -0,0 +1,181 @@
+import glob
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from backtester import PriceData, Tick, build_order_depth
+from datamodel import OrderDepth, Trade
+
+# Lazy multi-file market data. Round data ships as one prices file and one
+# trades file per day:
+#   prices_round_1_day_-2.csv   day;timestamp;product;bid_price_1;...
+#   trades_round_1_day_-2.csv   timestamp;buyer;seller;symbol;currency;price;quantity
+# Files are read in fixed-size chunks and turned into Ticks as they are read,
+# so memory stays flat in the number of days and the first tick is available
+# as soon as the first chunk is parsed. A single prices file with a `day`
+# column (like data.csv) works too, with or without a trades file. Trades are
+# matched to ticks on (day, timestamp) when the trades file has a `day`
+# column; without one, timestamps restart every day, so such a file is
+# rejected if its prices span more than one day.
+
+CHUNK_ROWS = 10_000
+FILE_PATTERN = re.compile(r"(prices|trades)_round_(-?\d+)_day_(-?\d+)\.csv$")
+
+
+class DayFiles:
+
+    def __init__(self, prices: str, trades: Optional[str] = None, round_: int = 0, day: Optional[int] = None):
+        self.prices = prices
+        self.trades = trades
+        self.round = round_
+        self.day = day
+
+    def __repr__(self) -> str:
+        return f"DayFiles(round={self.round}, day={self.day}, prices={self.prices!r}, trades={self.trades!r})"
+
+
+def discover(paths: Iterable[str]) -> List[DayFiles]:
+    # Accepts directories and/or files; returns days in chronological order
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.csv"))))
+        else:
+            files.append(path)
+
+    days: Dict[Tuple[int, int], DayFiles] = {}
+    loose: List[DayFiles] = []
+    loose_trades: List[str] = []
+    for path in files:
+        match = FILE_PATTERN.search(os.path.basename(path))
+        if match is None:
+            if "trades" in os.path.basename(path):
+                loose_trades.append(path)
+            else:
+                loose.append(DayFiles(path))
+            continue
+        kind, round_, day = match.group(1), int(match.group(2)), int(match.group(3))
+        entry = days.setdefault((round_, day), DayFiles("", None, round_, day))
+        if kind == "prices":
+            entry.prices = path
+        else:
+            entry.trades = path
+    missing = [entry for entry in days.values() if not entry.prices]
+    if missing:
+        raise ValueError(f"Trades file without matching prices file: {missing[0].trades}")
+    if len(loose) == 1 and len(loose_trades) == 1:
+        loose[0].trades = loose_trades[0]
+    return [days[key] for key in sorted(days)] + loose
+
+
+class TradeCursor:
+    # Hands out market trades tick by tick from a chunked trades file
+
+    def __init__(self, path: Optional[str], chunk_rows: int = CHUNK_ROWS):
+        self.path = path
+        self._chunks = iter(pd.read_csv(path, sep=";", chunksize=chunk_rows)) if path else iter(())
+        self._by_day = path is not None and "day" in pd.read_csv(path, sep=";", nrows=0).columns
+        self._day: Optional[int] = None  # the only day a file without a day column may cover
+        # ((day or None, timestamp), trade)
+        self._buffer: List[Tuple[Tuple[Optional[int], int], Trade]] = []
+        self._exhausted = path is None
+
+    def _fill(self) -> bool:
+        if self._exhausted:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._exhausted = True
+            return False
+        days = chunk["day"].astype(int).tolist() if self._by_day else [None] * len(chunk)
+        for day, ts, buyer, seller, symbol, price, quantity in zip(
+                days, chunk["timestamp"].tolist(), chunk["buyer"].fillna("").tolist(),
+                chunk["seller"].fillna("").tolist(), chunk["symbol"].tolist(), chunk["price"].astype(float).tolist(),
+                chunk["quantity"].tolist()):
+            # Prices are integers on the exchange but may be written as 10000.0
+            price = int(price) if price.is_integer() else price
+            self._buffer.append(((day, int(ts)), Trade(symbol, price, int(quantity), buyer, seller, int(ts))))
+        return True
+
+    def until(self, day: int, timestamp: int) -> Dict[str, List[Trade]]:
+        # Every trade at or before (day, timestamp) that has not been handed out yet
+        if self._by_day:
+            key = (day, timestamp)
+        else:
+            if self.path is not None and self._day is not None and day != self._day:
+                raise ValueError(f"{self.path} has no day column but its prices span days {self._day} and {day}; "
+                                 "add a day column or split it into one file per day")
+            self._day = day
+            key = (None, timestamp)
+        while (not self._buffer or self._buffer[-1][0] <= key) and self._fill():
+            pass
+        trades: Dict[str, List[Trade]] = {}
+        i = 0
+        for trade_key, trade in self._buffer:
+            if trade_key > key:
+                break
+            trades.setdefault(trade.symbol, []).append(trade)
+            i += 1
+        del self._buffer[:i]
+        return trades
+
+
+def stream_day(files: DayFiles, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tick]:
+    trades = TradeCursor(files.trades, chunk_rows)
+    pending: Optional[pd.DataFrame] = None
+
+    def emit(frame: pd.DataFrame) -> Iterator[Tick]:
+        if files.day is not None and "day" not in frame:
+            frame = frame.assign(day=files.day)
+        for tick in PriceData.from_frame(frame).ticks():
+            yield tick._replace(market_trades=trades.until(tick.day, tick.timestamp))
+
+    for chunk in pd.read_csv(files.prices, sep=";", chunksize=chunk_rows):
+        frame = chunk if pending is None else pd.concat([pending, chunk], ignore_index=True)
+        # The chunk may end halfway through a tick; hold that tick back
+        last = (frame["timestamp"] == frame["timestamp"].iloc[-1])
+        if "day" in frame:
+            last &= frame["day"] == frame["day"].iloc[-1]
+        pending = frame[last]
+        complete = frame[~last]
+        if len(complete):
+            yield from emit(complete)
+    if pending is not None and len(pending):
+        yield from emit(pending)
+
+
+def stream_ticks(paths: Iterable[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[Tick]:
+    for files in discover(paths):
+        yield from stream_day(files, chunk_rows)
+
+
+def stream_order_depths(paths: Iterable[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[int, int, Dict[str, OrderDepth]]]:
+    for tick in stream_ticks(paths, chunk_rows):
+        yield tick.day, tick.timestamp, {p: build_order_depth(lv) for p, lv in tick.levels.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    from backtester import Backtester, load_trader
+    from matching import FILL_MODELS, make_engine
+
+    parser = argparse.ArgumentParser(description="Backtest over many day files without loading them all")
+    parser.add_argument("trader")
+    parser.add_argument("data", nargs="+", help="prices/trades files or directories holding them")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--fills", default="none", choices=sorted(FILL_MODELS))
+    args = parser.parse_args(argv)
+
+    for files in discover(args.data):
+        print(f"round {files.round} day {files.day}: {files.prices}" + (f" + {files.trades}" if files.trades else ""))
+    trader = load_trader(args.trader)()
+    result = Backtester(trader, engine=make_engine(args.fills)).run(stream_ticks(args.data, args.chunk_rows))
+    summary = result.summary()
+    print(f"Total pnl {summary['pnl']:.1f}, max drawdown {summary['max_drawdown']:.1f}, "
+          f"{summary['fills']} fills over {len(result.day)} ticks in {result.elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
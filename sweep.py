@@ -0,0 +1,196 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from backtester import Backtester, BacktestResult, PriceData, load_trader
+from datastore import MarketStore, convert
+
+# Parameter sweeps over a Trader's class-level constants. Each parameter set
+# is applied with setattr on a fresh Trader instance and backtested in a
+# worker process. Each worker opens the market data once, from a MarketStore
+# converted once from a CSV, instead of receiving it pickled with every task.
+# price_data() maps the store's time-ordered replay columns read-only, so all
+# workers share the same pages of the page cache.
+# Finished runs are appended to a JSON-lines cache keyed by a hash of the
+# trader's source (and the repo modules it imports), the data's content and
+# the params, so an interrupted sweep resumes where it stopped and edits to
+# the trader or the data invalidate old rows.
+
+CACHE_DIR = ".sweep_cache"
+
+Params = Dict[str, Any]
+# A list means "choose from these"; a (low, high) tuple means a uniform range,
+# integer-valued if both ends are ints.
+Space = Dict[str, Union[Sequence[Any], Tuple[float, float]]]
+
+
+def grid(space: Space) -> List[Params]:
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_search(space: Space, n: int, seed: int = 0) -> List[Params]:
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(n):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple) and len(values) == 2:
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = rng.randint(low, high)
+                else:
+                    params[name] = rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(list(values))
+        samples.append(params)
+    return samples
+
+
+def param_key(source: str, data: str, params: Params) -> str:
+    # source and data are resultcache.source_hash / data_hash digests
+    payload = json.dumps({"source": source, "data": data, "params": params}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def ensure_store(data_path: str, cache_dir: str = CACHE_DIR) -> str:
+    # Sweeps always read a MarketStore; CSVs are converted once per file version
+    if os.path.isdir(data_path):
+        return data_path
+    stat = os.stat(data_path)
+    tag = hashlib.sha1(f"{os.path.abspath(data_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+    store_path = os.path.join(cache_dir, f"{os.path.basename(data_path)}.{tag}.store")
+    if not os.path.exists(os.path.join(store_path, "meta.json")) or not MarketStore(store_path).has_replay:
+        convert(data_path, store_path)
+    return store_path
+
+
+def make_trader(trader_cls: type, params: Params):
+    trader = trader_cls()
+    for name, value in params.items():
+        if not hasattr(trader, name):
+            raise AttributeError(f"{trader_cls.__name__} has no parameter {name!r}")
+        setattr(trader, name, value)
+    return trader
+
+
+# Per-process state, set once by the pool initializer
+_worker_data: Optional[PriceData] = None
+_worker_traders: Dict[str, type] = {}
+
+
+def _init_worker(store_path: str) -> None:
+    global _worker_data
+    _worker_data = MarketStore(store_path).price_data()
+
+
+def run_params(trader_path: str, params: Params, data: Optional[PriceData] = None) -> Dict[str, Any]:
+    data = data if data is not None else _worker_data
+    trader_cls = _worker_traders.get(trader_path)
+    if trader_cls is None:
+        trader_cls = _worker_traders[trader_path] = load_trader(trader_path)
+    trader = make_trader(trader_cls, params)
+    return result_row(Backtester(trader).run(data.ticks(), data.products))
+
+
+def result_row(result: BacktestResult) -> Dict[str, Any]:
+    row = result.summary()
+    row["elapsed"] = result.elapsed
+    for j, product in enumerate(result.products):
+        row[f"pnl_{product}"] = float(result.pnl[-1, j]) if len(result.day) else 0.0
+    return row
+
+
+class Sweep:
+
+    def __init__(self, trader_path: str, data_path: str = "data.csv",
+                 cache_path: Optional[str] = None, workers: Optional[int] = None):
+        self.trader_path = trader_path
+        self.data_path = data_path
+        self.workers = workers or os.cpu_count() or 1
+        if cache_path is None:
+            name = os.path.splitext(os.path.basename(trader_path))[0]
+            cache_path = os.path.join(CACHE_DIR, f"{name}.results.jsonl")
+        self.cache_path = cache_path
+
+    def load_cache(self) -> Dict[str, Dict[str, Any]]:
+        cached = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        record = json.loads(line)
+                        cached[record["key"]] = record
+        return cached
+
+    def run(self, param_sets: List[Params]) -> pd.DataFrame:
+        from resultcache import data_hash, source_hash
+
+        cached = self.load_cache()
+        source, data = source_hash(self.trader_path), data_hash(self.data_path)
+        keyed = [(param_key(source, data, p), p) for p in param_sets]
+        pending = {key: params for key, params in keyed if key not in cached}
+
+        if pending:
+            store_path = ensure_store(self.data_path)
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "a") as out, ProcessPoolExecutor(
+                    self.workers, initializer=_init_worker, initargs=(store_path,)) as pool:
+                futures = {pool.submit(run_params, self.trader_path, params): key for key, params in pending.items()}
+                for future in as_completed(futures):
+                    key = futures[future]
+                    record = {"key": key, "params": pending[key], "result": future.result()}
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+                    cached[key] = record
+
+        rows = []
+        for key, params in keyed:
+            record = cached[key]
+            rows.append({**params, **record["result"], "key": key})
+        return pd.DataFrame(rows)
+
+
+def parse_values(text: str) -> List[Any]:
+    values = []
+    for item in text.split(","):
+        try:
+            values.append(json.loads(item))
+        except ValueError:
+            values.append(item)
+    return values
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Grid or random search over Trader constants")
+    parser.add_argument("trader")
+    parser.add_argument("data", nargs="?", default="data.csv")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="values for one class attribute; repeat per parameter")
+    parser.add_argument("--random", type=int, default=0, metavar="N", help="sample N sets instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--sort", default="pnl")
+    args = parser.parse_args(argv)
+
+    space = {}
+    for spec in args.param:
+        name, _, values = spec.partition("=")
+        space[name] = parse_values(values)
+    param_sets = random_search(space, args.random, args.seed) if args.random else grid(space)
+    table = Sweep(args.trader, args.data, workers=args.workers).run(param_sets)
+    with pd.option_context("display.max_rows", 50, "display.width", 200):
+        print(table.drop(columns="key").sort_values(args.sort, ascending=False).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from backtester import LEVELS, PriceData, load_prices
+from datastore import DAY_SPAN, FORMAT_VERSION as STORE_VERSION, REPLAY_DIR, REPLAY_COLUMNS, SIDES, column_dtypes
+
+# Seeded synthetic prices in the data.csv schema, for load and scaling
+# tests. Each product gets a fair value process fitted to its mid prices:
+#   "ou"    mean-reverting AR(1) x' = mu + b (x - mu) + N(0, sigma)
+#   "walk"  random walk whose steps are resampled from the observed mid moves
+# and its books are observed book shapes (level offsets from floor(mid) and
+# volumes, resampled whole rows) placed around floor(fair). Deeper books
+# extend each side with resampled level gaps and volumes.
+#
+# Generation runs over chunks of ticks with every random stream drawn
+# element by element from its own generator, so the output depends on the
+# seed but not on the chunk size, and memory is bounded by the chunk.
+
+DEFAULT_KINDS = {"RAINFOREST_RESIN": "ou", "KELP": "walk"}
+TICK_STEP = 100
+CHUNK_TICKS = 50_000
+
+
+class ProductModel:
+
+    def __init__(self, name: str, kind: str, start: float, mu: float, b: float, sigma: float,
+                 steps: np.ndarray, bid_offsets: np.ndarray, bid_volumes: np.ndarray,
+                 ask_offsets: np.ndarray, ask_volumes: np.ndarray, gaps: np.ndarray, volumes: np.ndarray):
+        self.name = name
+        self.kind = kind
+        self.start = start
+        self.mu = mu
+        self.b = b
+        self.sigma = sigma
+        self.steps = steps  # observed mid moves, for "walk"
+        # Book shapes, (rows, LEVELS); offsets from floor(mid), volume 0 = empty level
+        self.bid_offsets = bid_offsets
+        self.bid_volumes = bid_volumes
+        self.ask_offsets = ask_offsets
+        self.ask_volumes = ask_volumes
+        # Pools for levels past the observed depth
+        self.gaps = gaps
+        self.volumes = volumes
+
+    def __repr__(self) -> str:
+        if self.kind == "ou":
+            return f"ProductModel({self.name}, ou, mu={self.mu:.2f}, b={self.b:.3f}, sigma={self.sigma:.3f})"
+        return f"ProductModel({self.name}, walk, start={self.start:.1f}, step std={self.steps.std():.3f})"
+
+    def shifted(self, name: str, offset: float) -> "ProductModel":
+        # Same dynamics and book shapes around a different price level
+        return ProductModel(name, self.kind, self.start + offset, self.mu + offset, self.b, self.sigma, self.steps,
+                            self.bid_offsets, self.bid_volumes, self.ask_offsets, self.ask_volumes,
+                            self.gaps, self.volumes)
+
+
+def fit(source: Union[str, PriceData], kinds: Optional[Dict[str, str]] = None) -> Dict[str, ProductModel]:
+    data = load_prices(source) if isinstance(source, str) else source
+    kinds = {**DEFAULT_KINDS, **(kinds or {})}
+    models = {}
+    for code, product in enumerate(data.products):
+        rows = data.product == code
+        mid = data.mid_price[rows]
+        mu = float(mid.mean())
+        x, y = mid[:-1] - mu, mid[1:] - mu
+        b = float(np.clip(np.dot(x, y) / np.dot(x, x), 0.0, 0.999)) if np.dot(x, x) > 0 else 0.0
+        sigma = float(np.std(y - b * x)) if len(x) else 0.0
+        kind = kinds.get(product, "ou" if b < 0.9 else "walk")
+
+        ref = np.floor(mid).astype(np.int64)[:, None]
+        bid_volumes = data.bid_volume[rows]
+        ask_volumes = data.ask_volume[rows]
+        bid_offsets = np.where(bid_volumes > 0, data.bid_price[rows] - ref, 0)
+        ask_offsets = np.where(ask_volumes > 0, data.ask_price[rows] - ref, 0)
+        bid_gaps = -np.diff(data.bid_price[rows], axis=1)[(bid_volumes[:, 1:] > 0)]
+        ask_gaps = np.diff(data.ask_price[rows], axis=1)[(ask_volumes[:, 1:] > 0)]
+        gaps = np.concatenate((bid_gaps, ask_gaps))
+        volumes = np.concatenate((bid_volumes[bid_volumes > 0], ask_volumes[ask_volumes > 0]))
+        models[product] = ProductModel(
+            product, kind, float(mid[0]), mu, b, sigma, np.diff(mid),
+            bid_offsets, bid_volumes, ask_offsets, ask_volumes,
+            gaps if len(gaps) else np.ones(1, dtype=np.int64), volumes,
+        )
+    return models
+
+
+def expand(models: Dict[str, ProductModel], n_products: int, spacing: float = 1000.0) -> Dict[str, ProductModel]:
+    # Pads the fitted models to n_products with shifted copies, SYNTH_01, ...
+    out = dict(models)
+    base = list(models.values())
+    i = 0
+    while len(out) < n_products:
+        model = base[i % len(base)]
+        i += 1
+        out[f"SYNTH_{i:02d}"] = model.shifted(f"SYNTH_{i:02d}", spacing * i)
+    return out
+
+
+def _ar1(noise: np.ndarray, b: float, carry: float) -> np.ndarray:
+    # y[t] = b * y[t-1] + noise[t] with y[-1] = carry, as a log-depth scan
+    y = noise.copy()
+    if len(y) == 0:
+        return y
+    y[0] += b * carry
+    shift, coef = 1, b
+    while shift < len(y) and coef > 1e-300:
+        y[shift:] = y[shift:] + coef * y[:-shift]
+        shift *= 2
+        coef *= coef
+    return y
+
+
+def _extend(prices: np.ndarray, volumes: np.ndarray, levels: int, sign: int, gaps: np.ndarray,
+            extra_volumes: np.ndarray) -> tuple:
+    # Fills every row out to `levels` levels: past the row's deepest level,
+    # prices step away from the touch by resampled gaps
+    n, observed = prices.shape
+    depth = (volumes > 0).sum(axis=1)
+    deepest = np.take_along_axis(prices, np.maximum(depth - 1, 0)[:, None], axis=1)[:, 0]
+    steps = np.cumsum(gaps, axis=1)
+    out_prices = np.zeros((n, levels), dtype=np.int64)
+    out_volumes = np.zeros((n, levels), dtype=np.int64)
+    out_prices[:, :observed] = prices
+    out_volumes[:, :observed] = volumes
+    position = np.arange(levels)[None, :]
+    fill = (position >= depth[:, None]) & (depth > 0)[:, None]
+    k = np.clip(position - depth[:, None], 0, steps.shape[1] - 1)
+    out_prices[fill] = (deepest[:, None] + sign * np.take_along_axis(steps, k, axis=1))[fill]
+    out_volumes[fill] = extra_volumes[fill]
+    return out_prices, out_volumes
+
+
+class _ProductStream:
+    # Per-product generator state carried between chunks
+
+    def __init__(self, model: ProductModel, seed: np.random.SeedSequence):
+        self.model = model
+        # One generator per stream, each drawn in tick order, so draws never
+        # depend on how the ticks are split into chunks
+        noise, shape, gaps, volumes = seed.spawn(4)
+        self.noise = np.random.default_rng(noise)
+        self.shape = np.random.default_rng(shape)
+        self.gaps = np.random.default_rng(gaps)
+        self.volumes = np.random.default_rng(volumes)
+        self.value = model.start
+
+    def chunk(self, n: int, levels: int) -> Dict[str, np.ndarray]:
+        model = self.model
+        if model.kind == "ou":
+            y = _ar1(self.noise.standard_normal(n) * model.sigma, model.b, self.value - model.mu)
+            fair = model.mu + y
+        else:
+            fair = self.value + np.cumsum(self.noise.choice(model.steps, n))
+        if n:
+            self.value = float(fair[-1])
+
+        pick = self.shape.integers(len(model.bid_offsets), size=n)
+        ref = np.floor(fair).astype(np.int64)[:, None]
+        bid_volumes = model.bid_volumes[pick].astype(np.int64)
+        ask_volumes = model.ask_volumes[pick].astype(np.int64)
+        bid_prices = np.where(bid_volumes > 0, ref + model.bid_offsets[pick], 0)
+        ask_prices = np.where(ask_volumes > 0, ref + model.ask_offsets[pick], 0)
+        if levels > bid_prices.shape[1]:
+            gaps = self.gaps.choice(model.gaps, (n, 2, levels))
+            volumes = self.volumes.choice(model.volumes, (n, 2, levels))
+            bid_prices, bid_volumes = _extend(bid_prices, bid_volumes, levels, -1, gaps[:, 0], volumes[:, 0])
+            ask_prices, ask_volumes = _extend(ask_prices, ask_volumes, levels, 1, gaps[:, 1], volumes[:, 1])
+        else:
+            bid_prices, bid_volumes = bid_prices[:, :levels], bid_volumes[:, :levels]
+            ask_prices, ask_volumes = ask_prices[:, :levels], ask_volumes[:, :levels]
+        two_sided = (bid_volumes[:, 0] > 0) & (ask_volumes[:, 0] > 0)
+        return {"bid_price": bid_prices, "bid_volume": bid_volumes,
+                "ask_price": ask_prices, "ask_volume": ask_volumes,
+                "mid_price": np.where(two_sided, (bid_prices[:, 0] + ask_prices[:, 0]) / 2, np.nan)}
+
+
+def generate(models: Dict[str, ProductModel], days: int = 1, ticks_per_day: int = 10_000, seed: int = 0,
+             levels: int = LEVELS, first_day: int = 0,
+             chunk_ticks: int = CHUNK_TICKS) -> Iterator[Dict[str, np.ndarray]]:
+    # Yields chunks of rows in (day, timestamp, product) order as column
+    # arrays; price/volume columns are (rows, levels) with 0 = empty level
+    products = sorted(models)
+    root = np.random.SeedSequence(seed)
+    streams = [_ProductStream(models[p], s) for p, s in zip(products, root.spawn(len(products)))]
+    k = len(products)
+    for d in range(days):
+        for lo in range(0, ticks_per_day, chunk_ticks):
+            n = min(chunk_ticks, ticks_per_day - lo)
+            parts = [stream.chunk(n, levels) for stream in streams]
+            chunk = {"day": np.full(n * k, first_day + d, dtype=np.int64),
+                     "timestamp": np.repeat(np.arange(lo, lo + n, dtype=np.int64) * TICK_STEP, k),
+                     "product": np.tile(np.arange(k, dtype=np.int16), n)}
+            # Interleave products tick by tick
+            for name in parts[0]:
+                stacked = np.stack([part[name] for part in parts], axis=1)
+                chunk[name] = stacked.reshape((n * k,) + stacked.shape[2:])
+            yield chunk
+
+
+def chunk_frame(chunk: Dict[str, np.ndarray], products: List[str]) -> pd.DataFrame:
+    columns = {"day": chunk["day"], "timestamp": chunk["timestamp"],
+               "product": np.asarray(products, dtype=object)[chunk["product"]]}
+    levels = chunk["bid_price"].shape[1]
+    for side in ("bid", "ask"):
+        for i in range(levels):
+            empty = chunk[f"{side}_volume"][:, i] == 0
+            columns[f"{side}_price_{i + 1}"] = pd.arrays.IntegerArray(chunk[f"{side}_price"][:, i], empty)
+            columns[f"{side}_volume_{i + 1}"] = pd.arrays.IntegerArray(chunk[f"{side}_volume"][:, i], empty)
+    order = ["day", "timestamp", "product"] + [f"{side}_{kind}_{i}" for side in ("bid", "ask")
+                                               for i in range(1, levels + 1) for kind in ("price", "volume")]
+    frame = pd.DataFrame(columns)[order]
+    frame["mid_price"] = chunk["mid_price"]
+    frame["profit_and_loss"] = 0.0
+    return frame
+
+
+def write_csv(models: Dict[str, ProductModel], out_dir: str, days: int = 1, round_: int = 0, first_day: int = 0,
+              **kwargs) -> List[str]:
+    # One prices_round_R_day_D.csv per day, as streaming.discover expects
+    os.makedirs(out_dir, exist_ok=True)
+    products = sorted(models)
+    paths = []
+    for chunk in generate(models, days=days, first_day=first_day, **kwargs):
+        day = int(chunk["day"][0])
+        path = os.path.join(out_dir, f"prices_round_{round_}_day_{day}.csv")
+        first = int(chunk["timestamp"][0]) == 0
+        if first:
+            paths.append(path)
+        chunk_frame(chunk, products).to_csv(path, sep=";", index=False, mode="w" if first else "a",
+                                            header=first)
+    return paths
+
+
+def write_store(models: Dict[str, ProductModel], out_dir: str, days: int = 1, ticks_per_day: int = 10_000,
+                levels: int = LEVELS, first_day: int = 0, **kwargs) -> str:
+    # A datastore.MarketStore directory, filled chunk by chunk through
+    # preallocated memory-mapped .npy columns (rows grouped by product)
+    os.makedirs(out_dir, exist_ok=True)
+    products = sorted(models)
+    k = len(products)
+    total_ticks = days * ticks_per_day
+    rows = total_ticks * k
+    dtypes = column_dtypes(levels)
+    columns = {name: np.lib.format.open_memmap(os.path.join(out_dir, name + ".npy"), mode="w+",
+                                               dtype=dtype, shape=(rows,))
+               for name, dtype in dtypes.items()}
+    time_index = np.lib.format.open_memmap(os.path.join(out_dir, "time_index.npy"), mode="w+",
+                                           dtype=np.int64, shape=(rows,))
+    os.makedirs(os.path.join(out_dir, REPLAY_DIR), exist_ok=True)
+    replay = {name: np.lib.format.open_memmap(os.path.join(out_dir, REPLAY_DIR, name + ".npy"), mode="w+",
+                                              dtype=dtypes[name], shape=(rows,))
+              for name in REPLAY_COLUMNS}
+    replay.update({name: np.lib.format.open_memmap(os.path.join(out_dir, REPLAY_DIR, name + ".npy"), mode="w+",
+                                                   dtype=np.int32, shape=(rows, levels))
+                   for name in SIDES})
+
+    g = 0  # global tick of the chunk start
+    for chunk in generate(models, days=days, ticks_per_day=ticks_per_day, levels=levels,
+                          first_day=first_day, **kwargs):
+        n = len(chunk["day"]) // k
+        ticks = np.arange(g, g + n)
+        # Time-ordered row t*k + j lives at product-major row j*total_ticks + t
+        time_index[g * k:(g + n) * k] = (np.arange(k)[None, :] * total_ticks + ticks[:, None]).ravel()
+        # Chunks are already time-ordered, so the replay columns are appended as is
+        rows_t = slice(g * k, (g + n) * k)
+        replay["day"][rows_t] = chunk["day"]
+        replay["timestamp"][rows_t] = chunk["timestamp"]
+        replay["product"][rows_t] = chunk["product"]
+        replay["mid_price"][rows_t] = chunk["mid_price"]
+        replay["profit_and_loss"][rows_t] = 0.0
+        for name in SIDES:
+            replay[name][rows_t] = chunk[name]
+        for j in range(k):
+            rows_j = slice(j * total_ticks + g, j * total_ticks + g + n)
+            mine = slice(j, None, k)
+            columns["day"][rows_j] = chunk["day"][mine]
+            columns["timestamp"][rows_j] = chunk["timestamp"][mine]
+            columns["clock"][rows_j] = chunk["day"][mine] * DAY_SPAN + chunk["timestamp"][mine]
+            columns["product"][rows_j] = j
+            for side in ("bid", "ask"):
+                for kind in ("price", "volume"):
+                    values = chunk[f"{side}_{kind}"][mine]
+                    for i in range(levels):
+                        columns[f"{side}_{kind}_{i + 1}"][rows_j] = values[:, i]
+            columns["mid_price"][rows_j] = chunk["mid_price"][mine]
+            columns["profit_and_loss"][rows_j] = 0.0
+        g += n
+    for array in list(columns.values()) + [time_index] + list(replay.values()):
+        array.flush()
+
+    meta = {
+        "version": STORE_VERSION,
+        "rows": rows,
+        "levels": levels,
+        "products": products,
+        "offsets": [j * total_ticks for j in range(k + 1)],
+        "columns": dtypes,
+        "replay": True,
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    return out_dir
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic prices fitted to a prices file")
+    parser.add_argument("out", help="output directory")
+    parser.add_argument("--fit", default="data.csv", help="prices file to fit the product models to")
+    parser.add_argument("--format", choices=["csv", "store"], default="csv")
+    parser.add_argument("--products", type=int, default=0, help="pad with shifted copies up to this many products")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--ticks", type=int, default=10_000, help="ticks per day")
+    parser.add_argument("--levels", type=int, default=LEVELS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--round", type=int, default=0)
+    parser.add_argument("--first-day", type=int, default=0)
+    parser.add_argument("--chunk-ticks", type=int, default=CHUNK_TICKS)
+    args = parser.parse_args(argv)
+
+    models = expand(fit(args.fit), args.products)
+    for model in models.values():
+        print(model)
+    start = time.perf_counter()
+    kwargs = dict(days=args.days, ticks_per_day=args.ticks, levels=args.levels, seed=args.seed,
+                  first_day=args.first_day, chunk_ticks=args.chunk_ticks)
+    if args.format == "csv":
+        paths = write_csv(models, args.out, round_=args.round, **kwargs)
+        size = sum(os.path.getsize(p) for p in paths)
+    else:
+        write_store(models, args.out, **kwargs)
+        size = sum(os.path.getsize(os.path.join(args.out, f)) for f in os.listdir(args.out))
+    elapsed = time.perf_counter() - start
+    rows = args.days * args.ticks * len(models)
+    print(f"{rows} rows ({len(models)} products x {args.days} days x {args.ticks} ticks, {args.levels} levels) "
+          f"-> {args.out} [{args.format}], {size / 2 ** 20:.1f} MiB in {elapsed:.2f}s "
+          f"({rows / elapsed / 1e6:.2f} M rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from adaptive import Candidates, PopulationState, ShadowPopulation
+from backtester import Backtester, load_prices, load_trader
+from datamodel import OrderDepth
+from state_codec import decode, encode
+from strategy import BookSnapshot, ProductContext, Taker
+from tradelog import TradeLogger
+
+QUIET = {99: 1}, {101: 1}
+
+
+def make_ctx(bids, asks, position=0, market_trades=()):
+    depth = OrderDepth()
+    depth.buy_orders = dict(bids)
+    depth.sell_orders = {p: -v for p, v in asks.items()}
+    return ProductContext("X", BookSnapshot(depth), position, 50, TradeLogger(), market_trades)
+
+
+def warm(population, memory, ticks=3):
+    for _ in range(ticks):
+        population.estimate(make_ctx(*QUIET), memory)
+    memory.bid_quantity[:] = 0
+    memory.ask_quantity[:] = 0
+
+
+def test_shadow_takes_use_taker_capacity():
+    population = ShadowPopulation(Candidates.grid(window=(1,)), limit=50)
+    memory = population.initial_state()
+    warm(population, memory)
+    memory.position[:] = 45
+    cash = memory.cash.copy()
+    # Both sides priced through fair 100: selling may not use the room the buy frees up
+    bids, asks = {105: 100}, {95: 20}
+    assert population.estimate(make_ctx(bids, asks), memory) == (100.0, 0.0)
+    assert memory.position.tolist() == [45 + 5 - 95]
+    assert memory.cash.tolist() == (cash - 5 * 95 + 95 * 105).tolist()
+
+    ctx = make_ctx(bids, asks, position=45)
+    ctx.fair = 100.0
+    Taker(0.0, 0.5)(ctx)
+    assert [(o.price, o.quantity) for o in ctx.orders] == [(95, 5), (105, -95)]
+
+
+def test_score_follows_mark_to_market():
+    # No takes: only the virtual positions move the score
+    population = ShadowPopulation(Candidates.grid(window=(1,), take_edge=(100.0,), base_spread=(3, 4)), limit=50)
+    memory = population.initial_state()
+    warm(population, memory)
+    memory.position[:] = [10, -10]
+    memory.mtm = memory.cash + memory.position * 100.0
+    population.estimate(make_ctx({101: 1}, {103: 1}), memory)
+    assert memory.score.tolist() == pytest.approx([20.0, -20.0])
+
+
+@pytest.mark.parametrize("lead, switched", [(4.0, False), (10.0, True)])
+def test_switches_only_past_the_margin(lead, switched):
+    population = ShadowPopulation(Candidates.grid(window=(1,), take_edge=(100.0,), base_spread=(3, 4)),
+                                  limit=50, margin=5.0)
+    memory = population.initial_state()
+    warm(population, memory)
+    memory.score[:] = [0.0, lead]
+    population.estimate(make_ctx(*QUIET), memory)
+    assert memory.active == int(switched) and memory.switches == int(switched)
+
+
+def test_waits_for_the_live_candidate_to_warm_up():
+    population = ShadowPopulation(Candidates.grid(window=(1, 3)), limit=50, start=1)
+    memory = population.initial_state()
+    estimates = [population.estimate(make_ctx(*QUIET), memory) for _ in range(3)]
+    # Candidate 1 is cold, so the warm candidate 0 takes over
+    assert estimates[0] is None and estimates[1] == (100.0, 0.0)
+    assert memory.active == 0
+
+
+def test_population_state_round_trips_through_trader_data():
+    population = ShadowPopulation(Candidates.grid(window=(1, 2), base_spread=(2, 3)), limit=50)
+    memory = population.initial_state()
+    for mid in (100, 101, 103, 102, 100):
+        population.estimate(make_ctx({mid - 1: 5}, {mid + 1: 5}), memory)
+    restored = decode(encode({"X": memory}))["X"]
+    assert isinstance(restored, PopulationState)
+    assert (restored.count, restored.active, restored.switches) == (memory.count, memory.active, memory.switches)
+    for name in PopulationState.ARRAYS:
+        np.testing.assert_array_equal(getattr(restored, name), getattr(memory, name))
+    assert population.estimate(make_ctx({98: 5}, {100: 5}), restored) == \
+        population.estimate(make_ctx({98: 5}, {100: 5}), memory)
+
+
+def test_adaptive_trader_replays_from_trader_data():
+    trader = load_trader("tutorial_v2.py")()
+    trader.KELP_ADAPTIVE = True
+    backtester = Backtester(trader)
+    data = load_prices("data.csv")
+    result = backtester.run(data.ticks(), data.products)
+    memory = decode(backtester.trader_data)["KELP"]
+    assert result.total_pnl == 1581
+    assert memory.switches == 16
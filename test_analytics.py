@@ -0,0 +1,23 @@
+import numpy as np
+
+from analytics import RunAnalytics
+from backtester import FILL_DTYPE
+
+
+def test_realized_and_inventory_through_a_position_flip():
+    # tick 1 sells through a long of 2 into a short of 1, tick 2 buys back through it
+    fills = np.array([(0, 0, 100, 2, False), (1, 0, 104, -3, False), (2, 0, 101, 2, True), (4, 0, 99, -1, False)],
+                     dtype=FILL_DTYPE)
+    mid = np.array([[101.0], [103.0], [100.0], [102.0], [98.0]])
+    run = RunAnalytics(["X"], np.zeros(5, dtype=np.int64), mid, fills)
+
+    assert run.position[:, 0].tolist() == [2, -1, 1, 1, 0]
+    # FIFO lots: +2 x (104 - 100), then the short at 104 closed at 101, then the long at 101 closed at 99
+    assert run.realized[:, 0].tolist() == [0.0, 8.0, 11.0, 11.0, 9.0]
+    assert run.mtm[:, 0].tolist() == [2.0, 9.0, 10.0, 12.0, 9.0]
+    assert run.inventory[:, 0].tolist() == [2.0, 1.0, -1.0, 1.0, 0.0]
+
+    row = run.per_product().loc["X"]
+    assert (row["pnl"], row["realized"], row["inventory"]) == (9.0, 9.0, 0.0)
+    assert (row["volume"], row["turnover"], row["max_abs_position"]) == (8, 813.0, 2)
+    assert row["max_drawdown"] == 3.0
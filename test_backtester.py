@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import LEVELS, Backtester, PriceData, load_prices
+from bookcodec import BookDeltas
+from datastore import convert
+
+
+@pytest.fixture
+def deep_csv(tmp_path):
+    # data.csv with two extra levels behind every full three-level side
+    df = pd.read_csv("data.csv", sep=";")
+    for side, sign in (("bid", -1), ("ask", 1)):
+        full = df[f"{side}_price_3"].notna()
+        for i in (4, 5):
+            df[f"{side}_price_{i}"] = (df[f"{side}_price_3"] + sign * (i - 3)).where(full)
+            df[f"{side}_volume_{i}"] = pd.Series(i, index=df.index).where(full)
+    path = tmp_path / "deep.csv"
+    df.to_csv(path, sep=";", index=False)
+    return str(path)
+
+
+def test_exchange_csv_has_default_depth():
+    assert load_prices("data.csv").bid_price.shape[1] == LEVELS
+
+
+def test_deeper_csv_keeps_every_level(deep_csv, tmp_path):
+    data = load_prices(deep_csv)
+    assert data.bid_price.shape[1] == 5
+    assert (data.ask_volume[:, 4] == 5).any()
+    depth = max(len(ap) for tick in data.ticks() for bp, bv, ap, av in tick.levels.values())
+    assert depth == 5
+
+    store = convert(deep_csv, str(tmp_path / "deep.store"))
+    assert store.levels == 5
+    np.testing.assert_array_equal(store.price_data().ask_price, data.ask_price)
+
+    path = str(tmp_path / "deep.npz")
+    BookDeltas.encode(data).save(path)
+    np.testing.assert_array_equal(BookDeltas.load(path).price_data().bid_volume, data.bid_volume)
+
+
+class Chatty:
+
+    def run(self, state):
+        print("x" * 1000)
+        return {}, 0, ""
+
+
+def test_quiet_run_does_not_keep_output(capsys):
+    backtester = Backtester(Chatty())
+    backtester.run(load_prices("data.csv").ticks())
+    assert capsys.readouterr().out == ""
+    # A write-only sink: nothing printed is held for the rest of the run
+    assert not backtester.logs.readable()
@@ -0,0 +1,60 @@
+import json
+
+import jsonpickle
+import numpy as np
+import pytest
+
+from backtester import backtest, load_prices, load_trader
+from batch import batch_backtest
+from matching import make_engine
+from orderbook import SortedLevels, SortedOrderDepth
+
+TRADERS = ["Trader.py", "tutorial_v2.py", "mean_reversion+MM.py"]
+
+
+@pytest.fixture(scope="module")
+def data():
+    return load_prices("data.csv")
+
+
+@pytest.mark.parametrize("fills", ["none", "trade-through"])
+def test_batch_matches_single_runs(data, fills):
+    batch = batch_backtest({path: load_trader(path)() for path in TRADERS}, data, fills=fills)
+    for path in TRADERS:
+        single = backtest(load_trader(path)(), data, engine=make_engine(fills))
+        np.testing.assert_array_equal(batch[path].position, single.position, err_msg=path)
+        np.testing.assert_array_equal(batch[path].cash, single.cash, err_msg=path)
+
+
+class Inspector:
+    # Serializes every state it is given and eats the best ask in place
+
+    def __init__(self):
+        self.books = []
+
+    def run(self, state):
+        if len(self.books) < 20:
+            json.loads(state.toJSON())
+            jsonpickle.decode(jsonpickle.encode(state.order_depths, keys=True), keys=True)
+        self.books.append(state.order_depths)
+        for depth in state.order_depths.values():
+            if depth.sell_orders:
+                del depth.sell_orders[min(depth.sell_orders)]
+        return {}, 0, ""
+
+
+def test_sessions_get_private_serializable_books(data):
+    a, b = Inspector(), Inspector()
+    batch_backtest({"a": a, "b": b}, data)
+    first_a, first_b = a.books[0]["KELP"], b.books[0]["KELP"]
+    assert type(first_a.sell_orders) is dict
+    # a's in-place edit did not reach b
+    assert len(first_b.sell_orders) == len(first_a.sell_orders)
+
+
+def test_sorted_book_option_reaches_traders(data):
+    trader = Inspector()
+    batch_backtest({"a": trader}, data, order_depth_cls=SortedOrderDepth)
+    depth = trader.books[0]["KELP"]
+    assert isinstance(depth, SortedOrderDepth)
+    assert isinstance(depth.buy_orders, SortedLevels)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from backtester import LEVELS, PriceData, load_prices
+from bookcodec import BookDeltas
+
+COLUMNS = ("day", "timestamp", "product", "bid_price", "bid_volume", "ask_price", "ask_volume", "mid_price")
+
+
+@pytest.fixture(scope="module")
+def data():
+    return load_prices("data.csv")
+
+
+def assert_same(decoded, data):
+    for name in COLUMNS:
+        np.testing.assert_array_equal(getattr(decoded, name), getattr(data, name), err_msg=name)
+
+
+@pytest.mark.parametrize("interval", [1, 7, 100])
+def test_round_trip(data, interval):
+    assert_same(BookDeltas.encode(data, interval).price_data(), data)
+
+
+def test_save_load(data, tmp_path):
+    path = str(tmp_path / "deltas.npz")
+    BookDeltas.encode(data).save(path, compress=True)
+    assert_same(BookDeltas.load(path).price_data(), data)
+
+
+def test_replay_from_start(data):
+    deltas = BookDeltas.encode(data, 100)
+    full = [(d, t, {p: (dict(b.buy_orders), dict(b.sell_orders)) for p, b in books.items()}, dict(mids))
+            for d, t, books, mids in deltas.replay()]
+    start = 250
+    partial = [(d, t, {p: (dict(b.buy_orders), dict(b.sell_orders)) for p, b in books.items()}, dict(mids))
+               for d, t, books, mids in deltas.replay(start)]
+    assert partial == full[start:]
+
+
+def test_many_products():
+    # Counts and product codes past 255 must not wrap
+    n = 300
+    rows = 2 * n
+    bid_price = np.zeros((rows, LEVELS), dtype=np.int32)
+    ask_price = np.zeros((rows, LEVELS), dtype=np.int32)
+    bid_price[:, 0] = 100 + np.arange(rows) % n
+    ask_price[:, 0] = bid_price[:, 0] + 2
+    volume = np.zeros((rows, LEVELS), dtype=np.int32)
+    volume[:, 0] = 5
+    data = PriceData(
+        [f"P{i:03d}" for i in range(n)], np.zeros(rows, dtype=np.int64), np.repeat([0, 100], n),
+        np.tile(np.arange(n, dtype=np.int16), 2), bid_price, volume, ask_price, volume.copy(),
+        bid_price[:, 0] + 1.0, np.zeros(rows),
+    )
+    deltas = BookDeltas.encode(data)
+    assert deltas.tick_entries.tolist() == [n, n]
+    assert_same(deltas.price_data(), data)
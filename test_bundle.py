@@ -0,0 +1,52 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from bundle import bundle, dependencies
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TRADERS = ["Trader.py", "tutorial_v2.py", "mean_reversion+MM.py"]
+
+IMPORT_ONLY = """
+import importlib.util, sys
+sys.path = [p for p in sys.path if p != {root!r}]
+spec = importlib.util.spec_from_file_location("upload", "upload.py")
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+module.Trader()
+leaked = [name for name, m in sys.modules.items() if {root!r} in str(getattr(m, "__file__", None) or "")]
+assert not leaked, leaked
+"""
+
+BACKTEST = """
+import sys
+sys.path.insert(0, {root!r})
+from backtester import Backtester, load_prices, load_trader
+data = load_prices({data!r})
+print(Backtester(load_trader(sys.argv[1])()).run(data.ticks(), data.products).total_pnl)
+"""
+
+
+def test_cli_helpers_not_inlined():
+    assert "backtester" not in dependencies(os.path.join(ROOT, "tutorial_v2.py"))
+    assert list(dependencies(os.path.join(ROOT, "Trader.py"))) == ["tradelog"]
+
+
+@pytest.mark.parametrize("trader", TRADERS)
+def test_bundle_imports_without_repo(trader, tmp_path):
+    bundle(os.path.join(ROOT, trader), str(tmp_path / "upload.py"))
+    shutil.copy(os.path.join(ROOT, "datamodel.py"), tmp_path)
+    subprocess.run([sys.executable, "-c", IMPORT_ONLY.format(root=ROOT)], cwd=tmp_path, check=True)
+
+
+@pytest.mark.parametrize("trader", TRADERS)
+def test_bundle_backtests_the_same(trader, tmp_path):
+    upload = bundle(os.path.join(ROOT, trader), str(tmp_path / "upload.py"))
+    script = BACKTEST.format(root=ROOT, data=os.path.join(ROOT, "data.csv"))
+    results = [subprocess.run([sys.executable, "-c", script, path], cwd=tmp_path, check=True,
+                              capture_output=True, text=True).stdout
+               for path in (os.path.join(ROOT, trader), upload)]
+    assert results[0] == results[1]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from backtester import backtest, build_order_depth, load_prices, load_trader
+from datastore import MarketStore, convert
+
+COLUMNS = ("day", "timestamp", "product", "bid_price", "bid_volume", "ask_price", "ask_volume", "mid_price")
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    return convert("data.csv", str(tmp_path_factory.mktemp("store") / "data.store"))
+
+
+def copied_price_data(store):
+    # The copy path taken by stores written without replay columns
+    legacy = MarketStore(store.path)
+    legacy.has_replay = False
+    return legacy.price_data()
+
+
+def test_price_data_maps_replay_columns(store):
+    # Workers replaying the store share its pages instead of each copying it
+    data = store.price_data()
+    for name in COLUMNS:
+        column = getattr(data, name)
+        assert isinstance(column, np.memmap), name
+        assert not column.flags.writeable, name
+
+
+def test_price_data_round_trips_the_csv(store):
+    expected = load_prices("data.csv")
+    for data in (store.price_data(), copied_price_data(store)):
+        assert data.products == expected.products
+        for name in COLUMNS + ("profit_and_loss",):
+            np.testing.assert_array_equal(getattr(data, name), getattr(expected, name), err_msg=name)
+
+
+def test_store_backtests_like_the_csv(store):
+    assert backtest(load_trader("tutorial_v2.py")(), store.price_data()).total_pnl == 1591
+
+
+def test_order_depth_matches_the_csv_book(store):
+    expected = load_prices("data.csv")
+    ticks = list(expected.ticks())
+    order = np.asarray(store.column("time_index"))
+    for i in (0, 1, len(expected) // 2, len(expected) - 1):
+        depth = store.order_depth(int(order[i]))
+        levels = ticks[i // len(expected.products)].levels[expected.products[expected.product[i]]]
+        book = build_order_depth(levels)
+        assert (depth.buy_orders, depth.sell_orders) == (book.buy_orders, book.sell_orders)
+
+
+def test_opening_maps_columns_lazily(store):
+    reopened = MarketStore(store.path)
+    assert reopened._columns == {}
+    column = reopened.column("bid_price_1")
+    assert isinstance(column, np.memmap) and column.mode == "r"
+    assert set(reopened._columns) == {"bid_price_1"}
+    rows = reopened.product_rows("KELP")
+    assert np.shares_memory(reopened.view("bid_price_1", "KELP"), column)
+    assert rows.stop - rows.start == len(reopened) // len(reopened.products)
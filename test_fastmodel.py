@@ -0,0 +1,37 @@
+import pytest
+
+import datamodel
+import fastmodel
+from fastmodel import encode_state
+
+
+def make_state(model):
+    depth = model.OrderDepth()
+    depth.buy_orders.update({10: 3, 9: 1, 11: 2})
+    depth.sell_orders.update({13: -4, 12: -1})
+    trades = {"KELP": [model.Trade("KELP", 11, 2, "A", None, 100), model.Trade("KELP", 12, 1, None, "B", 100)]}
+    observations = model.Observation({"SUN": 1.0, "FLAG": True, "N": 1},
+                                     {"ORCH": model.ConversionObservation(1.5, 2.0, 0.1, 0.0, -1.0, 3, 4)})
+    return model.TradingState('{"a": [1, 2.5]}', 100, {"KELP": model.Listing("KELP", "KELP", "SEASHELLS")},
+                              {"KELP": depth, "RESIN": model.OrderDepth()}, trades, {"RESIN": []},
+                              {"RESIN": -3, "KELP": 0}, observations)
+
+
+def test_matches_tojson():
+    state = make_state(datamodel)
+    assert encode_state(state) == state.toJSON()
+
+
+def test_slots_state_encodes_like_datamodel():
+    assert make_state(fastmodel).toJSON() == make_state(datamodel).toJSON()
+
+
+@pytest.mark.parametrize("value", [1, 1.0, True, None, "1"])
+def test_scalar_types_kept_apart(value):
+    state = make_state(datamodel)
+    state.position["KELP"] = value
+    assert encode_state(state) == state.toJSON()
+
+
+def test_slots_classes_have_no_dict():
+    assert not hasattr(fastmodel.Order("KELP", 1, 1), "__dict__")
@@ -0,0 +1,80 @@
+from datamodel import Order, Trade
+from matching import Fill, MarketTradeFills, MatchingEngine, TradeThroughFills, make_engine
+
+# Two-level book: bids 99 x 5, 98 x 10; asks 101 x 4, 102 x 6
+BOOK = ([99, 98], [5, 10], [101, 102], [4, 6])
+
+
+def test_orders_past_the_limit_are_all_rejected():
+    engine = MatchingEngine()
+    orders = [Order("X", 102, 15), Order("X", 99, -1)]
+    assert engine.execute("X", BOOK, orders, position=40, limit=50) == []
+    assert engine.quotes() == {}
+
+
+def test_marketable_quantity_walks_the_book():
+    engine = MatchingEngine()
+    fills = engine.execute("X", BOOK, [Order("X", 102, 7)], position=0, limit=50)
+    assert fills == [Fill(101, 4, False), Fill(102, 3, False)]
+    fills = engine.execute("X", BOOK, [Order("X", 98, -8)], position=0, limit=50)
+    assert fills == [Fill(99, -5, False), Fill(98, -3, False)]
+
+
+def test_orders_share_the_book_within_a_tick():
+    engine = MatchingEngine()
+    fills = engine.execute("X", BOOK, [Order("X", 101, 3), Order("X", 101, 3)], position=0, limit=50)
+    assert fills == [Fill(101, 3, False), Fill(101, 1, False)]
+    [quote] = engine.quotes()["X"]
+    assert (quote.price, quote.remaining) == (101, 2)
+
+
+def test_remainder_rests_until_next_tick_only():
+    engine = make_engine("trade-through")
+    engine.execute("X", BOOK, [Order("X", 100, 5)], position=0, limit=50)
+    assert engine.settle({"X": BOOK}, {}) == {}
+    assert engine.quotes() == {}
+
+
+def test_trade_through_fills_volume_priced_through():
+    engine = MatchingEngine(TradeThroughFills())
+    engine.execute("X", BOOK, [Order("X", 100, 5), Order("X", 103, -2)], position=0, limit=50)
+    crossed = ([104, 97], [1, 3], [99, 100], [3, 8])
+    assert engine.settle({"X": crossed}, {}) == {"X": [Fill(100, 3, True), Fill(103, -1, True)]}
+
+
+def test_market_trades_fill_through_and_after_queue():
+    engine = MatchingEngine(MarketTradeFills())
+    # Joins 5 lots already bid at 99
+    engine.execute("X", BOOK, [Order("X", 99, 4)], position=0, limit=50)
+    assert engine.settle({"X": BOOK}, {"X": [Trade("X", 99, 6)]}) == {"X": [Fill(99, 1, True)]}
+
+    engine.execute("X", BOOK, [Order("X", 99, 4)], position=0, limit=50)
+    assert engine.settle({"X": BOOK}, {"X": [Trade("X", 98, 6)]}) == {"X": [Fill(99, 4, True)]}
+
+
+def test_better_priced_quote_fills_first():
+    engine = MatchingEngine(MarketTradeFills())
+    engine.execute("X", BOOK, [Order("X", 103, -3), Order("X", 102, -3)], position=0, limit=50)
+    fills = engine.settle({"X": BOOK}, {"X": [Trade("X", 104, 4)]})
+    assert fills == {"X": [Fill(102, -3, True), Fill(103, -1, True)]}
+
+
+def test_market_trades_fill_only_the_side_that_was_hit():
+    engine = MatchingEngine(MarketTradeFills())
+    # Bid 99 behind nobody, ask 101 behind nobody after clearing the book
+    thin = ([98], [5], [102], [6])
+    orders = [Order("X", 99, 3), Order("X", 101, -3)]
+    engine.execute("X", thin, orders, position=0, limit=50, mid=100.0)
+    # Below the mid: a seller hit the bids, so our ask can't fill at 99
+    assert engine.settle({"X": thin}, {"X": [Trade("X", 99, 10)]}) == {"X": [Fill(99, 3, True)]}
+
+    engine.execute("X", thin, orders, position=0, limit=50, mid=100.0)
+    assert engine.settle({"X": thin}, {"X": [Trade("X", 101, 10)]}) == {"X": [Fill(101, -3, True)]}
+
+
+def test_market_trade_volume_is_used_once():
+    engine = MatchingEngine(MarketTradeFills())
+    thin = ([98], [5], [102], [6])
+    # Both quotes at the mid: the trade could be either side, but fills 4 lots in total
+    engine.execute("X", thin, [Order("X", 100, 3), Order("X", 100, -3)], position=0, limit=50, mid=100.0)
+    assert engine.settle({"X": thin}, {"X": [Trade("X", 100, 4)]}) == {"X": [Fill(100, 3, True), Fill(100, -1, True)]}
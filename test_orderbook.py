@@ -0,0 +1,87 @@
+import pickle
+import random
+
+import pytest
+
+import orderbook
+from datamodel import OrderDepth
+from orderbook import SortedLevels, SortedOrderDepth
+
+HELPERS = ("best_bid", "best_ask", "far_bid", "far_ask")
+PRICE_HELPERS = ("bid_volume_at_or_above", "ask_volume_at_or_below", "lowest_ask_above", "highest_bid_below")
+
+
+def assert_same(sorted_book, plain):
+    assert dict(sorted_book.buy_orders) == plain.buy_orders
+    assert dict(sorted_book.sell_orders) == plain.sell_orders
+    for side in (sorted_book.buy_orders, sorted_book.sell_orders):
+        assert side._prices == sorted(side)
+    for name in HELPERS:
+        assert getattr(orderbook, name)(sorted_book) == getattr(orderbook, name)(plain), name
+    for price in range(90, 111, 3):
+        for name in PRICE_HELPERS:
+            assert getattr(orderbook, name)(sorted_book, price + 0.5) == getattr(orderbook, name)(plain, price + 0.5), name
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_plain_order_depth_under_random_updates(seed):
+    rng = random.Random(seed)
+    sorted_book, plain = SortedOrderDepth(), OrderDepth()
+    for _ in range(500):
+        side = rng.choice(("buy_orders", "sell_orders"))
+        sign = 1 if side == "buy_orders" else -1
+        levels, expected = getattr(sorted_book, side), getattr(plain, side)
+        price = rng.randint(90, 110)
+        op = rng.random()
+        if op < 0.45:
+            volume = sign * rng.randint(1, 20)
+            levels[price] = volume
+            expected[price] = volume
+        elif op < 0.6:
+            # Zero-volume updates keep the level, as they do in a plain dict
+            levels[price] = 0
+            expected[price] = 0
+        elif op < 0.8:
+            if price in expected:
+                del levels[price]
+                del expected[price]
+        elif op < 0.9:
+            assert levels.pop(price, None) == expected.pop(price, None)
+        else:
+            extra = {rng.randint(90, 110): sign * rng.randint(1, 5) for _ in range(3)}
+            levels |= extra
+            expected |= extra
+        assert_same(sorted_book, plain)
+
+
+def test_dict_methods_keep_prices_in_sync():
+    levels = SortedLevels(True, {100: 1, 98: 2})
+    levels |= {99: 3}
+    assert isinstance(levels, SortedLevels) and levels.prices() == [100, 99, 98]
+    levels.setdefault(101, 4)
+    levels.update({97: 1})
+    assert levels.pop(98) == 2
+    levels.popitem()
+    assert levels.prices() == sorted(levels, reverse=True) == [101, 100, 99]
+    copy = levels.copy()
+    copy[102] = 1
+    assert levels.best == 101 and copy.best == 102
+    assert pickle.loads(pickle.dumps(levels)).prices() == [101, 100, 99]
+    levels.clear()
+    assert levels.best is None and levels.prices() == []
+
+
+def test_fromkeys_is_rejected():
+    with pytest.raises(TypeError):
+        SortedLevels.fromkeys([100, 101], 0)
+
+
+def test_setters_convert_plain_dicts():
+    book = SortedOrderDepth()
+    book.buy_orders = {99: 1, 100: 2}
+    book.sell_orders = {102: -1, 101: -2}
+    assert isinstance(book.buy_orders, SortedLevels)
+    assert (book.best_bid, book.best_ask, book.far_bid, book.far_ask) == (100, 101, 99, 102)
+    plain = OrderDepth()
+    plain.buy_orders, plain.sell_orders = {99: 1, 100: 2}, {102: -1, 101: -2}
+    assert_same(SortedOrderDepth.from_order_depth(plain), plain)
@@ -0,0 +1,27 @@
+import tracemalloc
+
+from backtester import load_prices, load_trader
+from profiler import profile
+
+
+def test_profile_leaves_caller_tracing_on():
+    data = load_prices("data.csv")
+    tracemalloc.start()
+    try:
+        report = profile(load_trader("tutorial_v2.py")(), data)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert report.peak_bytes is not None and len(report.peak_bytes) == len(report.ticks)
+
+    profile(load_trader("tutorial_v2.py")(), data)
+    assert not tracemalloc.is_tracing()
+
+
+def test_component_sections_per_product():
+    data = load_prices("data.csv")
+    summed = profile(load_trader("tutorial_v2.py")(), data, trace_memory=False)
+    assert {"fair_value", "taker", "clearer", "quoter"} <= set(summed.sections)
+    split = profile(load_trader("tutorial_v2.py")(), data, trace_memory=False, per_product=True)
+    assert {"taker[KELP]", "taker[RAINFOREST_RESIN]", "quoter[KELP]"} <= set(split.sections)
+    assert "taker" not in split.sections
@@ -0,0 +1,115 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from resultcache import ResultCache, cached_backtest, data_hash, source_hash
+from sweep import param_key
+
+TRADER = (
+    "import helper\n\n\n"
+    "class Trader:\n"
+    "    def run(self, state):\n"
+    "        return {}, 0, str(helper.X)\n"
+)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "trader.py").write_text(TRADER)
+    (tmp_path / "helper.py").write_text("X = 1\n")
+    shutil.copy("data.csv", tmp_path / "data.csv")
+    return tmp_path
+
+
+def test_source_hash_follows_local_imports(tree):
+    before = source_hash(str(tree / "trader.py"))
+    assert source_hash(str(tree / "trader.py")) == before
+    (tree / "helper.py").write_text("X = 2\n")
+    assert source_hash(str(tree / "trader.py")) != before
+
+
+def test_data_hash_is_content_based(tree):
+    (tree / "moved").mkdir()
+    copy = tree / "moved" / "data.csv"
+    shutil.copy(tree / "data.csv", copy)
+    assert data_hash(str(copy)) == data_hash(str(tree / "data.csv"))
+    with open(copy, "a") as f:
+        f.write("\n")
+    assert data_hash(str(copy)) != data_hash(str(tree / "data.csv"))
+
+
+def test_key_changes_with_every_input(tree):
+    cache = ResultCache(str(tree / "cache"))
+    trader, data = str(tree / "trader.py"), str(tree / "data.csv")
+    base = cache.key(trader, data, {"WINDOW": 5})
+    assert cache.key(trader, data, {"WINDOW": 5}) == base
+    assert cache.key(trader, data, {"WINDOW": 6}) != base
+    assert cache.key(trader, data, {"WINDOW": 5}, fills="trade-through") != base
+
+    (tree / "trader.py").write_text(TRADER + "# edited\n")
+    edited = cache.key(trader, data, {"WINDOW": 5})
+    assert edited != base
+
+    with open(data, "a") as f:
+        f.write("\n")
+    assert cache.key(trader, data, {"WINDOW": 5}) != edited
+
+
+def test_sweep_key_changes_with_every_input():
+    base = param_key("source", "data", {"WINDOW": 5, "EDGE": 1})
+    assert param_key("source", "data", {"EDGE": 1, "WINDOW": 5}) == base
+    for key in (param_key("other", "data", {"WINDOW": 5, "EDGE": 1}),
+                param_key("source", "other", {"WINDOW": 5, "EDGE": 1}),
+                param_key("source", "data", {"WINDOW": 5, "EDGE": 2}),
+                param_key("source", "data", {"WINDOW": 5, "EDGE": 1.0 + 1e-9})):
+        assert key != base
+
+
+def test_put_get_round_trip_and_miss_after_source_change(tree):
+    cache = ResultCache(str(tree / "cache"))
+    trader, data = str(tree / "trader.py"), str(tree / "data.csv")
+    result, hit = cached_backtest(trader, data, cache=cache)
+    assert not hit and result.trader_data == "1"
+
+    cached, hit = cached_backtest(trader, data, cache=cache)
+    assert hit
+    assert cached.products == result.products and cached.trader_data == "1"
+    for name in ("day", "timestamp", "mid_price", "position", "cash", "fills", "quotes"):
+        np.testing.assert_array_equal(getattr(cached, name), getattr(result, name))
+    assert cache.summaries()["trader"].tolist() == [trader]
+
+    (tree / "helper.py").write_text("X = 2\n")
+    _, hit = cached_backtest(trader, data, cache=cache)
+    assert not hit
+    assert len(cache.entries()) == 2
+    assert not [name for name in os.listdir(cache.cache_dir) if ".tmp" in name]
+
+
+def test_evicts_least_recently_used_first(tree):
+    cache = ResultCache(str(tree / "cache"))
+    result, _ = cached_backtest(str(tree / "trader.py"), str(tree / "data.csv"), cache=cache)
+    cache.clear()
+    for i, key in enumerate("abc"):
+        cache.put(key, result)
+        for path in cache._paths(key):
+            os.utime(path, (1000 + i, 1000 + i))
+    entry_bytes = max(size for _, size, _ in cache.entries())
+    assert cache.get("a") is not None  # a becomes the most recently used
+    cache.max_bytes = 2 * entry_bytes
+    assert cache.evict() == ["b"]
+    cache.max_bytes = entry_bytes
+    assert cache.evict() == ["c"]
+    assert [key for _, _, key in cache.entries()] == ["a"]
+
+
+def test_evict_sweeps_arrays_without_meta(tree):
+    cache = ResultCache(str(tree / "cache"))
+    result, _ = cached_backtest(str(tree / "trader.py"), str(tree / "data.csv"), cache=cache)
+    key = cache.entries()[0][2]
+    arrays_path, meta_path = cache._paths(key)
+    os.remove(meta_path)
+    assert cache.orphans() == [arrays_path]
+    cache.evict()
+    assert not os.path.exists(arrays_path)
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from backtester import load_prices
+from rolling import RollingVariance, check_consistency
+
+
+@pytest.mark.parametrize("window", [1, 3, 5, 20])
+def test_streaming_matches_batch_on_data(window):
+    data = load_prices("data.csv")
+    for code in range(len(data.products)):
+        rows = data.product == code
+        volume = data.bid_volume[rows, 0] + data.ask_volume[rows, 0]
+        check_consistency(data.mid_price[rows], volume, window=window)
+
+
+def test_streaming_matches_batch_on_random_walk():
+    rng = np.random.default_rng(0)
+    x = 1e4 + np.cumsum(rng.normal(size=3000))
+    check_consistency(x, rng.integers(1, 30, size=len(x)), window=50, alpha=0.05)
+
+
+def test_flat_series_has_zero_variance():
+    est = RollingVariance(5, 1)
+    for _ in range(20):
+        est.update(10_000.5)
+    assert est.value == 0.0
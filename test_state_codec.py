@@ -0,0 +1,62 @@
+from array import array
+
+import pytest
+
+from rolling import EMA, RollingMean, RollingMinMax
+from state_codec import RingBuffer, decode, encode
+
+
+def test_ring_buffer_keeps_last_capacity_values():
+    ring = RingBuffer(3, "d", range(5))
+    assert ring.tolist() == [2.0, 3.0, 4.0]
+    assert ring[0] == 2.0 and ring[-1] == 4.0
+    assert ring.last(2) == [3.0, 4.0]
+    with pytest.raises(IndexError):
+        ring[3]
+
+
+def test_round_trip():
+    ring = RingBuffer(4, "d", [1.5, 2.5, 3.5, 4.5, 5.5])
+    data = {
+        "ring": ring,
+        "ints": array("q", [1, -2, 3]),
+        "none": None,
+        "flag": True,
+        "count": 1 << 40,
+        "price": 10_000.25,
+        "name": "KELP",
+        "nested": {"a": 1, "b": {"c": "d"}},
+    }
+    decoded = decode(encode(data))
+    assert decoded.keys() == data.keys()
+    assert decoded["ring"].tolist() == ring.tolist()
+    assert decoded["ring"].capacity == 4
+    assert decoded["ints"] == data["ints"]
+    assert decoded["flag"] is True
+    for key in ("none", "count", "price", "name", "nested"):
+        assert decoded[key] == data[key]
+
+
+def test_decoded_ring_buffer_keeps_rolling():
+    decoded = decode(encode({"ring": RingBuffer(3, "d", [1, 2, 3, 4])}))["ring"]
+    decoded.append(5)
+    assert decoded.tolist() == [3.0, 4.0, 5.0]
+
+
+def test_registered_estimators_round_trip():
+    mean, ema, extremes = RollingMean(3), EMA(0.2), RollingMinMax(3)
+    values = [5.0, 3.0, 8.0, 1.0, 4.0]
+    for x in values[:3]:
+        mean.update(x), ema.update(x), extremes.update(x)
+    decoded = decode(encode({"mean": mean, "ema": ema, "extremes": extremes}))
+    for x in values[3:]:
+        for est in (mean, ema, extremes, *decoded.values()):
+            est.update(x)
+    assert decoded["mean"].value == mean.value
+    assert decoded["ema"].value == ema.value
+    assert (decoded["extremes"].min, decoded["extremes"].max) == (extremes.min, extremes.max)
+
+
+def test_unsupported_value():
+    with pytest.raises(TypeError):
+        encode({"bad": [1, 2]})
@@ -0,0 +1,112 @@
+import pytest
+
+from backtester import backtest, load_prices, load_trader
+from datamodel import OrderDepth
+from matching import make_engine
+from orderbook import ask_volume_at_or_below
+from rolling import RollingVariance
+from strategy import BookSnapshot, Clearer, FixedFairValue, ProductContext, Quoter, RollingFairValue, Taker
+from tradelog import TradeLogger
+
+
+def make_book(bids, asks):
+    depth = OrderDepth()
+    depth.buy_orders = dict(bids)
+    depth.sell_orders = {p: -v for p, v in asks.items()}
+    return BookSnapshot(depth)
+
+
+def make_ctx(book, position=0, fair=100.0, std=0.0, limit=20):
+    ctx = ProductContext("X", book, position, limit, TradeLogger())
+    ctx.fair, ctx.std = fair, std
+    return ctx
+
+
+def orders(ctx):
+    return [(o.price, o.quantity) for o in ctx.orders]
+
+
+def test_snapshot_is_a_private_signed_copy():
+    depth = OrderDepth()
+    depth.buy_orders = {99: 5, 98: 3}
+    depth.sell_orders = {101: -4, 103: -2}
+    book = BookSnapshot(depth)
+    assert (book.best_bid, book.best_ask, book.mid, book.spread) == (99, 101, 100.0, 2)
+    assert ask_volume_at_or_below(book, 103) == -6
+    book.take_ask(101, 4)
+    book.take_bid(99, 2)
+    assert book.sell_orders == {103: -2} and book.buy_orders == {99: 3, 98: 3}
+    assert depth.sell_orders == {101: -4, 103: -2}
+
+
+def test_fixed_fair_value():
+    assert FixedFairValue(10_000).estimate(make_ctx(make_book({}, {})), None) == (10_000, 0.0)
+
+
+def test_rolling_fair_value_warms_up_past_the_window():
+    fair_value = RollingFairValue(3)
+    memory = fair_value.initial_state()
+    assert isinstance(memory, RollingVariance)
+    estimates = [fair_value.estimate(make_ctx(make_book({m - 1: 1}, {m + 1: 1})), memory)
+                 for m in (100, 102, 104, 106)]
+    assert estimates[:3] == [None, None, None]
+    assert estimates[3] == pytest.approx((104.0, 2.0))
+
+
+def test_taker_takes_best_levels_through_fair_and_consumes_them():
+    book = make_book({103: 4, 102: 9}, {98: 3, 99: 7})
+    ctx = make_ctx(book, position=15, limit=20)
+    Taker(edge=1)(ctx)
+    # Buy capacity is 5, sell capacity 35; only the best level is taken
+    assert orders(ctx) == [(98, 3), (103, -4)]
+    assert book.best_ask == 99 and book.best_bid == 102
+
+
+def test_taker_respects_the_edge():
+    ctx = make_ctx(make_book({100: 4}, {100: 3}), std=2.0)
+    Taker(edge=0, edge_std=0.5)(ctx)
+    assert orders(ctx) == []
+
+
+def test_clearer_flattens_against_volume_at_fair():
+    book = make_book({100: 3, 99: 10}, {104: 5})
+    ctx = make_ctx(book, position=8)
+    Clearer(0)(ctx)
+    assert orders(ctx) == [(100, -3)]
+
+    ctx = make_ctx(make_book({96: 5}, {100: 2, 101: 6}), position=-4)
+    Clearer(0)(ctx)
+    assert orders(ctx) == [(100, 2)]
+
+
+def test_clearer_counts_takes_already_sent():
+    ctx = make_ctx(make_book({100: 10}, {}), position=0)
+    ctx.buy(98, 4)
+    Clearer(0)(ctx)
+    assert orders(ctx) == [(98, 4), (100, -4)]
+
+
+def test_quoter_joins_pennies_and_falls_back():
+    quoter = Quoter(ignore_spread=1, match_spread=2, base_spread=3, soft_limit=10)
+    # 102 is within match_spread of fair: join; 96 is further: penny to 97
+    ctx = make_ctx(make_book({96: 5}, {102: 5}), limit=20)
+    quoter(ctx)
+    assert orders(ctx) == [(97, 20), (102, -20)]
+    # Levels within ignore_spread are skipped; nothing beyond means fair +/- base_spread
+    ctx = make_ctx(make_book({99: 5}, {101: 5}), limit=20)
+    quoter(ctx)
+    assert orders(ctx) == [(97, 20), (103, -20)]
+
+
+def test_quoter_leans_past_soft_limit():
+    ctx = make_ctx(make_book({}, {}), position=12, limit=20)
+    Quoter(1, 2, 3, soft_limit=10)(ctx)
+    assert orders(ctx) == [(97, 8), (102, -32)]
+
+
+@pytest.mark.parametrize("fills, pnl, count", [("none", 1591, 480), ("trade-through", 1590, 481),
+                                               ("probabilistic", 27017, 868)])
+def test_tutorial_v2_results(fills, pnl, count):
+    result = backtest(load_trader("tutorial_v2.py")(), load_prices("data.csv"), engine=make_engine(fills))
+    summary = result.summary()
+    assert (summary["pnl"], summary["fills"]) == (pnl, count)
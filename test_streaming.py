@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from backtester import Backtester, backtest, load_prices, load_trader
+from matching import make_engine
+from streaming import discover, stream_ticks
+
+TRADE_COLUMNS = ["timestamp", "buyer", "seller", "symbol", "currency", "price", "quantity"]
+
+
+def write_trades(prices: pd.DataFrame, path, with_day: bool = False) -> None:
+    # A KELP trade at the best bid every fifth tick
+    kelp = prices[prices["product"] == "KELP"].iloc[::5]
+    trades = pd.DataFrame({"day": kelp["day"], "timestamp": kelp["timestamp"], "buyer": "", "seller": "",
+                           "symbol": "KELP", "currency": "SEASHELLS", "price": kelp["bid_price_1"], "quantity": 3})
+    trades[(["day"] if with_day else []) + TRADE_COLUMNS].to_csv(path, sep=";", index=False)
+
+
+@pytest.fixture(scope="module")
+def days(tmp_path_factory):
+    # data.csv split in two, the second half relabelled as the next day
+    root = tmp_path_factory.mktemp("days")
+    frame = pd.read_csv("data.csv", sep=";")
+    half = frame["timestamp"].max() // 2
+    second = frame[frame["timestamp"] > half].assign(day=0)
+    second["timestamp"] -= half + 100
+    parts = [frame[frame["timestamp"] <= half], second]
+    for part in parts:
+        day = int(part["day"].iloc[0])
+        part.to_csv(root / f"prices_round_1_day_{day}.csv", sep=";", index=False)
+        write_trades(part, root / f"trades_round_1_day_{day}.csv")
+    return root, pd.concat(parts, ignore_index=True)
+
+
+def run(paths, chunk_rows):
+    trader = load_trader("tutorial_v2.py")()
+    result = Backtester(trader, engine=make_engine("market-trades")).run(stream_ticks(paths, chunk_rows))
+    return result.summary()
+
+
+def test_pnl_does_not_depend_on_chunk_size(days):
+    root, _ = days
+    assert [f.day for f in discover([str(root)])] == [-1, 0]
+    summaries = [run([str(root)], chunk_rows) for chunk_rows in (61, 500, 100_000)]
+    assert summaries[0]["passive_fills"] > 0
+    assert summaries[1:] == summaries[:-1]
+
+
+def test_data_csv_streams_like_load_prices():
+    expected = backtest(load_trader("tutorial_v2.py")(), load_prices("data.csv")).summary()
+    assert expected["pnl"] == 1591
+    for chunk_rows in (31, 1000):
+        result = Backtester(load_trader("tutorial_v2.py")()).run(stream_ticks(["data.csv"], chunk_rows))
+        assert result.summary() == expected
+
+
+def test_loose_files_match_trades_on_day_and_timestamp(days, tmp_path):
+    root, frame = days
+    frame.to_csv(tmp_path / "prices.csv", sep=";", index=False)
+    write_trades(frame, tmp_path / "trades.csv", with_day=True)
+    assert run([str(tmp_path)], 97) == run([str(root)], 97)
+
+
+def test_loose_trades_without_day_must_cover_one_day(days, tmp_path):
+    _, frame = days
+    frame.to_csv(tmp_path / "prices.csv", sep=";", index=False)
+    write_trades(frame, tmp_path / "trades.csv")
+    with pytest.raises(ValueError, match="no day column"):
+        run([str(tmp_path)], 500)
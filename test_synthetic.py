@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from synthetic import expand, fit, generate, write_csv
+
+
+@pytest.fixture(scope="module")
+def models():
+    return expand(fit("data.csv"), 3)
+
+
+def concat(chunks):
+    chunks = list(chunks)
+    return {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+
+@pytest.mark.parametrize("levels", [3, 5])
+def test_chunk_size_invariant(models, levels):
+    kwargs = dict(days=2, ticks_per_day=700, seed=7, levels=levels)
+    whole = concat(generate(models, chunk_ticks=50_000, **kwargs))
+    for chunk_ticks in (1, 100, 333):
+        split = concat(generate(models, chunk_ticks=chunk_ticks, **kwargs))
+        for name, values in whole.items():
+            np.testing.assert_array_equal(split[name], values, err_msg=f"{name}, chunk_ticks={chunk_ticks}")
+
+
+def test_seed_changes_output(models):
+    a = concat(generate(models, ticks_per_day=200, seed=1))
+    b = concat(generate(models, ticks_per_day=200, seed=2))
+    assert not np.array_equal(a["bid_price"], b["bid_price"])
+
+
+def test_csv_files_identical_across_chunk_sizes(models, tmp_path):
+    paths = []
+    for chunk_ticks in (50_000, 37):
+        out = tmp_path / str(chunk_ticks)
+        paths.append(write_csv(models, str(out), days=1, ticks_per_day=300, levels=5, chunk_ticks=chunk_ticks))
+    for a, b in zip(*paths):
+        with open(a) as fa, open(b) as fb:
+            assert fa.read() == fb.read()
@@ -0,0 +1,49 @@
+import base64
+import struct
+
+import pytest
+
+from tradelog import DEBUG, EXECUTED, FAIR_VALUE, SUBMIT, TradeLogger, decode_line, to_frame
+
+
+def test_format_round_trips_through_decode():
+    logger = TradeLogger(capacity=8)
+    logger.info(SUBMIT, "KELP", 2020.0, 5, 0)
+    logger.info(EXECUTED, "RAINFOREST_RESIN", 9998.0, -3, -3)
+    logger.debug(FAIR_VALUE, "KELP", 2021.5)
+    assert decode_line(logger.format(300)) == [
+        (300, "KELP", "submit", 2020.0, 5, 0),
+        (300, "RAINFOREST_RESIN", "executed", 9998.0, -3, -3),
+    ]
+
+
+def test_product_codes_past_a_byte():
+    logger = TradeLogger(capacity=400, level=DEBUG)
+    for i in range(300):
+        logger.info(SUBMIT, f"P{i}", float(i), i, -i)
+    rows = decode_line(logger.format(0))
+    assert len(rows) == 300
+    assert rows[257] == (0, "P257", "submit", 257.0, 257, -257)
+
+
+def test_dropped_records_and_flush(capsys):
+    logger = TradeLogger(capacity=1)
+    logger.info(SUBMIT, "KELP", 1.0, 1)
+    logger.info(SUBMIT, "KELP", 2.0, 1)
+    logger.flush(100)
+    line = capsys.readouterr().out
+    assert line.split(" ")[3] == "1"
+    assert to_frame([line, "not a log line"])["price"].tolist() == [1.0]
+    logger.flush(200)
+    assert capsys.readouterr().out == ""
+
+
+def test_decodes_tl1_lines():
+    raw = bytes([1, 0]) + struct.pack("<d", 2.5) + struct.pack("<i", -2) + struct.pack("<i", 4)
+    line = f"TL1 7 KELP 0 {base64.b64encode(raw).decode('ascii')}"
+    assert decode_line(line) == [(7, "KELP", "executed", 2.5, -2, 4)]
+
+
+@pytest.mark.parametrize("line", ["", "TL9 1 KELP 0 AA==", "TL2 1 KELP"])
+def test_ignores_other_lines(line):
+    assert decode_line(line) is None
@@ -0,0 +1,141 @@
+import base64
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Buffered structured logging for Trader.run. Records go into preallocated
+# typed arrays during the tick and are written out by flush() as a single
+# line per run:
+#
+#   TL2 <timestamp> <products,...> <dropped> <base64 payload>
+#
+# The payload is the record columns back to back (event u8, product u16,
+# price f64, quantity i32, position i32). Quantities are signed: positive
+# for buys, negative for sells. Methods for disabled levels are bound to a
+# no-op, so gated-off calls cost one empty function call.
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+OFF = 100
+
+EVENTS = (
+    "submit",  # order sent this tick
+    "executed",  # own trade reported in state.own_trades
+    "position",
+    "fair_value",
+    "open",
+    "close",
+    "increase",
+    "depth",  # price = number of bid levels, quantity = number of ask levels
+    "note",
+)
+EVENT_CODES = {name: code for code, name in enumerate(EVENTS)}
+SUBMIT, EXECUTED, POSITION, FAIR_VALUE, OPEN, CLOSE, INCREASE, DEPTH, NOTE = range(len(EVENTS))
+PREFIX = "TL2"
+# Column dtypes per line version; TL1 stored product codes as u8
+LAYOUTS = {
+    "TL1": ("u1", "u1", "<f8", "<i4", "<i4"),
+    "TL2": ("u1", "<u2", "<f8", "<i4", "<i4"),
+}
+
+
+def _noop(*args, **kwargs) -> None:
+    pass
+
+
+class TradeLogger:
+
+    def __init__(self, capacity: int = 256, level: int = INFO):
+        self.capacity = capacity
+        self.events = array("B", bytes(capacity))
+        self.products = array("H", bytes(2 * capacity))
+        self.prices = array("d", bytes(8 * capacity))
+        self.quantities = array("i", bytes(4 * capacity))
+        self.positions = array("i", bytes(4 * capacity))
+        self.count = 0
+        self.dropped = 0
+        self.product_codes: Dict[str, int] = {}
+        self.set_level(level)
+
+    def set_level(self, level: int) -> None:
+        self.level = level
+        self.debug = self._record if level <= DEBUG else _noop
+        self.info = self._record if level <= INFO else _noop
+        self.warning = self._record if level <= WARNING else _noop
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def _record(self, event: int, product: str, price: float = 0.0, quantity: int = 0, position: int = 0) -> None:
+        i = self.count
+        if i >= self.capacity:
+            self.dropped += 1
+            return
+        code = self.product_codes.get(product)
+        if code is None:
+            code = self.product_codes[product] = len(self.product_codes)
+        self.events[i] = event
+        self.products[i] = code
+        self.prices[i] = price
+        self.quantities[i] = quantity
+        self.positions[i] = position
+        self.count = i + 1
+
+    def format(self, timestamp: int) -> str:
+        n = self.count
+        payload = b"".join((
+            self.events[:n].tobytes(),
+            self.products[:n].tobytes(),
+            self.prices[:n].tobytes(),
+            self.quantities[:n].tobytes(),
+            self.positions[:n].tobytes(),
+        ))
+        products = ",".join(self.product_codes) or "-"
+        return f"{PREFIX} {timestamp} {products} {self.dropped} {base64.b64encode(payload).decode('ascii')}"
+
+    def flush(self, timestamp: int) -> None:
+        if self.count or self.dropped:
+            print(self.format(timestamp))
+        self.count = 0
+        self.dropped = 0
+
+
+def decode_line(line: str) -> Optional[List[tuple]]:
+    # Returns (timestamp, product, event, price, quantity, position) rows,
+    # or None if the line is not a logger line
+    parts = line.strip().split(" ")
+    layout = LAYOUTS.get(parts[0]) if len(parts) == 5 else None
+    if layout is None:
+        return None
+    timestamp = int(parts[1])
+    products = parts[2].split(",")
+    raw = base64.b64decode(parts[4])
+    dtypes = [np.dtype(dtype) for dtype in layout]
+    n = len(raw) // sum(dtype.itemsize for dtype in dtypes)
+    offset = 0
+    columns = []
+    for dtype in dtypes:
+        columns.append(np.frombuffer(raw, dtype=dtype, count=n, offset=offset))
+        offset += dtype.itemsize * n
+    events, codes, prices, quantities, positions = columns
+    return [
+        (timestamp, products[c], EVENTS[e], float(p), int(q), int(pos))
+        for e, c, p, q, pos in zip(events.tolist(), codes.tolist(), prices, quantities.tolist(), positions.tolist())
+    ]
+
+
+def to_frame(lines: Iterable[str]) -> pd.DataFrame:
+    rows = []
+    for line in lines:
+        decoded = decode_line(line)
+        if decoded:
+            rows.extend(decoded)
+    return pd.DataFrame(rows, columns=["timestamp", "product", "event", "price", "quantity", "position"])
+
+
+def read_log(path: str) -> pd.DataFrame:
+    with open(path) as f:
+        return to_frame(f)